@@ -22,6 +22,8 @@ __docformat__ = "restructuredtext en"
 
 
 import math
+import operator
+import itertools
 
 from error import ErrorOutputDifference
 from error import ErrorLinear
@@ -34,9 +36,16 @@ from exception import *
 class Activation(FactoryMixin):
     """
     Activation function class.
+
+    :CVariables:
+        output_error_function : string
+            Name of the only `Error` with which the activation function can
+            be used, and then only in the output `Unit`, or None if the
+            activation function can be used anywhere.
     """
 
     prefix = 'ac_'
+    output_error_function = None
 
     def __init__(self):
         """
@@ -67,6 +76,25 @@ class Activation(FactoryMixin):
         return self.activation_function(value)
 
 
+    def compute_activations(self, inputs, weights_unit):
+        """
+        Compute the values of the activation function for all the nodes
+        of a `Unit` at once. Activation functions whose value depends on
+        the whole unit, such as the softmax, override this method.
+
+        :Parameters:
+            inputs : sequence of floats
+                Input data to be treated by the activation function.
+            weights_unit : sequence of sequences of floats
+                Weights of every node of the unit.
+
+        :Returns:
+            sequence of floats : the value of the activation function for
+            every node.
+        """
+        return [self.compute_activation(inputs, weights) for weights in weights_unit]
+
+
     def activation_function(self, x):
         """
         Activation function. 
@@ -158,7 +186,11 @@ class ActivationSigmoid(Activation):
 
 
     def activation_function(self, x):
-        return 1 / (1 + math.exp(-x))
+        # Only exponentiate negative values, which cannot overflow
+        if x >= 0:
+            return 1 / (1 + math.exp(-x))
+        value = math.exp(x)
+        return value / (1 + value)
 
 
     def activation_derivative(self, x):
@@ -170,7 +202,58 @@ class ActivationSigmoid(Activation):
         return ActivationSigmoid()
 
 
+class ActivationSoftmax(Activation):
+    """
+    Softmax activation function, for the output unit of a multi-class
+    network: the outputs of the unit are positive and sum to 1. The
+    largest weighted sum is subtracted before the exponentiation, so that
+    it cannot overflow. To be used with at least two nodes.
+
+    The outputs of the nodes depend on each other, so that the derivative
+    of a single output is not enough to backpropagate an error: the
+    softmax can only be used in the output unit with the er_crossentropy
+    error function, for which the Jacobian cancels out.
+    """
+
+    output_error_function = 'er_crossentropy'
+
+    def __init__(self):
+        Activation.__init__(self)
+        self._set_name("ac_softmax")
+
+
+    def compute_activations(self, inputs, weights_unit):
+        values = [math.fsum(itertools.imap(operator.mul, inputs, weights)) for weights in weights_unit]
+        value_max = max(values)
+        values = [math.exp(value - value_max) for value in values]
+        total = math.fsum(values)
+
+        return [value / total for value in values]
+
+
+    def activation_function(self, x):
+        """
+        The softmax of a single node is always 1.
+        """
+        return 1.0
+
+
+    def activation_derivative(self, x):
+        """
+        Diagonal of the Jacobian of the softmax, expressed with the output
+        value x. It is not used by er_crossentropy, and would give a wrong
+        gradient with any other error function.
+        """
+        return x * (1 - x)
+
+
+    @staticmethod
+    def build_instance():
+        return ActivationSoftmax()
+
+
 # Declare the activation functions to the Factory
 Factory.declare_instance(ActivationLinear())
 Factory.declare_instance(ActivationPerceptron())
 Factory.declare_instance(ActivationSigmoid())
+Factory.declare_instance(ActivationSoftmax())
@@ -0,0 +1,257 @@
+"""
+Training checkpoint module.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful, 
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import re
+import time
+import random
+
+from networkio import NetworkIO_Bundle
+from exception import *
+
+
+class Checkpointer:
+    """
+    Append-only log of the checkpoints of a training process, used by
+    `TrainSimple.train_network` to save the training regularly and to
+    resume it after an interruption. Every checkpoint is a new
+    `NetworkIO_Bundle` file named after the number of learning cycles,
+    holding the weights, the state of the update functions, the state of
+    the random generators, the number of cycles and the last metric value.
+    The files are written under a temporary name, synced and renamed, so
+    that a crash never leaves a partial checkpoint, and a checkpoint that
+    cannot be read is skipped in favor of the previous one.
+
+    :IVariables:
+        __directory : string
+            Directory of the checkpoint files.
+        __prefix : string
+            Prefix of the names of the checkpoint files.
+        __interval_cycles : integer
+            Minimum number of learning cycles between two checkpoints.
+        __interval_seconds : float
+            Minimum number of seconds between two checkpoints.
+        __nb_kept : integer
+            Number of checkpoints kept, or None to keep all of them.
+        __data_filter : `Filter`
+            Filter saved along with the network, or None.
+        __nb_iterations_saved : integer
+            Number of cycles at the last checkpoint.
+        __time_saved : float
+            Time of the last checkpoint.
+    """
+
+    def __init__(self, directory, prefix='checkpoint', interval_cycles=None, interval_seconds=None, nb_kept=None, data_filter=None):
+        """
+        Initializer. If both interval_cycles and interval_seconds are None,
+        a checkpoint is saved every time the network is tested with the
+        `Metric` function. If both are given, a checkpoint is saved as
+        soon as one of them is reached.
+
+        :Parameters:
+            directory : string
+                Directory of the checkpoint files, created if needed.
+            prefix : string
+                Prefix of the names of the checkpoint files.
+            interval_cycles : integer
+                Minimum number of learning cycles between two checkpoints.
+            interval_seconds : float
+                Minimum number of seconds between two checkpoints.
+            nb_kept : integer
+                Number of checkpoints kept, the oldest ones being deleted.
+                If None, all the checkpoints are kept.
+            data_filter : `Filter`
+                Filter saved along with the network.
+
+        :Raises NpyValueError:
+            If nb_kept is lower than 1.
+
+        :Raises NpyStreamError:
+            If the directory cannot be created.
+        """
+        if nb_kept != None and nb_kept < 1:
+            raise NpyValueError, 'nb_kept has to be greater or equal to 1, or equal to None.'
+
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                raise NpyStreamError, 'Unable to create the directory: ' + directory
+
+        self.directory = directory
+        self.prefix = prefix
+        self.interval_cycles = interval_cycles
+        self.interval_seconds = interval_seconds
+        self.nb_kept = nb_kept
+        self.data_filter = data_filter
+        self.nb_iterations_saved = 0
+        self.time_saved = time.time()
+
+
+    def get_filenames(self):
+        """
+        Get the names of the checkpoint files.
+
+        :Returns:
+            sequence of tuples : the number of cycles and the name of every
+            checkpoint file, by increasing number of cycles.
+        """
+        pattern = re.compile('^' + re.escape(self.prefix) + r'-(\d+)\.npyz$')
+        filenames = []
+        for name in os.listdir(self.directory):
+            match = pattern.match(name)
+            if match != None:
+                filenames.append((int(match.group(1)), os.path.join(self.directory, name)))
+
+        filenames.sort()
+        return filenames
+
+
+    def is_due(self, nb_iterations):
+        """
+        Check whether a checkpoint has to be saved.
+
+        :Parameters:
+            nb_iterations : integer
+                Current number of learning cycles.
+
+        :Returns:
+            boolean : True if a checkpoint has to be saved.
+        """
+        if self.interval_cycles == None and self.interval_seconds == None:
+            return True
+
+        if self.interval_cycles != None and nb_iterations - self.nb_iterations_saved >= self.interval_cycles:
+            return True
+
+        if self.interval_seconds != None and time.time() - self.time_saved >= self.interval_seconds:
+            return True
+
+        return False
+
+
+    def save(self, network, nb_iterations, metric_value, data_loader=None, optimizer_state=None):
+        """
+        Save a checkpoint, and delete the oldest ones beyond nb_kept.
+
+        :Parameters:
+            network : `Network`
+                Network being trained.
+            nb_iterations : integer
+                Current number of learning cycles.
+            metric_value
+                Last value of the `Metric` function.
+            data_loader : `DataLoader`
+                `DataLoader` used for the training, of which the random
+                generator is saved, or None.
+            optimizer_state : dictionary
+                Picklable state of the training process itself, for
+                instance the state of a `TrainFullBatch` optimizer.
+
+        :Raises NpyStreamError:
+            If a problem occurs while writing the checkpoint.
+        """
+        training_state = {'nb_iterations': nb_iterations,
+                          'metric_value': metric_value,
+                          'random_state': random.getstate(),
+                          'loader_random_state': None,
+                          'optimizer_state': optimizer_state}
+        if data_loader != None:
+            training_state['loader_random_state'] = data_loader.get_random().getstate()
+
+        filename = os.path.join(self.directory, '%s-%010d.npyz' % (self.prefix, nb_iterations))
+        NetworkIO_Bundle(filename).write(network, self.data_filter, training_state)
+
+        self.nb_iterations_saved = nb_iterations
+        self.time_saved = time.time()
+
+        if self.nb_kept != None:
+            for (nb_iterations_old, filename_old) in self.get_filenames()[:-self.nb_kept]:
+                try:
+                    os.remove(filename_old)
+                except OSError:
+                    pass
+
+
+    def restore(self, network, data_loader=None):
+        """
+        Load the latest readable checkpoint into the network, and restore
+        the state of the random generators.
+
+        :Parameters:
+            network : `Network`
+                Network where to load the checkpoint.
+            data_loader : `DataLoader`
+                `DataLoader` used for the training, of which the random
+                generator is restored, or None.
+
+        :Returns:
+            tuple : the number of cycles, the metric value and the state of
+            the training process of the checkpoint, or None if there is no
+            readable checkpoint. A checkpoint of which the bundle or the
+            training state is invalid is skipped without modifying the
+            network.
+        """
+        fields = ('nb_iterations', 'metric_value', 'random_state', 'loader_random_state', 'optimizer_state')
+        for (nb_iterations, filename) in reversed(self.get_filenames()):
+            bundle = NetworkIO_Bundle(filename)
+            try:
+                training_state = bundle.read_training_state()
+            except NpyStreamError:
+                continue
+
+            # Check the training state before loading the network
+            if not isinstance(training_state, dict) or [field for field in fields if not field in training_state]:
+                continue
+            try:
+                random.Random().setstate(training_state['random_state'])
+                if training_state['loader_random_state'] != None:
+                    random.Random().setstate(training_state['loader_random_state'])
+            except (TypeError, ValueError):
+                continue
+
+            try:
+                bundle.read(network)
+            except NpyStreamError:
+                continue
+
+            random.setstate(training_state['random_state'])
+            if data_loader != None and training_state['loader_random_state'] != None:
+                data_loader.get_random().setstate(training_state['loader_random_state'])
+
+            self.nb_iterations_saved = training_state['nb_iterations']
+            self.time_saved = time.time()
+            return (training_state['nb_iterations'], training_state['metric_value'], training_state['optimizer_state'])
+
+        return None
+
+
+    def clear(self):
+        """
+        Delete all the checkpoints.
+        """
+        for (nb_iterations, filename) in self.get_filenames():
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
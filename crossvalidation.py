@@ -0,0 +1,216 @@
+"""
+Cross-validation module.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful, 
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import math
+import random
+import multiprocessing
+
+from network import Network
+from factory import Factory
+from metric import Metric
+from train import TrainSimple
+from exception import *
+
+
+# Data set shared by the worker processes of a `CrossValidation`. It is
+# set by the initializer of the pool, so that forked workers share the
+# pages of the parent process instead of receiving a copy of the data.
+shared_data = {}
+
+
+def initialize_worker(data_set):
+    """
+    Store the data set shared by the folds in the worker process.
+    """
+    shared_data['data_set'] = data_set
+    shared_data['data_instances'] = data_set.get_data_instances()
+
+
+def train_fold(arguments):
+    """
+    Train and evaluate the network of one fold. This function is run by
+    the worker processes of `CrossValidation.run`.
+
+    :Parameters:
+        arguments : tuple
+            The index of the fold, the seed of the fold, the topology, the
+            name of the label function, the positions of the training and
+            testing instances, and the parameters of
+            `TrainSimple.train_network`.
+
+    :Returns:
+        tuple : the index of the fold, the number of iterations, and the
+        metric values on the training and testing instances.
+    """
+    (index_fold, seed, topology, name_label_function, positions_train, positions_test, name_metric_function, metric_value_min, nb_iterations_max, interval_check) = arguments
+
+    data_set = shared_data['data_set']
+    data_instances = shared_data['data_instances']
+    ds_train = data_set.subset(positions_train, data_instances)
+    ds_test = data_set.subset(positions_test, data_instances)
+
+    # The initial weights are drawn from the global random generator,
+    # which forked workers would otherwise share
+    random.seed(seed)
+
+    network = Network()
+    network.set_topology(topology)
+    network.label_function = name_label_function
+
+    trainer = TrainSimple()
+    nb_iterations = trainer.train_network(network, ds_train, name_metric_function, metric_value_min, nb_iterations_max, interval_check)
+
+    metric_function = Factory.build_instance_by_name(name_metric_function)
+    metric_train = metric_function.compute_metric(ds_train, network.classify_data_set(ds_train))
+    metric_test = metric_function.compute_metric(ds_test, network.classify_data_set(ds_test))
+
+    return (index_fold, nb_iterations, metric_train, metric_test)
+
+
+
+class CrossValidation:
+    """
+    K-fold cross-validation of a `Network` topology. One network is trained
+    per fold with `TrainSimple`, the folds being processed in parallel by
+    a pool of processes.
+
+    :IVariables:
+        topology : dictionary
+            Topology of the networks, in the format of
+            `Network.set_topology`.
+        name_label_function : string
+            Name of the `Label` function of the networks.
+        nb_processes : integer
+            Number of worker processes.
+    """
+
+    def __init__(self, topology, name_label_function='la_max', nb_processes=None):
+        """
+        Initializer
+
+        :Parameters:
+            topology : dictionary
+                Topology of the networks, in the format of
+                `Network.set_topology`.
+            name_label_function : string
+                Name of the `Label` function of the networks.
+            nb_processes : integer
+                Number of worker processes. If None, the number of CPUs is
+                used. If 1, the folds are processed in the current process.
+
+        :Raises NpyValueError:
+            If nb_processes is lower than 1.
+        """
+        if nb_processes == None:
+            nb_processes = multiprocessing.cpu_count()
+
+        if nb_processes < 1:
+            raise NpyValueError, 'nb_processes has to be greater or equal to 1.'
+
+        self.topology = topology
+        self.name_label_function = name_label_function
+        self.nb_processes = nb_processes
+
+
+    def run(self, data_set, nb_folds, name_metric_function, metric_value_min, nb_iterations_max=10000, interval_check=100, stratified=False, seed=None):
+        """
+        Run the cross-validation on a `DataSet`.
+
+        :Parameters:
+            data_set : `DataSet`
+                Numerized data set.
+            nb_folds : integer
+                Number of folds.
+            name_metric_function : string
+                Name of the `Metric` function used to train and evaluate
+                the networks.
+            metric_value_min
+                Value of the metric at which the training of a network is
+                stopped.
+            nb_iterations_max : integer
+                Maximum number of iterations per network.
+            interval_check : integer
+                Interval of learning cycles at which the networks are tested.
+            stratified : boolean
+                Spread the instances of every label evenly among the folds.
+            seed
+                Seed of the random generators used for the folds and for the
+                initial weights of the networks.
+
+        :Returns:
+            dictionary : with the keys 'nb_iterations', 'metric_train' and
+            'metric_test' holding the values of every fold, and
+            'metric_test_mean' and 'metric_test_variance' holding the mean
+            and the sample variance of the testing metric values.
+
+        :Raises NpyDataTypeError:
+            If data_set has not been numerized.
+
+        :Raises NpyTransferFunctionError:
+            If name_metric_function does not correspond to a metric function.
+
+        :Raises NpyValueError:
+            If nb_folds is lower than 2.
+        """
+        if data_set.is_numerized == False:
+            raise NpyDataTypeError, 'data_set must be numerized first.'
+
+        Factory.check_prefix(name_metric_function, Metric.prefix)
+        Factory.build_instance_by_name(name_metric_function)
+
+        folds = data_set.get_fold_positions(nb_folds, stratified, seed)
+        generator = random.Random(seed)
+
+        arguments = []
+        for index_fold, positions_test in enumerate(folds):
+            positions_train = []
+            for index_other, fold in enumerate(folds):
+                if index_other != index_fold:
+                    positions_train.extend(fold)
+            positions_train.sort()
+            arguments.append((index_fold, generator.random(), self.topology, self.name_label_function, positions_train, positions_test, name_metric_function, metric_value_min, nb_iterations_max, interval_check))
+
+        if self.nb_processes == 1:
+            initialize_worker(data_set)
+            try:
+                results = map(train_fold, arguments)
+            finally:
+                shared_data.clear()
+        else:
+            pool = multiprocessing.Pool(min(self.nb_processes, nb_folds), initialize_worker, (data_set,))
+            try:
+                results = pool.map(train_fold, arguments)
+            finally:
+                pool.terminate()
+                pool.join()
+
+        results.sort()
+        metric_test = [result[3] for result in results]
+        mean = math.fsum(metric_test) / len(metric_test)
+        variance = math.fsum([(value - mean) ** 2 for value in metric_test]) / (len(metric_test) - 1)
+
+        return {'nb_iterations': [result[1] for result in results],
+                'metric_train': [result[2] for result in results],
+                'metric_test': metric_test,
+                'metric_test_mean': mean,
+                'metric_test_variance': variance}
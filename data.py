@@ -21,9 +21,179 @@ __docformat__ = "restructuredtext en"
 ## along with npy.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import os
+import mmap
+import struct
+import array
+import random
+
 from exception import *
 
 
+class SamplingMixin:
+    """
+    Mixin class that provides the `DataSet` classes with index-based
+    sampling: subsets, train/test splits and k-fold cross-validation.
+    The samples are `DataSetView` that share the storage of the sampled
+    `DataSet`, which must not be modified while they are in use.
+    """
+
+    def subset(self, positions, data_instances=None):
+        """
+        Build a view on some of the instances of the current `DataSet`.
+
+        :Parameters:
+            positions : sequence of integers
+                Positions of the instances in the sequence returned by
+                get_data_instances().
+            data_instances : sequence of `DataInstance`
+                Sequence returned by get_data_instances(), to be shared by
+                several views. If None, it is retrieved.
+
+        :Returns:
+            `DataSetView` : the view on the instances.
+        """
+        if data_instances == None:
+            data_instances = self.get_data_instances()
+        return DataSetView(self, data_instances, positions)
+
+
+    def _get_positions_by_label(self):
+        """
+        Group the positions of the instances by label.
+
+        :Returns:
+            dictionary : associates each label to the sequence of
+            the positions of its instances.
+        """
+        positions = {}
+        for position, data_instance in enumerate(self.get_data_instances()):
+            positions.setdefault(data_instance.get_label_number(), []).append(position)
+        return positions
+
+
+    def __get_groups(self, stratified, generator):
+        """
+        Get the shuffled groups of positions to sample from: one group per
+        label if stratified, a single group otherwise.
+        """
+        if stratified:
+            groups = [positions for label, positions in sorted(self._get_positions_by_label().items())]
+        else:
+            groups = [range(self.get_nb_data_instances())]
+
+        for positions in groups:
+            generator.shuffle(positions)
+        return groups
+
+
+    def split(self, ratio=0.8, stratified=False, seed=None):
+        """
+        Split the instances randomly into two views.
+
+        :Parameters:
+            ratio : float
+                Proportion of the instances that go into the first view.
+            stratified : boolean
+                If True, the proportion is applied to every label, so that
+                the labels have the same distribution in both views.
+            seed
+                Seed of the random generator.
+
+        :Returns:
+            tuple : the two `DataSetView`.
+
+        :Raises NpyValueError:
+            If ratio is not between 0 and 1.
+        """
+        if ratio < 0 or ratio > 1:
+            raise NpyValueError, 'ratio has to be between 0 and 1.'
+
+        generator = random.Random(seed)
+        positions_first = []
+        positions_second = []
+        for positions in self.__get_groups(stratified, generator):
+            nb_first = int(round(len(positions) * ratio))
+            positions_first.extend(positions[:nb_first])
+            positions_second.extend(positions[nb_first:])
+
+        positions_first.sort()
+        positions_second.sort()
+        data_instances = self.get_data_instances()
+        return (self.subset(positions_first, data_instances), self.subset(positions_second, data_instances))
+
+
+    def get_fold_positions(self, nb_folds, stratified=False, seed=None):
+        """
+        Split the positions of the instances randomly into nb_folds folds.
+
+        :Parameters:
+            nb_folds : integer
+                Number of folds.
+            stratified : boolean
+                If True, the instances of every label are spread evenly
+                among the folds.
+            seed
+                Seed of the random generator.
+
+        :Returns:
+            sequence of sequences of integers : the positions of the
+            instances of every fold.
+
+        :Raises NpyValueError:
+            If nb_folds is lower than 2.
+        """
+        if nb_folds < 2:
+            raise NpyValueError, 'nb_folds has to be greater or equal to 2.'
+
+        generator = random.Random(seed)
+        folds = [[] for i in range(nb_folds)]
+        index_fold = 0
+        for positions in self.__get_groups(stratified, generator):
+            for position in positions:
+                folds[index_fold].append(position)
+                index_fold = (index_fold + 1) % nb_folds
+
+        for fold in folds:
+            fold.sort()
+        return folds
+
+
+    def iter_folds(self, nb_folds, stratified=False, seed=None):
+        """
+        Split the instances randomly into nb_folds folds, and iterate over
+        the cross-validation pairs.
+
+        :Parameters:
+            nb_folds : integer
+                Number of folds.
+            stratified : boolean
+                If True, the instances of every label are spread evenly
+                among the folds.
+            seed
+                Seed of the random generator.
+
+        :Returns:
+            generator : for every fold, a tuple of the `DataSetView` on the
+            other folds, for training, and of the `DataSetView` on the fold,
+            for testing.
+
+        :Raises NpyValueError:
+            If nb_folds is lower than 2.
+        """
+        folds = self.get_fold_positions(nb_folds, stratified, seed)
+
+        data_instances = self.get_data_instances()
+        for index_fold in range(nb_folds):
+            positions_train = []
+            for index_other, fold in enumerate(folds):
+                if index_other != index_fold:
+                    positions_train.extend(fold)
+            positions_train.sort()
+            yield (self.subset(positions_train, data_instances), self.subset(folds[index_fold], data_instances))
+
+
+
 class DataInstance:
     """
     Represents an data_instance of data, and includes all the information
@@ -61,7 +231,7 @@ class DataInstance:
 
 
 
-class DataSet:
+class DataSet(SamplingMixin):
     """
     Organizes data_instances into a collection, so that they can be treated
     all together.
@@ -170,6 +340,10 @@ class DataSet:
         return data
 
 
+    def get_nb_data_instances(self):
+        return len(self.data_instances)
+
+
     def set_name_attribute(self, name_attribute):
         self.name_attribute = tuple(name_attribute)
 
@@ -183,6 +357,708 @@ class DataSet:
         
 
 
+class DataInstanceSequence:
+    """
+    Read-only sequence of the `DataInstance` of a `DataSet` that stores
+    its data outside of Python objects. The `DataInstance` are built
+    one at a time when they are accessed, so that iterating over the
+    sequence never holds more than one of them in memory.
+
+    :IVariables:
+        __data_set : `DataSet`
+            `DataSet` providing the get_nb_data_instances() and
+            get_data_instance_at() methods.
+    """
+
+    def __init__(self, data_set):
+        """
+        Initializer
+
+        :Parameters:
+            data_set : `DataSet`
+                `DataSet` of which the `DataInstance` are accessed.
+        """
+        self.data_set = data_set
+
+
+    def __len__(self):
+        return self.data_set.get_nb_data_instances()
+
+
+    def __getitem__(self, position):
+        nb_data_instances = len(self)
+        if position < 0:
+            position += nb_data_instances
+        if position < 0 or position >= nb_data_instances:
+            raise IndexError, 'DataInstanceSequence index out of range'
+
+        return self.data_set.get_data_instance_at(position)
+
+
+    def __iter__(self):
+        for position in xrange(len(self)):
+            yield self.data_set.get_data_instance_at(position)
+
+
+
+class DataSetMapped(SamplingMixin):
+    """
+    Numerized `DataSet` stored in a binary file which is memory-mapped
+    instead of being loaded into Python objects, so that data sets larger
+    than the physical memory can be used. The file is mapped read-only,
+    which allows several processes to share its pages through the page
+    cache of the operating system.
+
+    The file starts with a header holding the number of instances, the
+    number of attributes and the attribute names, followed by one fixed
+    size record per instance: the index number as a 64-bit integer, then
+    the label and the attributes as 64-bit floats, all little-endian.
+    Missing values (None) are stored as NaN.
+
+    :IVariables:
+        __filename : string
+            Name of the mapped file.
+        __map : `mmap.mmap`
+            Read-only memory map of the file.
+        __name_attribute : tuple
+            Sequence of the names of the attributes.
+        __nb_data_instances : integer
+            Number of `DataInstance` in the file.
+        __record : `struct.Struct`
+            Structure used to decode one instance record.
+        __offset_records : integer
+            Offset of the first instance record in the file.
+        __positions : dictionary
+            Associates the index numbers to the record positions. Only
+            built when get_data_instance_by_id() is called.
+        is_numerized : boolean
+            Always true, since only numerized data can be mapped.
+    """
+
+    magic = 'NPYD'
+    version = 1
+    header = struct.Struct('<4sHqq')
+    length = struct.Struct('<I')
+
+    def __init__(self, filename):
+        """
+        Initializer. Maps the given file in memory.
+
+        :Parameters:
+            filename : string
+                Name of a file created with `DataSetMapped.write`.
+
+        :Raises NpyStreamError:
+            If the file cannot be read or is not a valid mapped data set.
+        """
+        self.filename = filename
+        self.is_numerized = True
+        self.positions = None
+        self.__open()
+
+
+    def __open(self):
+        string_error = 'Unable to map the file: ' + self.filename
+        try:
+            stream = open(self.filename, 'rb')
+            try:
+                self.map = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            finally:
+                stream.close()
+        except (IOError, EnvironmentError, ValueError):
+            raise NpyStreamError, string_error
+
+        try:
+            (magic, version, nb_data_instances, nb_attributes) = DataSetMapped.header.unpack_from(self.map, 0)
+            if magic != DataSetMapped.magic or version != DataSetMapped.version \
+               or nb_data_instances < 0 or nb_attributes < 0:
+                raise NpyStreamError, string_error
+
+            offset = DataSetMapped.header.size
+            name_attribute = []
+            for i in range(nb_attributes):
+                (length,) = DataSetMapped.length.unpack_from(self.map, offset)
+                offset += DataSetMapped.length.size
+                if offset + length > len(self.map):
+                    raise NpyStreamError, string_error
+                name_attribute.append(self.map[offset:offset + length])
+                offset += length
+        except struct.error:
+            self.map.close()
+            raise NpyStreamError, string_error
+        except NpyStreamError:
+            self.map.close()
+            raise
+
+        # The records have to fill the rest of the file exactly
+        record = DataSetMapped.build_record(nb_attributes)
+        if len(self.map) != offset + nb_data_instances * record.size:
+            self.map.close()
+            raise NpyStreamError, 'Truncated or corrupted mapped data set: ' + self.filename
+
+        self.name_attribute = tuple(name_attribute)
+        self.nb_data_instances = nb_data_instances
+        self.record = record
+        self.offset_records = offset
+
+
+    def __getstate__(self):
+        # Only the file name is sent to other processes, which map the
+        # file again and thus share the same pages.
+        return {'filename': self.filename}
+
+
+    def __setstate__(self, state):
+        self.filename = state['filename']
+        self.is_numerized = True
+        self.positions = None
+        self.__open()
+
+
+    def close(self):
+        """
+        Unmap the file. The `DataSetMapped` cannot be used afterwards.
+        """
+        self.map.close()
+
+
+    @staticmethod
+    def build_record(nb_attributes):
+        return struct.Struct('<qd' + 'd' * nb_attributes)
+
+
+    @staticmethod
+    def write(filename, data_set):
+        """
+        Write a numerized `DataSet` into a file that can be mapped by
+        `DataSetMapped`.
+
+        :Parameters:
+            filename : string
+                Name of the file to create.
+            data_set : `DataSet`
+                Numerized `DataSet` to write.
+
+        :Raises NpyDataTypeError:
+            If data_set has not been numerized.
+
+        :Raises NpyStreamError:
+            If a problem occurs while writing the file.
+        """
+        if data_set.is_numerized == False:
+            raise NpyDataTypeError, 'data_set must be numerized first.'
+
+        DataSetMapped.write_instances(filename, data_set.get_name_attribute(), data_set.get_data_instances())
+
+
+    @staticmethod
+    def write_instances(filename, name_attribute, data_instances):
+        """
+        Write numerized `DataInstance` into a file that can be mapped by
+        `DataSetMapped`. The instances are written as they are read from
+        data_instances, which can thus be any iterable, including
+        a generator. The index numbers are stored as 64-bit integers, so
+        they have to be integers: other index numbers, such as the strings
+        read from a CSV file, are rejected rather than converted, and have
+        to be converted beforehand. If the writing fails, the partial file
+        is removed.
+
+        :Parameters:
+            filename : string
+                Name of the file to create.
+            name_attribute : sequence of strings
+                Names of the attributes.
+            data_instances : iterable of `DataInstance`
+                Numerized instances to write.
+
+        :Raises NpyDataTypeError:
+            If an index number is not an integer, or if a value is not
+            a number.
+
+        :Raises NpyStreamError:
+            If a problem occurs while writing the file.
+        """
+        string_error = 'Unable to write the file: ' + filename
+        record = DataSetMapped.build_record(len(name_attribute))
+        nan = float('nan')
+
+        try:
+            stream = open(filename, 'wb')
+        except IOError:
+            raise NpyStreamError, string_error
+
+        written = False
+        try:
+            try:
+                stream.write(DataSetMapped.header.pack(DataSetMapped.magic, DataSetMapped.version, 0, len(name_attribute)))
+                for name in name_attribute:
+                    name = str(name)
+                    stream.write(DataSetMapped.length.pack(len(name)))
+                    stream.write(name)
+
+                nb_data_instances = 0
+                for data_instance in data_instances:
+                    index_number = data_instance.get_index_number()
+                    if not isinstance(index_number, (int, long)) or isinstance(index_number, bool):
+                        raise NpyDataTypeError, 'Only instances with integer index numbers can be mapped, got: %r.' % (index_number,)
+
+                    values = []
+                    for value in data_instance.get_attributes():
+                        if value == None:
+                            value = nan
+                        values.append(value)
+
+                    label = data_instance.get_label_number()
+                    if label == None:
+                        label = nan
+
+                    try:
+                        stream.write(record.pack(index_number, label, *values))
+                    except (struct.error, ValueError, TypeError):
+                        raise NpyDataTypeError, 'Only numerized instances can be mapped.'
+                    nb_data_instances += 1
+
+                # The number of instances is only known at the end
+                stream.seek(struct.calcsize('<4sH'))
+                stream.write(struct.pack('<q', nb_data_instances))
+                written = True
+            except IOError:
+                raise NpyStreamError, string_error
+        finally:
+            stream.close()
+            if not written:
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+
+
+    def get_data_instance_at(self, position):
+        """
+        Get the `DataInstance` stored at a given position in the file.
+
+        :Parameters:
+            position : integer
+                Position of the record, between 0 and
+                get_nb_data_instances() - 1.
+
+        :Returns:
+            `DataInstance` : a new instance built from the record.
+        """
+        values = self.record.unpack_from(self.map, self.offset_records + position * self.record.size)
+
+        attributes = []
+        for value in values[2:]:
+            if value != value:
+                value = None
+            attributes.append(value)
+
+        label = values[1]
+        if label != label:
+            label = None
+        elif label == int(label):
+            label = int(label)
+
+        return DataInstance(values[0], attributes, label)
+
+
+    def get_data_instance_by_id(self, index_number):
+        """
+        Get an data_instance from the `DataSetMapped` from its index_number.
+        The first call scans the whole file to index the records.
+
+        :Parameters:
+            index_number : integer
+               Id number of the data_instance to be retrieved.
+
+        :Returns:
+            The data_instance of which the id number has been passed.
+            Returns None if no `Instance` has the given index_number in
+            the `DataSetMapped`.
+        """
+        if self.positions == None:
+            positions = {}
+            index_struct = struct.Struct('<q')
+            for position in xrange(self.nb_data_instances):
+                offset = self.offset_records + position * self.record.size
+                positions[index_struct.unpack_from(self.map, offset)[0]] = position
+            self.positions = positions
+
+        if not index_number in self.positions:
+            return None
+
+        return self.get_data_instance_at(self.positions[index_number])
+
+
+    def get_data_instances(self):
+        """
+        Get a sequence of the `DataInstance` contained in this `DataSetMapped`.
+        The instances are read from the file in their storage order when
+        the sequence is iterated.
+
+        :Returns:
+            `DataInstanceSequence` : lazy sequence of the `DataInstance`.
+        """
+        return DataInstanceSequence(self)
+
+
+    def get_nb_data_instances(self):
+        return self.nb_data_instances
+
+
+    def add_data_instance(self, index_number, attributes, label_number):
+        """
+        :Raises NpyDataTypeError:
+            Always, since a `DataSetMapped` is read-only.
+        """
+        raise NpyDataTypeError, 'A DataSetMapped is read-only.'
+
+
+    def get_name_attribute(self):
+        return self.name_attribute
+
+
+    def get_nb_attributes(self):
+        return len(self.name_attribute)
+
+
+
+class DataSetColumnar(SamplingMixin):
+    """
+    Numerized `DataSet` storing each attribute as a column in an array of
+    floats instead of one tuple per instance, which keeps a single compact
+    copy of the data and gives direct access to whole columns. Missing
+    values (None) are stored as NaN.
+
+    :IVariables:
+        __index_numbers : sequence
+            Index numbers of the instances, in insertion order.
+        __positions : dictionary
+            Associates the index numbers to the positions of the instances.
+        __labels : sequence of numbers
+            Labels of the instances.
+        __columns : sequence of arrays
+            One array of floats per attribute.
+        __name_attribute : tuple
+            Sequence of the names of the attributes.
+        is_numerized : boolean
+            Always true, since the attributes are stored as floats.
+    """
+
+    nan = float('nan')
+
+    def __init__(self, name_attribute=()):
+        """
+        Initializer.
+
+        :Parameters:
+            name_attribute : sequence of strings
+                Names of the attributes.
+        """
+        self.index_numbers = []
+        self.positions = {}
+        self.labels = []
+        self.columns = []
+        self.name_attribute = ()
+        self.is_numerized = True
+        self.set_name_attribute(name_attribute)
+
+
+    def add_data_instance_object(self, data_instance):
+        """
+        Add a `DataInstance` into the `DataSetColumnar`. Only its values
+        are stored, not the `DataInstance` itself.
+
+        :Parameters:
+            data_instance : `DataInstance`
+                `DataInstance` to add to the `DataSetColumnar`.
+
+        :Raises NpyIndexError:
+            If the `DataInstance` index already exists in the `DataSetColumnar`.
+
+        :Raises NpyValueError:
+            If the number of attributes is not the one of the `DataSetColumnar`.
+        """
+        self.add_data_instance(data_instance.get_index_number(), data_instance.get_attributes(), data_instance.get_label_number())
+
+
+    def add_data_instance(self, index_number, attributes, label_number):
+        """
+        Add an instance into the `DataSetColumnar`.
+            
+        :Parameters:
+            index_number : integer
+                Id number for this data_instance.
+            attributes : sequence of floats
+                Attributes to be used as inputs.
+            label_number : integer 
+                Value of the label given to the data_instance.
+
+        :Raises NpyIndexError:
+            If the index already exists in the `DataSetColumnar`.
+
+        :Raises NpyValueError:
+            If the number of attributes is not the one of the `DataSetColumnar`.
+        """
+        if index_number in self.positions:
+            raise NpyIndexError, 'Index already exists in the DataSet'
+
+        if len(attributes) != len(self.columns):
+            raise NpyValueError, 'The number of attributes is invalid.'
+
+        for column, value in zip(self.columns, attributes):
+            if value == None:
+                value = DataSetColumnar.nan
+            column.append(value)
+
+        self.positions[index_number] = len(self.index_numbers)
+        self.index_numbers.append(index_number)
+        self.labels.append(label_number)
+
+
+    def get_data_instance_at(self, position):
+        """
+        Get the `DataInstance` stored at a given position.
+
+        :Parameters:
+            position : integer
+                Position of the instance, between 0 and
+                get_nb_data_instances() - 1.
+
+        :Returns:
+            `DataInstance` : a new instance built from the columns.
+        """
+        attributes = []
+        for column in self.columns:
+            value = column[position]
+            if value != value:
+                value = None
+            attributes.append(value)
+
+        return DataInstance(self.index_numbers[position], attributes, self.labels[position])
+
+
+    def get_data_instance_by_id(self, index_number):
+        """
+        Get an data_instance from the `DataSetColumnar` from its index_number.
+
+        :Parameters:
+            index_number : integer
+               Id number of the data_instance to be retrieved.
+
+        :Returns:
+            The data_instance of which the id number has been passed.
+            Returns None if no `Instance` has the given index_number in
+            the `DataSetColumnar`.
+        """
+        if not index_number in self.positions:
+            return None
+
+        return self.get_data_instance_at(self.positions[index_number])
+
+
+    def get_data_instances(self):
+        """
+        Get a sequence of the `DataInstance` contained in this `DataSetColumnar`.
+
+        :Returns:
+            `DataInstanceSequence` : lazy sequence of the `DataInstance`.
+        """
+        return DataInstanceSequence(self)
+
+
+    def get_nb_data_instances(self):
+        return len(self.index_numbers)
+
+
+    def get_column(self, index_attribute):
+        """
+        Get all the values of an attribute.
+
+        :Parameters:
+            index_attribute : integer
+                Index of the attribute.
+
+        :Returns:
+            array of floats : the column of the attribute. It is the storage
+            of the `DataSetColumnar` itself, not a copy.
+        """
+        return self.columns[index_attribute]
+
+
+    def get_labels(self):
+        return self.labels
+
+
+    def _get_positions_by_label(self):
+        positions = {}
+        for position, label in enumerate(self.labels):
+            positions.setdefault(label, []).append(position)
+        return positions
+
+
+    def get_index_numbers(self):
+        return self.index_numbers
+
+
+    def derive(self, name_attribute, columns):
+        """
+        Build a `DataSetColumnar` holding the same instances as the current
+        one, but with other attribute columns. The index numbers and the
+        labels are shared with the current `DataSetColumnar`, so that no
+        instance must be added to any of them afterwards.
+
+        :Parameters:
+            name_attribute : sequence of strings
+                Names of the attributes of the new `DataSetColumnar`.
+            columns : sequence of arrays of floats
+                One column per attribute, with one value per instance.
+
+        :Returns:
+            `DataSetColumnar` : the new data set.
+
+        :Raises NpyValueError:
+            If the numbers of columns or of values are invalid.
+        """
+        if len(name_attribute) != len(columns):
+            raise NpyValueError, 'The number of columns is invalid.'
+
+        for column in columns:
+            if len(column) != len(self.index_numbers):
+                raise NpyValueError, 'The number of values in a column is invalid.'
+
+        data_set = DataSetColumnar(name_attribute)
+        data_set.index_numbers = self.index_numbers
+        data_set.positions = self.positions
+        data_set.labels = self.labels
+        data_set.columns = list(columns)
+        return data_set
+
+
+    def set_name_attribute(self, name_attribute):
+        """
+        Set the names of the attributes. The columns are created at the
+        first call, when the `DataSetColumnar` is still empty.
+
+        :Raises NpyValueError:
+            If the number of attributes changes after instances were added.
+        """
+        name_attribute = tuple(name_attribute)
+        if len(self.index_numbers) > 0 and len(name_attribute) != len(self.columns):
+            raise NpyValueError, 'The number of attributes cannot change once instances are added.'
+
+        if len(self.index_numbers) == 0:
+            self.columns = [array.array('d') for name in name_attribute]
+        self.name_attribute = name_attribute
+
+
+    def get_name_attribute(self):
+        return self.name_attribute
+
+
+    def get_nb_attributes(self):
+        return len(self.name_attribute)
+
+
+class DataSetView(SamplingMixin):
+    """
+    Read-only view on some of the instances of a `DataSet`, identified by
+    their positions. The instances are not copied: they are read from the
+    viewed `DataSet` when they are accessed.
+
+    :IVariables:
+        __data_set : `DataSet`
+            Viewed `DataSet`.
+        __data_instances : sequence of `DataInstance`
+            Instances of the viewed `DataSet`, as returned by its
+            get_data_instances() method.
+        __positions : array of integers
+            Positions of the instances of the view in __data_instances.
+        __index_positions : dictionary
+            Associates the index numbers to the positions in the view.
+            Only built when get_data_instance_by_id() is called.
+        is_numerized : boolean
+            Numerized state of the viewed `DataSet`.
+    """
+
+    def __init__(self, data_set, data_instances, positions):
+        """
+        Initializer.
+
+        :Parameters:
+            data_set : `DataSet`
+                Viewed `DataSet`.
+            data_instances : sequence of `DataInstance`
+                Instances of data_set, as returned by get_data_instances().
+            positions : sequence of integers
+                Positions of the instances of the view in data_instances.
+        """
+        self.data_set = data_set
+        self.data_instances = data_instances
+        self.positions = array.array('l', positions)
+        self.index_positions = None
+        self.is_numerized = data_set.is_numerized
+
+
+    def subset(self, positions, data_instances=None):
+        """
+        Build a view on some of the instances of the current view. The new
+        view directly refers to the viewed `DataSet`.
+        """
+        return DataSetView(self.data_set, self.data_instances, [self.positions[position] for position in positions])
+
+
+    def get_data_instance_at(self, position):
+        return self.data_instances[self.positions[position]]
+
+
+    def get_data_instance_by_id(self, index_number):
+        """
+        Get an data_instance from the `DataSetView` from its index_number.
+        The first call reads all the instances of the view to index them.
+
+        :Returns:
+            The data_instance of which the id number has been passed.
+            Returns None if no `Instance` has the given index_number in
+            the `DataSetView`.
+        """
+        if self.index_positions == None:
+            index_positions = {}
+            for position, data_instance in enumerate(self.get_data_instances()):
+                index_positions[data_instance.get_index_number()] = position
+            self.index_positions = index_positions
+
+        if not index_number in self.index_positions:
+            return None
+
+        return self.get_data_instance_at(self.index_positions[index_number])
+
+
+    def get_data_instances(self):
+        return DataInstanceSequence(self)
+
+
+    def get_nb_data_instances(self):
+        return len(self.positions)
+
+
+    def add_data_instance(self, index_number, attributes, label_number):
+        """
+        :Raises NpyDataTypeError:
+            Always, since a `DataSetView` is read-only.
+        """
+        raise NpyDataTypeError, 'A DataSetView is read-only.'
+
+
+    def get_name_attribute(self):
+        return self.data_set.get_name_attribute()
+
+
+    def get_nb_attributes(self):
+        return self.data_set.get_nb_attributes()
+
+
+
 class DataLabel:
     """
     This class contains the id of an data_instance in a data set, along with
@@ -214,18 +1090,130 @@ class DataLabel:
 
 
 
+class DataLabelSequence:
+    """
+    Read-only sequence of the `DataLabel` of a `DataClassification`. The
+    `DataLabel` are built one at a time when they are accessed.
+
+    :IVariables:
+        __data_classification : `DataClassification`
+            `DataClassification` of which the `DataLabel` are accessed.
+    """
+
+    def __init__(self, data_classification):
+        """
+        Initializer
+
+        :Parameters:
+            data_classification : `DataClassification`
+                `DataClassification` of which the `DataLabel` are accessed.
+        """
+        self.data_classification = data_classification
+
+
+    def __len__(self):
+        return self.data_classification.get_nb_data_labels()
+
+
+    def __getitem__(self, position):
+        nb_data_labels = len(self)
+        if position < 0:
+            position += nb_data_labels
+        if position < 0 or position >= nb_data_labels:
+            raise IndexError, 'DataLabelSequence index out of range'
+
+        return self.data_classification.get_data_label_at(position)
+
+
+    def __iter__(self):
+        for position in xrange(len(self)):
+            yield self.data_classification.get_data_label_at(position)
+
+
+
 class DataClassification:
     """
     Organizes `DataLabel` into a classification, so that
     they can be treated all together.
+
+    The labels are not stored as `DataLabel` objects: the classification
+    holds the classified instances, their index numbers and an array of
+    label numbers, and the `DataLabel` are built when they are accessed.
+    Label numbers are therefore integers, as given by the `Label`
+    functions: floats holding an integral value are converted, and any
+    other value is rejected.
+
+    :IVariables:
+        __data_instances : sequence of `DataInstance`
+            Classified instances.
+        __index_numbers : list
+            Index numbers of the classified instances.
+        __label_numbers : array of integers
+            Label numbers given to the classified instances.
+        __positions : dictionary
+            Associates the index numbers to the positions in the
+            classification. Only built when an instance is looked up by
+            its index number.
     """
 
-    def __init__(self):
+    def __init__(self, data_instances=None, label_numbers=None, index_numbers=None):
         """
-        Initializer
+        Initializer. The classification can be filled at once by passing
+        the classified instances and their labels, in which case the index
+        numbers of the instances are expected to be unique, as they are in
+        a `DataSet`.
+
+        :Parameters:
+            data_instances : sequence of `DataInstance`
+                Classified instances. The sequence is kept as is.
+            label_numbers : sequence of integers
+                Label numbers given to data_instances, in the same order.
+            index_numbers : list
+                Index numbers of data_instances, in the same order. If None,
+                they are read from data_instances.
+
+        :Raises NpyValueError:
+            If data_instances, label_numbers and index_numbers have
+            different lengths, or if a label number is not an integer.
         """
+        if data_instances == None:
+            data_instances = []
+            label_numbers = []
 
-        self.data_labels = {}
+        if index_numbers == None:
+            index_numbers = [data_instance.get_index_number() for data_instance in data_instances]
+
+        if not isinstance(label_numbers, (list, tuple, array.array)):
+            label_numbers = list(label_numbers)
+
+        try:
+            self.label_numbers = array.array('l', label_numbers)
+        except (TypeError, OverflowError):
+            self.label_numbers = array.array('l')
+            for label_number in label_numbers:
+                self.__append_label_number(label_number)
+        if len(data_instances) != len(self.label_numbers) or len(data_instances) != len(index_numbers):
+            raise NpyValueError, 'data_instances, label_numbers and index_numbers must have the same length.'
+
+        self.data_instances = data_instances
+        self.index_numbers = index_numbers
+        self.positions = None
+
+
+    def __append_label_number(self, label_number):
+        """
+        Append a label number to the array of label numbers, converting
+        the floats holding an integral value.
+
+        :Raises NpyValueError:
+            If the label number is not an integer.
+        """
+        try:
+            if isinstance(label_number, float) and label_number == int(label_number):
+                label_number = int(label_number)
+            self.label_numbers.append(label_number)
+        except (TypeError, ValueError, OverflowError):
+            raise NpyValueError, 'Label numbers must be integers, got: %r.' % (label_number,)
 
 
     def add_data_label_object(self, data_label):
@@ -240,12 +1228,7 @@ class DataClassification:
         :Raises NpyIndexError:
             If the index already exists in the `DataClassification`.
         """
-
-        data_instance = data_label.get_data_instance()
-        if data_instance.get_index_number() in self.data_labels:
-            raise NpyIndexError, 'Index already exists in the DataClassification'
-
-        self.data_labels[data_instance.get_index_number()] = data_label
+        self.add_data_label(data_label.get_data_instance(), data_label.get_label_number())
 
 
     def add_data_label(self, data_instance, label_number):
@@ -261,13 +1244,42 @@ class DataClassification:
 
         :Raises NpyIndexError:
             If the index already exists in the `DataClassification`.
+
+        :Raises NpyValueError:
+            If label_number is not an integer.
         """
-        data_label = DataLabel(data_instance, label_number)
+        index_number = data_instance.get_index_number()
+        if index_number in self.get_positions():
+            raise NpyIndexError, 'Index already exists in the DataClassification'
 
-        try:
-            self.add_data_label_object(data_label)
-        except NpyIndexError, e:
-            raise NpyIndexError, e.msg
+        self.__append_label_number(label_number)
+
+        if not isinstance(self.data_instances, list):
+            self.data_instances = list(self.data_instances)
+
+        self.positions[index_number] = len(self.index_numbers)
+        self.data_instances.append(data_instance)
+        self.index_numbers.append(index_number)
+
+
+    def get_positions(self):
+        """
+        Get the positions of the labels in the classification.
+
+        :Returns:
+            dictionary : associates the index numbers to the positions.
+        """
+        if self.positions == None:
+            positions = {}
+            for position, index_number in enumerate(self.index_numbers):
+                positions[index_number] = position
+            self.positions = positions
+
+        return self.positions
+
+
+    def get_data_label_at(self, position):
+        return DataLabel(self.data_instances[position], self.label_numbers[position])
 
 
     def get_data_label_by_id(self, index_label):
@@ -283,11 +1295,31 @@ class DataClassification:
             Returns None if no `DataLabel` has the given index_label in
             the `DataClassification`.
         """
-        
-        if not index_label in self.data_labels:
+        position = self.get_positions().get(index_label)
+        if position == None:
+            return None
+
+        return self.get_data_label_at(position)
+
+
+    def get_label_number_by_id(self, index_label):
+        """
+        Get the label number given to an instance, without building
+        its `DataLabel`.
+
+        :Parameters:
+            index_label : integer
+               Index number of the classified instance.
+
+        :Returns:
+            The label number of the instance, or None if no instance has
+            the given index_label in the `DataClassification`.
+        """
+        position = self.get_positions().get(index_label)
+        if position == None:
             return None
 
-        return self.data_labels[index_label]
+        return self.label_numbers[position]
 
 
     def get_data_labels(self):
@@ -295,12 +1327,19 @@ class DataClassification:
         Get a sequence of the classified data contained in this classification.
 
         :Returns:
-            A sequence filled with the classified data contained in this
-            classification.
+            `DataLabelSequence` : lazy sequence filled with the classified
+            data contained in this classification.
         """
+        return DataLabelSequence(self)
 
-        data = []
-        for k, v in self.data_labels.items():
-            data.append(v)
 
-        return data
+    def get_nb_data_labels(self):
+        return len(self.label_numbers)
+
+
+    def get_index_numbers(self):
+        return self.index_numbers
+
+
+    def get_label_numbers(self):
+        return self.label_numbers
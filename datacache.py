@@ -0,0 +1,243 @@
+"""
+Data cache module.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful, 
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import csv
+import hashlib
+
+from data import DataSet
+from data import DataSetColumnar
+from dataio import DataIO_Binary
+from datafilter import Filter
+from datafilter import Stage
+from exception import *
+
+
+class DataCache:
+    """
+    On-disk cache of the `DataSet` read by a `DataIO_CSV` and filtered by
+    a `Filter`. An entry is identified by a key computed from the source
+    file, the settings of the reader and the parameters of the `Filter`,
+    so that any change to one of them leads to a new entry. The filtered
+    `DataSet` is stored with `DataIO_Binary`, and the state of the fitted
+    `Filter` is written next to it as a CSV table, in the format of
+    `NetworkIO_CSV.write_filter`, so that the entries do not depend on
+    the classes of the Python objects. An entry that cannot be read,
+    whatever the reason, is treated as a miss and rebuilt.
+
+    :IVariables:
+        __directory : string
+            Directory holding the cache entries.
+        __hash_content : boolean
+            If True, the source file is identified by the SHA-1 of its
+            content. Otherwise, it is identified by its path, size and
+            modification time, which is faster but misses changes that
+            keep the size and the modification time.
+    """
+
+    version = 4
+    header_filter = ["field", "index", "value", "number"]
+
+    def __init__(self, directory, hash_content=False):
+        """
+        Initializer
+
+        :Parameters:
+            directory : string
+                Directory holding the cache entries. Created if needed.
+            hash_content : boolean
+                Identify the source file by the hash of its content instead
+                of its modification time.
+
+        :Raises NpyStreamError:
+            If the directory cannot be created.
+        """
+        self.directory = directory
+        self.hash_content = hash_content
+
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                raise NpyStreamError, 'Unable to create the cache directory: ' + directory
+
+
+    def __identify_source(self, filename):
+        """
+        Compute the identity of a source file.
+
+        :Parameters:
+            filename : string
+                Name of the source file.
+
+        :Returns:
+            string : the identity of the file.
+
+        :Raises NpyStreamError:
+            If the file cannot be read.
+        """
+        try:
+            if not self.hash_content:
+                stat = os.stat(filename)
+                return '%s:%d:%r' % (os.path.abspath(filename), stat.st_size, stat.st_mtime)
+
+            digest = hashlib.sha1()
+            stream = open(filename, 'rb')
+            try:
+                block = stream.read(1 << 20)
+                while block:
+                    digest.update(block)
+                    block = stream.read(1 << 20)
+            finally:
+                stream.close()
+            return digest.hexdigest()
+        except (IOError, OSError):
+            raise NpyStreamError, 'Unable to read the file: ' + str(filename)
+
+
+    def get_key(self, data_io, filter_parameters):
+        """
+        Compute the key of the cache entry for a given reader and `Filter`.
+
+        :Parameters:
+            data_io : `DataIO_CSV`
+                Reader of the source file.
+            filter_parameters : dictionary
+                Keyword arguments given to the `Filter` initializer.
+
+        :Returns:
+            string : the key of the entry.
+
+        :Raises NpyValueError:
+            If a parameter of the `Filter` cannot be described in a stable
+            way, that is neither by a number, a string, None nor, for the
+            stages, by the name and the state of every `Stage`.
+        """
+        parameters = []
+        for name, value in sorted(filter_parameters.items()):
+            if name == 'stages' and value != None:
+                stages = []
+                for stage in value:
+                    if not isinstance(stage, Stage):
+                        raise NpyValueError, 'Invalid stage for the cache key: %r.' % (stage,)
+                    stages.append((stage.get_name(), [[str(field) for field in row] for row in stage.get_state()]))
+                value = stages
+            elif value != None and not isinstance(value, (bool, int, long, float, basestring)):
+                raise NpyValueError, 'The Filter parameter %s cannot be used in a cache key: %r.' % (name, value)
+            parameters.append((name, value))
+
+        settings = (DataCache.version,
+                    self.__identify_source(data_io.get_stream()),
+                    data_io.attribute_id,
+                    data_io.attribute_label,
+                    sorted(data_io.null_values),
+                    parameters)
+        return hashlib.sha1(repr(settings)).hexdigest()
+
+
+    def read_filtered(self, data_io, **filter_parameters):
+        """
+        Get the filtered `DataSet` and the fitted `Filter` for the file of
+        a given reader. On a cache hit, both are loaded from the cache.
+        Otherwise, the file is read, the `Filter` is built and applied, and
+        the results are stored in the cache.
+
+        :Parameters:
+            data_io : `DataIO_CSV`
+                Reader of the source file.
+            filter_parameters
+                Keyword arguments given to the `Filter` initializer.
+
+        :Returns:
+            tuple : the filtered `DataSet` and the `Filter`. The filtered
+            `DataSet` is the one returned by `Filter.filter`, a
+            `DataSetColumnar` in fused mode or if the `Filter` has stages,
+            whether the entry was in the cache or not.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the source file or writing
+            the cache.
+        """
+        key = self.get_key(data_io, filter_parameters)
+        name_data_set = os.path.join(self.directory, key + '.npyb')
+        name_filter = os.path.join(self.directory, key + '.filter')
+
+        if os.path.exists(name_data_set) and os.path.exists(name_filter):
+            # A corrupted or incompatible entry may raise almost any
+            # exception, and is then rebuilt
+            try:
+                ds_filtered = DataSet()
+                DataIO_Binary(name_data_set).read(ds_filtered)
+                stream = open(name_filter, 'rb')
+                try:
+                    table = [row for row in csv.reader(stream)]
+                finally:
+                    stream.close()
+                if len(table) > 0 and table[0] == DataCache.header_filter:
+                    data_filter = Filter(None)
+                    data_filter.set_state(table[1:])
+                    if data_filter.fused or len(data_filter.stages) > 0:
+                        ds_columnar = DataSetColumnar(ds_filtered.get_name_attribute())
+                        for data_instance in ds_filtered.get_data_instances():
+                            ds_columnar.add_data_instance_object(data_instance)
+                        ds_filtered = ds_columnar
+                    return (ds_filtered, data_filter)
+            except Exception:
+                pass
+
+        ds_raw = DataSet()
+        data_io.read(ds_raw)
+        data_filter = Filter(ds_raw, **filter_parameters)
+        ds_filtered = data_filter.filter(ds_raw)
+
+        # The entries are written under temporary names and then renamed,
+        # so that concurrent jobs never read a partial entry. The filter is
+        # renamed last since a hit requires both files.
+        name_temporary = '%s.%d.tmp' % (name_data_set, os.getpid())
+        DataIO_Binary(name_temporary, compress=False).write(ds_filtered)
+        os.rename(name_temporary, name_data_set)
+
+        name_temporary = '%s.%d.tmp' % (name_filter, os.getpid())
+        try:
+            stream = open(name_temporary, 'wb')
+            try:
+                writer = csv.writer(stream)
+                writer.writerow(DataCache.header_filter)
+                for row in data_filter.get_state():
+                    writer.writerow(row)
+            finally:
+                stream.close()
+            os.rename(name_temporary, name_filter)
+        except (IOError, OSError):
+            raise NpyStreamError, 'Unable to write the file: ' + name_filter
+
+        return (ds_filtered, data_filter)
+
+
+    def clear(self):
+        """
+        Remove all the entries from the cache.
+        """
+        for name in os.listdir(self.directory):
+            if name.endswith('.npyb') or name.endswith('.filter') or name.endswith('.tmp'):
+                os.remove(os.path.join(self.directory, name))
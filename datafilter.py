@@ -21,9 +21,16 @@ __docformat__ = "restructuredtext en"
 ## along with npy.  If not, see <http://www.gnu.org/licenses/>.
 
 import sys
+import math
+import array
+import itertools
 
 from data import DataSet
 from data import DataInstance
+from data import DataSetColumnar
+from factory import FactoryMixin
+from factory import Factory
+from exception import *
 
 class Numerizer:
     """
@@ -40,37 +47,55 @@ class Numerizer:
 
     """
 
-    def __init__(self, ds_source):
+    def __init__(self, ds_source=None):
         """ 
         Builds a `Numerizer` based on the data provided in ds_source.
 
         :Parameters:
             ds_source : `DataSet`
-                Data to use in order to build the `Numerizer`.
+                Data to use in order to build the `Numerizer`. If None, the
+                `Numerizer` is empty and learns its values through
+                learn_data_instance().
         """
 
         self.attributes = {}
         self.label = {}
 
-        data_instances = ds_source.get_data_instances()
-        for data_instance in data_instances:
-            # Process the attribute values
-            for index, value in enumerate(data_instance.get_attributes()):
-                try:
-                    number = float(value)
-                except ValueError:
-                    # Every time a non-float attribute value is met,
-                    # it is added to the numerizer
-                    self.add_value_for_attribute(value, index) 
-
-            # Process the label value
-            label = data_instance.get_label_number()
+        if ds_source != None:
+            for data_instance in ds_source.get_data_instances():
+                self.learn_data_instance(data_instance)
+
+
+    def learn_data_instance(self, data_instance):
+        """
+        Add the non-numeric attribute and label values of a `DataInstance`
+        to the `Numerizer`. Missing values (None) are ignored.
+
+        :Parameters:
+            data_instance : `DataInstance`
+                Non-numerized instance to learn from.
+        """
+        # Process the attribute values
+        for index, value in enumerate(data_instance.get_attributes()):
+            if value == None:
+                continue
             try:
-                number = float(label)
+                number = float(value)
             except ValueError:
-                # Every time a non-float label value is met,
+                # Every time a non-float attribute value is met,
                 # it is added to the numerizer
-                self.__add_value_for_label(label)
+                self.__add_value_for_attribute(value, index) 
+
+        # Process the label value
+        label = data_instance.get_label_number()
+        if label == None:
+            return
+        try:
+            number = float(label)
+        except ValueError:
+            # Every time a non-float label value is met,
+            # it is added to the numerizer
+            self.__add_value_for_label(label)
 
 
     def __add_value_for_attribute(self, value_attribute, index_attribute):
@@ -82,21 +107,91 @@ class Numerizer:
                 Id of the attribute in the `DataInstance` sequence
             value_attribute : string 
                 Value of the attribute to store.
-
-        :Raises NpyIndexError:
-            If the given index is already in use.
         """
 
         if not index_attribute in self.attributes:
             self.attributes[index_attribute] = {}
-        else:
-            raise NpyIndexError, 'Index value already used'
 
         values = self.attributes[index_attribute]
         if not value_attribute in values:
             values[value_attribute] = len(values) + 1
 
 
+    def partial_fit(self, chunk):
+        """
+        Learn the non-numeric values of a chunk of instances, so that
+        a `Numerizer` can be built from data streamed chunk by chunk.
+
+        :Parameters:
+            chunk : sequence of `DataInstance`
+                Non-numerized instances to learn from.
+        """
+        for data_instance in chunk:
+            self.learn_data_instance(data_instance)
+
+
+    def merge(self, numerizer):
+        """
+        Add the values learned by another `Numerizer`. The values unknown
+        to the current `Numerizer` are numbered after its own ones, in the
+        order in which the other `Numerizer` learned them, so that merging
+        the `Numerizer` of consecutive shards gives the same numbers as
+        learning the shards one after the other.
+
+        :Parameters:
+            numerizer : `Numerizer`
+                `Numerizer` of which the values are added.
+        """
+        for index_attribute, values in numerizer.attributes.iteritems():
+            for value, number in sorted(values.iteritems(), key=lambda item: item[1]):
+                self.__add_value_for_attribute(value, index_attribute)
+
+        for value, number in sorted(numerizer.label.iteritems(), key=lambda item: item[1]):
+            self.__add_value_for_label(value)
+
+
+    def get_state(self):
+        """
+        Describe the values learned by the `Numerizer` as a table.
+
+        :Returns:
+            sequence of sequences : one row ['attribute', index of the
+            attribute, value, number] per attribute value, and one row
+            ['label', '', value, number] per label value.
+        """
+        rows = []
+        for index_attribute, values in sorted(self.attributes.iteritems()):
+            for value, number in sorted(values.iteritems(), key=lambda item: item[1]):
+                rows.append(['attribute', index_attribute, value, number])
+
+        for value, number in sorted(self.label.iteritems(), key=lambda item: item[1]):
+            rows.append(['label', '', value, number])
+
+        return rows
+
+
+    def set_state(self, rows):
+        """
+        Replace the values of the `Numerizer` by the ones described in
+        a table built by get_state(). The rows of other kinds are ignored.
+
+        :Parameters:
+            rows : sequence of sequences
+                Table of the values, whose fields can be strings.
+        """
+        self.attributes = {}
+        self.label = {}
+
+        for row in rows:
+            if row[0] == 'attribute':
+                index_attribute = int(row[1])
+                if not index_attribute in self.attributes:
+                    self.attributes[index_attribute] = {}
+                self.attributes[index_attribute][row[2]] = int(row[3])
+            elif row[0] == 'label':
+                self.label[row[2]] = int(row[3])
+
+
     def attribute_string_to_number(self, value_attribute, index_attribute):
         """
         Get the numeric value associated with the string value
@@ -195,34 +290,60 @@ class Numerizer:
         ds_dest = DataSet()
         ds_dest.set_name_attribute(ds_source.get_name_attribute())
 
-        data_instances = ds_source.get_data_instances()
-        for data_instance_old in data_instances:
+        for data_instance_old in ds_source.get_data_instances():
+            attributes = self.numerize_attributes(data_instance_old.get_attributes())
+            label_new = self.numerize_label(data_instance_old.get_label_number())
+            ds_dest.add_data_instance(data_instance_old.get_index_number(), attributes, label_new)
+
+        ds_dest.is_numerized = True
+        return ds_dest 
+
 
-            attributes = []
+    def numerize_attributes(self, attributes):
+        """
+        Convert the attribute values of an instance into numbers.
 
-            # Process the attribute values
-            for index, value in enumerate(data_instance_old.get_attributes()):
-                try:
-                    number = float(value)
-                except ValueError:
-                    # Every time a non-float attribute value is met,
-                    # it is added to the numerizer
-                    number = self.attribute_string_to_number(value, index) 
-                attributes.append(number)
+        :Parameters:
+            attributes : sequence
+                Attribute values of a non-numerized instance.
 
-            # Process the label value
-            label_old = data_instance_old.get_label_number()
+        :Returns:
+            sequence of floats : the numerized values. The missing values
+            are kept as None, and the string values unknown to the
+            `Numerizer` are converted into None.
+        """
+        numbers = []
+        for index, value in enumerate(attributes):
+            if value == None:
+                numbers.append(None)
+                continue
             try:
-                label_new = float(label_old)
+                number = float(value)
             except ValueError:
-                # Every time a non-float label value is met,
-                # it is added to the numerizer
-                label_new = self.label_string_to_number(label_old)
+                number = self.attribute_string_to_number(value, index) 
+            numbers.append(number)
 
-            ds_dest.add_data_instance(data_instance_old.get_index_number(), attributes, label_new)
+        return numbers
 
-        ds_dest.is_numerized = True
-        return ds_dest 
+
+    def numerize_label(self, label):
+        """
+        Convert the label of an instance into a number.
+
+        :Parameters:
+            label : string
+                Label of a non-numerized instance.
+
+        :Returns:
+            number : the numerized label, None if the label is missing or
+            if the label string is unknown to the `Numerizer`.
+        """
+        if label == None:
+            return None
+        try:
+            return float(label)
+        except ValueError:
+            return self.label_string_to_number(label)
 
 
 
@@ -242,43 +363,232 @@ class Normalizer:
             Sequence of the smallest possible values for every attribute.
         __max : sequence
             Sequence of the highest possible values for every attribute.
+        __count : sequence
+            Number of non-missing values met for every attribute.
+        __mean : sequence
+            Running mean of every attribute.
+        __m2 : sequence
+            Running sum of the squared differences to the mean of every
+            attribute, from which the variance is computed.
     """
 
-    def __init__(self, ds_source, lower_bound=0, upper_bound=1):
+    def __init__(self, ds_source=None, lower_bound=0, upper_bound=1):
         """
         Builds a `Normalizer` based on the data provided in ds_source.
 
         :Parameters:
             ds_source : `DataSet`
-                `DataSet` used to build the normalizer.
+                `DataSet` used to build the normalizer. If None, the
+                `Normalizer` is empty and learns the attribute ranges
+                through learn_attributes().
 
         :Raises NpyDataTypeError:
             If the given `DataSet` has not been numerized.
         """
-        if ds_source.is_numerized == False:
+        if ds_source != None and ds_source.is_numerized == False:
             raise NpyDataTypeError, 'ds_source must be numerized first.'
 
         self.lower_bound = float(lower_bound)
         self.upper_bound = float(upper_bound)
         self.min = None
         self.max = None
+        self.count = None
+        self.mean = None
+        self.m2 = None
+
+        if ds_source != None:
+            self.__reset(ds_source.get_nb_attributes())
+            for data_instance in ds_source.get_data_instances():
+                self.learn_attributes(data_instance.get_attributes())
+
+
+    def __reset(self, nb_attributes):
+        """
+        Initialize the statistics for a given number of attributes.
+        """
+        self.__set_min([ float( sys.maxint) for i in range(nb_attributes) ])
+        self.__set_max([ float(-sys.maxint) for i in range(nb_attributes) ])
+        self.count = [ 0 for i in range(nb_attributes) ]
+        self.mean = [ 0.0 for i in range(nb_attributes) ]
+        self.m2 = [ 0.0 for i in range(nb_attributes) ]
+
+
+    def learn_attributes(self, attributes):
+        """
+        Update the statistics of the attributes with the values of an
+        instance. Missing values (None) are ignored.
+
+        :Parameters:
+            attributes : sequence of floats
+                Attribute values of a numerized instance.
+        """
+        if self.min == None:
+            self.__reset(len(attributes))
+
+        value_min = self.min
+        value_max = self.max
+        count = self.count
+        mean = self.mean
+        m2 = self.m2
+        for index, value in enumerate(attributes):
+            if value == None:
+                continue
+
+            value = float(value)
+            if value < value_min[index]:
+                value_min[index] = value
+
+            if value > value_max[index]:
+                value_max[index] = value
+
+            # Welford's update of the mean and of the squared differences
+            count[index] += 1
+            delta = value - mean[index]
+            mean[index] += delta / count[index]
+            m2[index] += delta * (value - mean[index])
+
+
+    def partial_fit(self, chunk):
+        """
+        Update the statistics with a chunk of instances, so that
+        a `Normalizer` can be built, or refreshed with new data, from data
+        streamed chunk by chunk.
+
+        :Parameters:
+            chunk : sequence of `DataInstance`
+                Numerized instances to learn from.
+        """
+        for data_instance in chunk:
+            self.learn_attributes(data_instance.get_attributes())
+
+
+    def merge(self, normalizer):
+        """
+        Add the statistics of another `Normalizer`, for instance one built
+        on another shard of the data. The attribute values of both
+        `Normalizer` must have been numerized by the same `Numerizer`.
+
+        :Parameters:
+            normalizer : `Normalizer`
+                `Normalizer` of which the statistics are added.
+
+        :Raises NpyValueError:
+            If the numbers of attributes of the two `Normalizer` differ.
+        """
+        if normalizer.min == None:
+            return
+
+        if self.min == None:
+            self.__reset(len(normalizer.min))
+
+        if len(normalizer.min) != len(self.min):
+            raise NpyValueError, 'The Normalizer instances do not have the same number of attributes.'
+
+        for index in range(len(self.min)):
+            self.min[index] = min(self.min[index], normalizer.min[index])
+            self.max[index] = max(self.max[index], normalizer.max[index])
+
+            # Chan's formula for the combination of the squared differences
+            count_a = self.count[index]
+            count_b = normalizer.count[index]
+            count = count_a + count_b
+            if count == 0:
+                continue
+            delta = normalizer.mean[index] - self.mean[index]
+            self.mean[index] += delta * count_b / count
+            self.m2[index] += normalizer.m2[index] + delta * delta * count_a * count_b / count
+            self.count[index] = count
+
+
+    def get_state(self):
+        """
+        Describe the bounds and the statistics of the `Normalizer` as
+        a table. The floats are written with repr() so that they are
+        restored exactly.
+
+        :Returns:
+            sequence of sequences : the rows ['lower_bound', '', '', value]
+            and ['upper_bound', '', '', value], then one row [name, index of
+            the attribute, '', value] per attribute for each of 'min', 'max',
+            'count', 'mean' and 'm2'.
+        """
+        rows = [['lower_bound', '', '', repr(self.lower_bound)],
+                ['upper_bound', '', '', repr(self.upper_bound)]]
+
+        if self.min != None:
+            statistics = [('min', self.min), ('max', self.max), ('count', self.count), ('mean', self.mean), ('m2', self.m2)]
+            for name, values in statistics:
+                for index_attribute, value in enumerate(values):
+                    rows.append([name, index_attribute, '', repr(value)])
+
+        return rows
+
+
+    def set_state(self, rows):
+        """
+        Replace the bounds and the statistics of the `Normalizer` by the
+        ones described in a table built by get_state(). The rows of other
+        kinds are ignored.
+
+        :Parameters:
+            rows : sequence of sequences
+                Table of the values, whose fields can be strings.
+        """
+        statistics = {'min': {}, 'max': {}, 'count': {}, 'mean': {}, 'm2': {}}
+        for row in rows:
+            if row[0] == 'lower_bound':
+                self.lower_bound = float(row[3])
+            elif row[0] == 'upper_bound':
+                self.upper_bound = float(row[3])
+            elif row[0] in statistics:
+                statistics[row[0]][int(row[1])] = float(row[3])
 
-        nb_attributes = ds_source.get_nb_attributes()
-        value_min = [ float( sys.maxint) for i in range(nb_attributes) ]
-        value_max = [ float(-sys.maxint) for i in range(nb_attributes) ]
+        nb_attributes = len(statistics['min'])
+        if nb_attributes == 0:
+            self.min = None
+            self.max = None
+            self.count = None
+            self.mean = None
+            self.m2 = None
+            return
 
-        data_instances = ds_source.get_data_instances()
-        for data_instance in data_instances:
-            # Process the attribute values
-            for index, value in enumerate(data_instance.get_attributes()):
-                if value < value_min[index]:
-                    value_min[index] = float(value)
+        self.__reset(nb_attributes)
+        for index_attribute in range(nb_attributes):
+            self.min[index_attribute] = statistics['min'][index_attribute]
+            self.max[index_attribute] = statistics['max'][index_attribute]
+            self.count[index_attribute] = int(statistics['count'][index_attribute])
+            self.mean[index_attribute] = statistics['mean'][index_attribute]
+            self.m2[index_attribute] = statistics['m2'][index_attribute]
 
-                if value > value_max[index]:
-                    value_max[index] = float(value)
 
-        self.__set_min(value_min)
-        self.__set_max(value_max)
+    def get_min(self):
+        return self.min
+
+
+    def get_max(self):
+        return self.max
+
+
+    def get_mean(self):
+        return self.mean
+
+
+    def get_variance(self):
+        """
+        Get the variance of every attribute.
+
+        :Returns:
+            sequence of floats : the population variance of every attribute,
+            0 for the attributes without any value.
+        """
+        variance = []
+        for count, m2 in itertools.izip(self.count, self.m2):
+            if count == 0:
+                variance.append(0.0)
+            else:
+                variance.append(m2 / count)
+
+        return variance
 
              
     def set_lower_bound(self, value):
@@ -318,22 +628,687 @@ class Normalizer:
         ds_dest = DataSet()
         ds_dest.set_name_attribute(ds_source.get_name_attribute())
 
-        data_instances = ds_source.get_data_instances()
-        for data_instance_old in data_instances:
-
-            attributes_new = []
-
-            # Normalize each attribute
-            for index, value in enumerate(data_instance_old.get_attributes()):
-                value_new = (value - self.min[index]) * self.max[index] * (self.upper_bound - self.lower_bound) + self.lower_bound
-                attributes_new.append(value_new)
-
+        for data_instance_old in ds_source.get_data_instances():
+            attributes_new = self.normalize_attributes(data_instance_old.get_attributes())
             ds_dest.add_data_instance(data_instance_old.get_index_number(), attributes_new, data_instance_old.get_label_number())
 
         ds_dest.is_numerized = True
         return ds_dest
 
 
+    def normalize_attributes(self, attributes):
+        """
+        Translate the attribute values of an instance into the interval
+        of the `Normalizer`. An attribute that had a single value when the
+        `Normalizer` was built is translated to the lower bound. Missing
+        values (None) are kept as None.
+
+        :Parameters:
+            attributes : sequence of floats
+                Attribute values of a numerized instance.
+
+        :Returns:
+            sequence of floats : the normalized values.
+        """
+        scale = self.upper_bound - self.lower_bound
+
+        attributes_new = []
+        for value, value_min, value_max in itertools.izip(attributes, self.min, self.max):
+            if value == None:
+                value_new = None
+            elif value_max > value_min:
+                value_new = (value - value_min) / (value_max - value_min) * scale + self.lower_bound
+            else:
+                value_new = self.lower_bound
+            attributes_new.append(value_new)
+
+        return attributes_new
+
+
+    def normalize_columns(self, data_set):
+        """
+        Translate the columns of a `DataSetColumnar` into the interval of
+        the `Normalizer`, column by column, giving the same values as
+        normalize_attributes(). Missing values (NaN) are kept as NaN.
+
+        :Parameters:
+            data_set : `DataSetColumnar`
+                Numerized data set to normalize.
+
+        :Returns:
+            `DataSetColumnar` : the normalized data set, sharing the index
+            numbers and the labels of data_set.
+        """
+        scale = self.upper_bound - self.lower_bound
+        lower_bound = self.lower_bound
+
+        columns = []
+        for index_attribute in range(data_set.get_nb_attributes()):
+            column = data_set.get_column(index_attribute)
+            value_min = self.min[index_attribute]
+            value_max = self.max[index_attribute]
+            if value_max > value_min:
+                width = value_max - value_min
+                column = [(value - value_min) / width * scale + lower_bound for value in column]
+            else:
+                column = [lower_bound if value == value else value for value in column]
+            columns.append(array.array('d', column))
+
+        return data_set.derive(data_set.get_name_attribute(), columns)
+
+
+class Stage(FactoryMixin):
+    """
+    Abstract class for the stages a `Filter` applies to the columns of its
+    output, after the numerizing and normalizing operations. A stage
+    processes each attribute column as a whole, and produces a new
+    `DataSetColumnar`. The indices of the columns refer to the output of
+    the previous stage, which differs from the attributes of the
+    `DataSet` when a previous stage adds columns.
+
+    :IVariables:
+        __columns : sequence of integers
+            Indices of the attributes processed by the stage. If None, all
+            the attributes are processed.
+        __nb_attributes : integer
+            Number of attributes of the data the stage has been fitted on,
+            or None if it has not been fitted.
+    """
+
+    prefix = 'st_'
+
+    def __init__(self, columns=None):
+        """
+        Initializer.
+
+        :Parameters:
+            columns : sequence of integers
+                Indices of the attributes to process. If None, all the
+                attributes are processed.
+        """
+        FactoryMixin.__init__(self)
+        if columns != None:
+            columns = list(columns)
+        self.columns = columns
+        self.nb_attributes = None
+
+
+    def get_columns(self, data_set):
+        """
+        Get the indices of the attributes processed in a given `DataSet`.
+        """
+        if self.columns == None:
+            return range(data_set.get_nb_attributes())
+        return self.columns
+
+
+    def check_data_set(self, data_set):
+        """
+        Check that the stage can process a `DataSet`: its processed columns
+        have to exist, and if the stage has been fitted, the `DataSet` must
+        have as many attributes as the data it has been fitted on.
+
+        :Parameters:
+            data_set : `DataSetColumnar`
+                Data to process.
+
+        :Raises NpyValueError:
+            If the `DataSet` does not match the stage.
+        """
+        nb_attributes = data_set.get_nb_attributes()
+        if self.nb_attributes != None and nb_attributes != self.nb_attributes:
+            raise NpyValueError, 'The stage %s was fitted on %d attributes, and cannot process %d attributes.' % (self.get_name(), self.nb_attributes, nb_attributes)
+
+        for index_attribute in self.columns or []:
+            if index_attribute < 0 or index_attribute >= nb_attributes:
+                raise NpyValueError, 'The stage %s processes the column %d, but the data has %d attributes.' % (self.get_name(), index_attribute, nb_attributes)
+
+
+    def fit(self, data_set, numerizer):
+        """
+        Compute the parameters of the stage from the data it will process.
+        The base method checks the columns and records the number of
+        attributes, and has to be called by the stages that override it.
+
+        :Parameters:
+            data_set : `DataSetColumnar`
+                Data the stage is fitted on.
+            numerizer : `Numerizer`
+                `Numerizer` of the `Filter`, for the stages that need to know
+                which attributes were categorical.
+
+        :Raises NpyValueError:
+            If a processed column does not exist in data_set.
+        """
+        self.nb_attributes = None
+        self.check_data_set(data_set)
+        self.nb_attributes = data_set.get_nb_attributes()
+
+
+    def transform(self, data_set):
+        """
+        Apply the stage to a `DataSetColumnar`.
+
+        :Parameters:
+            data_set : `DataSetColumnar`
+                Data to process.
+
+        :Returns:
+            `DataSetColumnar` : the processed data, sharing the index
+            numbers and the labels of data_set.
+
+        :Raises NpyValueError:
+            If data_set does not match the stage, as checked by
+            check_data_set().
+        """
+        pass
+
+
+    def get_state(self):
+        """
+        Describe the stage as a table, in the format of the `Filter`
+        get_state() method.
+
+        :Returns:
+            sequence of sequences : the rows describing the stage.
+        """
+        rows = []
+        if self.nb_attributes != None:
+            rows.append(['nb_attributes', '', '', self.nb_attributes])
+
+        if self.columns != None:
+            rows.append(['columns', '', '', len(self.columns)])
+            for position, index_attribute in enumerate(self.columns):
+                rows.append(['column', position, '', index_attribute])
+        return rows
+
+
+    def set_state(self, rows):
+        """
+        Load the stage from a table built by get_state(). The order of the
+        rows does not matter.
+
+        :Parameters:
+            rows : sequence of sequences
+                Table of the values, whose fields can be strings.
+
+        :Raises NpyValueError:
+            If the columns are inconsistent.
+        """
+        self.nb_attributes = None
+        nb_columns = None
+        columns = {}
+        for row in rows:
+            if row[0] == 'nb_attributes':
+                self.nb_attributes = int(row[3])
+            elif row[0] == 'columns':
+                nb_columns = int(row[3])
+            elif row[0] == 'column':
+                columns[int(row[1])] = int(row[3])
+
+        if nb_columns == None:
+            if len(columns) > 0:
+                raise NpyValueError, 'Columns are given without the columns row.'
+            self.columns = None
+        elif sorted(columns.keys()) != range(nb_columns):
+            raise NpyValueError, 'The columns of the stage are incomplete.'
+        else:
+            self.columns = [columns[position] for position in range(nb_columns)]
+
+
+    def _map_columns(self, data_set, function):
+        """
+        Build a `DataSetColumnar` in which the processed columns are
+        replaced by the result of a function.
+
+        :Parameters:
+            data_set : `DataSetColumnar`
+                Data to process.
+            function : callable
+                Function taking the index of the attribute and its column,
+                and returning the new column as a sequence of floats.
+
+        :Returns:
+            `DataSetColumnar` : the processed data.
+        """
+        self.check_data_set(data_set)
+
+        columns = []
+        processed = set(self.get_columns(data_set))
+        for index_attribute in range(data_set.get_nb_attributes()):
+            column = data_set.get_column(index_attribute)
+            if index_attribute in processed:
+                column = array.array('d', function(index_attribute, column))
+            columns.append(column)
+
+        return data_set.derive(data_set.get_name_attribute(), columns)
+
+
+
+class StageStandardize(Stage):
+    """
+    Z-score standardization: every processed attribute is centered on its
+    mean and divided by its standard deviation. The attributes with
+    a standard deviation of 0 are set to 0.
+
+    :IVariables:
+        __mean : dictionary
+            Mean of every processed attribute.
+        __deviation : dictionary
+            Standard deviation of every processed attribute.
+    """
+
+    def __init__(self, columns=None):
+        Stage.__init__(self, columns)
+        self._set_name("st_standardize")
+        self.mean = None
+        self.deviation = None
+
+
+    def fit(self, data_set, numerizer):
+        Stage.fit(self, data_set, numerizer)
+        self.mean = {}
+        self.deviation = {}
+        for index_attribute in self.get_columns(data_set):
+            values = [value for value in data_set.get_column(index_attribute) if value == value]
+            if len(values) == 0:
+                self.mean[index_attribute] = 0.0
+                self.deviation[index_attribute] = 0.0
+                continue
+            mean = math.fsum(values) / len(values)
+            self.mean[index_attribute] = mean
+            self.deviation[index_attribute] = math.sqrt(math.fsum([(value - mean) ** 2 for value in values]) / len(values))
+
+
+    def transform(self, data_set):
+        """
+        :Raises NpyIncompleteError:
+            If the stage has not been fitted.
+        """
+        if self.mean == None:
+            raise NpyIncompleteError, 'The stage has not been fitted.'
+
+        def standardize(index_attribute, column):
+            mean = self.mean[index_attribute]
+            deviation = self.deviation[index_attribute]
+            if deviation == 0:
+                return [0.0 if value == value else value for value in column]
+            return [(value - mean) / deviation for value in column]
+
+        return self._map_columns(data_set, standardize)
+
+
+    def get_state(self):
+        rows = Stage.get_state(self)
+        if self.mean != None:
+            for index_attribute in sorted(self.mean):
+                rows.append(['mean', index_attribute, '', repr(self.mean[index_attribute])])
+                rows.append(['deviation', index_attribute, '', repr(self.deviation[index_attribute])])
+        return rows
+
+
+    def set_state(self, rows):
+        Stage.set_state(self, rows)
+        self.mean = {}
+        self.deviation = {}
+        for row in rows:
+            if row[0] == 'mean':
+                self.mean[int(row[1])] = float(row[3])
+            elif row[0] == 'deviation':
+                self.deviation[int(row[1])] = float(row[3])
+
+
+    @staticmethod
+    def build_instance():
+        return StageStandardize()
+
+
+
+class StageOneHot(Stage):
+    """
+    One-hot encoding: every processed attribute is replaced by one
+    attribute per value met while fitting, equal to 1 for the instances
+    having this value and to 0 otherwise. The values not met while
+    fitting, and the missing values, are encoded with zeros only.
+    By default, the processed attributes are the ones the `Numerizer`
+    converted from strings, which is only valid if no previous stage adds
+    columns.
+
+    :IVariables:
+        __values : dictionary
+            Sorted sequence of the values of every processed attribute.
+    """
+
+    def __init__(self, columns=None):
+        Stage.__init__(self, columns)
+        self._set_name("st_onehot")
+        self.values = None
+
+
+    def fit(self, data_set, numerizer):
+        if self.columns == None:
+            self.columns = sorted(numerizer.attributes.keys())
+        Stage.fit(self, data_set, numerizer)
+
+        self.values = {}
+        for index_attribute in self.columns:
+            column = data_set.get_column(index_attribute)
+            self.values[index_attribute] = sorted(set([value for value in column if value == value]))
+
+
+    def transform(self, data_set):
+        """
+        :Raises NpyIncompleteError:
+            If the stage has not been fitted.
+        """
+        if self.values == None:
+            raise NpyIncompleteError, 'The stage has not been fitted.'
+        self.check_data_set(data_set)
+
+        name_attribute = []
+        columns = []
+        for index_attribute, name in enumerate(data_set.get_name_attribute()):
+            column = data_set.get_column(index_attribute)
+            if not index_attribute in self.values:
+                name_attribute.append(name)
+                columns.append(column)
+                continue
+
+            for index_value, value_hot in enumerate(self.values[index_attribute]):
+                name_attribute.append('%s_%d' % (name, index_value + 1))
+                columns.append(array.array('d', [1.0 if value == value_hot else 0.0 for value in column]))
+
+        return data_set.derive(name_attribute, columns)
+
+
+    def get_state(self):
+        rows = Stage.get_state(self)
+        if self.values != None:
+            for index_attribute in sorted(self.values):
+                for value in self.values[index_attribute]:
+                    rows.append(['value', index_attribute, '', repr(value)])
+        return rows
+
+
+    def set_state(self, rows):
+        Stage.set_state(self, rows)
+        self.values = {}
+        for index_attribute in self.columns or []:
+            self.values[index_attribute] = []
+        for row in rows:
+            if row[0] == 'value':
+                self.values.setdefault(int(row[1]), []).append(float(row[3]))
+        for index_attribute in self.values:
+            self.values[index_attribute].sort()
+
+
+    @staticmethod
+    def build_instance():
+        return StageOneHot()
+
+
+
+class StageClip(Stage):
+    """
+    Clipping: the values of every processed attribute lower than a lower
+    bound, or greater than an upper bound, are replaced by the bound.
+
+    :IVariables:
+        __lower_bound : float
+            Lower bound, or None for no lower bound.
+        __upper_bound : float
+            Upper bound, or None for no upper bound.
+    """
+
+    def __init__(self, lower_bound=None, upper_bound=None, columns=None):
+        Stage.__init__(self, columns)
+        self._set_name("st_clip")
+        self.lower_bound = lower_bound
+        self.upper_bound = upper_bound
+
+
+    def transform(self, data_set):
+        lower_bound = self.lower_bound
+        upper_bound = self.upper_bound
+
+        def clip(index_attribute, column):
+            if lower_bound != None:
+                column = [lower_bound if value < lower_bound else value for value in column]
+            if upper_bound != None:
+                column = [upper_bound if value > upper_bound else value for value in column]
+            return column
+
+        return self._map_columns(data_set, clip)
+
+
+    def get_state(self):
+        rows = Stage.get_state(self)
+        if self.lower_bound != None:
+            rows.append(['lower_bound', '', '', repr(float(self.lower_bound))])
+        if self.upper_bound != None:
+            rows.append(['upper_bound', '', '', repr(float(self.upper_bound))])
+        return rows
+
+
+    def set_state(self, rows):
+        Stage.set_state(self, rows)
+        self.lower_bound = None
+        self.upper_bound = None
+        for row in rows:
+            if row[0] == 'lower_bound':
+                self.lower_bound = float(row[3])
+            elif row[0] == 'upper_bound':
+                self.upper_bound = float(row[3])
+
+
+    @staticmethod
+    def build_instance():
+        return StageClip()
+
+
+
+class StageLog(Stage):
+    """
+    Logarithmic transform: every processed attribute x is replaced by
+    log(1 + x - min), min being the smallest value met while fitting, so
+    that the result is always defined. The values lower than min are
+    transformed as min.
+
+    :IVariables:
+        __min : dictionary
+            Smallest value of every processed attribute.
+    """
+
+    def __init__(self, columns=None):
+        Stage.__init__(self, columns)
+        self._set_name("st_log")
+        self.min = None
+
+
+    def fit(self, data_set, numerizer):
+        Stage.fit(self, data_set, numerizer)
+        self.min = {}
+        for index_attribute in self.get_columns(data_set):
+            values = [value for value in data_set.get_column(index_attribute) if value == value]
+            if len(values) == 0:
+                self.min[index_attribute] = 0.0
+            else:
+                self.min[index_attribute] = min(values)
+
+
+    def transform(self, data_set):
+        """
+        :Raises NpyIncompleteError:
+            If the stage has not been fitted.
+        """
+        if self.min == None:
+            raise NpyIncompleteError, 'The stage has not been fitted.'
+
+        log = math.log
+
+        def logarithm(index_attribute, column):
+            offset = 1.0 - self.min[index_attribute]
+            return [log(max(value + offset, 1.0)) if value == value else value for value in column]
+
+        return self._map_columns(data_set, logarithm)
+
+
+    def get_state(self):
+        rows = Stage.get_state(self)
+        if self.min != None:
+            for index_attribute in sorted(self.min):
+                rows.append(['min', index_attribute, '', repr(self.min[index_attribute])])
+        return rows
+
+
+    def set_state(self, rows):
+        Stage.set_state(self, rows)
+        self.min = {}
+        for row in rows:
+            if row[0] == 'min':
+                self.min[int(row[1])] = float(row[3])
+
+
+    @staticmethod
+    def build_instance():
+        return StageLog()
+
+
+
+class StageImpute(Stage):
+    """
+    Missing value imputation: the missing values (NaN in the columns) of
+    every processed attribute are replaced by the mean or the median of
+    the attribute, or by a constant. Optionally, an indicator attribute,
+    equal to 1 where the value was missing and to 0 otherwise, is added
+    after every attribute that had missing values while fitting. As the
+    stages are applied after the normalizing operation, the constant is
+    expressed in the normalized scale.
+
+    :IVariables:
+        __strategy : string
+            'mean', 'median' or 'constant'.
+        __constant : float
+            Value used by the 'constant' strategy, and for the attributes
+            without any value.
+        __indicator : boolean
+            Add the missing value indicator attributes.
+        __fill : dictionary
+            Value replacing the missing values of every processed attribute.
+        __missing : set
+            Attributes that had missing values while fitting.
+    """
+
+    strategies = ('mean', 'median', 'constant')
+
+    def __init__(self, strategy='mean', constant=0.0, indicator=False, columns=None):
+        """
+        Initializer.
+
+        :Raises NpyValueError:
+            If the strategy is unknown.
+        """
+        Stage.__init__(self, columns)
+        self._set_name("st_impute")
+
+        if not strategy in StageImpute.strategies:
+            raise NpyValueError, 'Unknown imputation strategy: ' + str(strategy)
+
+        self.strategy = strategy
+        self.constant = float(constant)
+        self.indicator = indicator
+        self.fill = None
+        self.missing = None
+
+
+    def fit(self, data_set, numerizer):
+        Stage.fit(self, data_set, numerizer)
+        self.fill = {}
+        self.missing = set()
+        for index_attribute in self.get_columns(data_set):
+            column = data_set.get_column(index_attribute)
+            values = [value for value in column if value == value]
+            if len(values) < len(column):
+                self.missing.add(index_attribute)
+
+            if len(values) == 0 or self.strategy == 'constant':
+                self.fill[index_attribute] = self.constant
+            elif self.strategy == 'mean':
+                self.fill[index_attribute] = math.fsum(values) / len(values)
+            else:
+                values.sort()
+                middle = len(values) // 2
+                if len(values) % 2 == 1:
+                    self.fill[index_attribute] = values[middle]
+                else:
+                    self.fill[index_attribute] = (values[middle - 1] + values[middle]) / 2.0
+
+
+    def transform(self, data_set):
+        """
+        :Raises NpyIncompleteError:
+            If the stage has not been fitted.
+        """
+        if self.fill == None:
+            raise NpyIncompleteError, 'The stage has not been fitted.'
+        self.check_data_set(data_set)
+
+        name_attribute = []
+        columns = []
+        for index_attribute, name in enumerate(data_set.get_name_attribute()):
+            column = data_set.get_column(index_attribute)
+            if not index_attribute in self.fill:
+                name_attribute.append(name)
+                columns.append(column)
+                continue
+
+            fill = self.fill[index_attribute]
+            name_attribute.append(name)
+            columns.append(array.array('d', [value if value == value else fill for value in column]))
+
+            if self.indicator and index_attribute in self.missing:
+                name_attribute.append(name + '_missing')
+                columns.append(array.array('d', [0.0 if value == value else 1.0 for value in column]))
+
+        return data_set.derive(name_attribute, columns)
+
+
+    def get_state(self):
+        rows = Stage.get_state(self)
+        rows.append(['strategy', '', self.strategy, ''])
+        rows.append(['constant', '', '', repr(self.constant)])
+        rows.append(['indicator', '', '', int(self.indicator)])
+        if self.fill != None:
+            for index_attribute in sorted(self.fill):
+                rows.append(['fill', index_attribute, '', repr(self.fill[index_attribute])])
+            for index_attribute in sorted(self.missing):
+                rows.append(['missing', index_attribute, '', 1])
+        return rows
+
+
+    def set_state(self, rows):
+        Stage.set_state(self, rows)
+        self.fill = {}
+        self.missing = set()
+        for row in rows:
+            if row[0] == 'strategy':
+                self.strategy = row[2]
+            elif row[0] == 'constant':
+                self.constant = float(row[3])
+            elif row[0] == 'indicator':
+                self.indicator = bool(int(row[3]))
+            elif row[0] == 'fill':
+                self.fill[int(row[1])] = float(row[3])
+            elif row[0] == 'missing':
+                self.missing.add(int(row[1]))
+
+
+    @staticmethod
+    def build_instance():
+        return StageImpute()
+
+
+
 class Filter:
     """
     Embeds a Numerizer and a Normalizer and allows to automatize the creation
@@ -344,29 +1319,219 @@ class Filter:
             `Numerizer` used by the filter.
         __normalizer : `Normalizer`
             `Normalizer` used by the filter.
+        __fused : boolean
+            True if the filter has been built, and filters, in a single
+            pass over the data.
+        __stages : sequence of `Stage`
+            Stages applied in turn to the numerized and normalized data.
     """
    
-    def __init__(self, ds_source, normalizer_lower_bound=None, normalizer_upper_bound=None):
+    def __init__(self, ds_source, normalizer_lower_bound=None, normalizer_upper_bound=None, fused=False, stages=None):
         """
         Initializer.
 
         :Parameters: 
             ds_source : `DataSet`
-                `DataSet` used to create the filter.
+                `DataSet` used to create the filter. If None, the filter
+                is empty, and is then either fitted with partial_fit() in
+                fused mode, or loaded with set_state().
             normalizer_lower_bound : float
                 Lower bound used by the `Normalizer`.
             normalizer_upper_bound : float
                 Upper bound used by the `Normalizer`.
+            fused : boolean
+                If True, the `Numerizer` and the `Normalizer` are built
+                together in a single pass over ds_source, and filter()
+                produces a `DataSetColumnar` in a single pass, without any
+                intermediate `DataSet`.
+            stages : sequence of `Stage`
+                Stages applied in turn to the numerized and normalized data.
+                They are fitted on ds_source, or with fit_stages() if
+                ds_source is None.
         """
 
-        self.numerizer = Numerizer(ds_source)
-        ds_numerized = self.numerizer.numerize(ds_source)
-
-        if normalizer_lower_bound != None or normalizer_upper_bound != None:
-            self.normalizer = Normalizer(ds_numerized, normalizer_lower_bound, normalizer_upper_bound)
+        self.fused = fused
+        self.stages = []
+        if stages != None:
+            self.stages = list(stages)
+
+        bounds = {}
+        if normalizer_lower_bound != None:
+            bounds['lower_bound'] = normalizer_lower_bound
+        if normalizer_upper_bound != None:
+            bounds['upper_bound'] = normalizer_upper_bound
+
+        # With stages, the numerized data of the fitting pass is kept, so
+        # that the stages are fitted without reading ds_source again
+        ds_numerized = None
+        if not fused and ds_source != None:
+            self.numerizer = Numerizer(ds_source)
+            ds_numerized = self.numerizer.numerize(ds_source)
+            self.normalizer = Normalizer(ds_numerized, **bounds)
         else:
-            self.normalizer = Normalizer(ds_numerized)
-            
+            self.numerizer = Numerizer()
+            self.normalizer = Normalizer(None, **bounds)
+            if ds_source != None and len(self.stages) > 0:
+                ds_numerized = DataSetColumnar(ds_source.get_name_attribute())
+                for data_instance in ds_source.get_data_instances():
+                    self.numerizer.learn_data_instance(data_instance)
+                    attributes = self.numerizer.numerize_attributes(data_instance.get_attributes())
+                    self.normalizer.learn_attributes(attributes)
+                    label = self.numerizer.numerize_label(data_instance.get_label_number())
+                    ds_numerized.add_data_instance(data_instance.get_index_number(), attributes, label)
+            elif ds_source != None:
+                self.partial_fit(ds_source.get_data_instances())
+
+        if ds_source != None and len(self.stages) > 0:
+            if not isinstance(ds_numerized, DataSetColumnar):
+                ds_columnar = DataSetColumnar(ds_numerized.get_name_attribute())
+                for data_instance in ds_numerized.get_data_instances():
+                    ds_columnar.add_data_instance_object(data_instance)
+                ds_numerized = ds_columnar
+            self.__fit_stages_columnar(self.normalizer.normalize_columns(ds_numerized))
+
+
+    def fit_stages(self, ds_source):
+        """
+        Fit the stages of the `Filter` in turn, each one on the output of
+        the previous one. This filters ds_source, and thus makes a pass
+        over it: the initializer instead fits the stages on the data of
+        its own fitting pass, without reading ds_source again.
+
+        :Parameters:
+            ds_source : `DataSet`
+                Non-numerized `DataSet` used to fit the stages.
+        """
+        self.__fit_stages_columnar(self.__filter_columnar(ds_source))
+
+
+    def __fit_stages_columnar(self, data_set):
+        """
+        Fit the stages in turn on numerized and normalized data.
+
+        :Parameters:
+            data_set : `DataSetColumnar`
+                Output of the `Numerizer` and of the `Normalizer`.
+        """
+        for stage in self.stages:
+            stage.fit(data_set, self.numerizer)
+            data_set = stage.transform(data_set)
+
+
+    def partial_fit(self, chunk):
+        """
+        Update the `Numerizer` and the `Normalizer` with a chunk of
+        instances, so that a fused `Filter` can be built from data streamed
+        chunk by chunk.
+
+        :Parameters:
+            chunk : sequence of `DataInstance`
+                Non-numerized instances to learn from.
+
+        :Raises NpyDataTypeError:
+            If the `Filter` is not in fused mode.
+        """
+        if not self.fused:
+            raise NpyDataTypeError, 'Only a fused Filter can be fitted by chunks.'
+
+        # The values of an instance are numerized right after the instance
+        # has been learned, so that the ranges of the normalizer are the
+        # same as with a separate numerizing pass
+        for data_instance in chunk:
+            self.numerizer.learn_data_instance(data_instance)
+            self.normalizer.learn_attributes(self.numerizer.numerize_attributes(data_instance.get_attributes()))
+
+
+    def merge(self, data_filter):
+        """
+        Add the values and the statistics learned by another `Filter`, for
+        instance one fitted on another shard of the data. The `Numerizer`
+        are merged first. The statistics of the `Normalizer` of data_filter
+        were computed on the numbers given by its own `Numerizer`, and
+        cannot be translated to other numbers, so every categorical value
+        of data_filter must keep its number in the merged `Numerizer`. This
+        is the case when the shards meet the categorical values in the
+        same order, or when the `Numerizer` of the shards have been merged
+        beforehand and loaded in every shard before fitting the
+        `Normalizer`. The stages are not merged, and have to be fitted
+        again with fit_stages().
+
+        :Parameters:
+            data_filter : `Filter`
+                `Filter` of which the values and the statistics are added.
+
+        :Raises NpyValueError:
+            If a categorical value of data_filter would get another number
+            in the merged `Numerizer`, or if the numbers of attributes of
+            the two `Normalizer` differ. The `Filter` is left unchanged.
+        """
+        numerizer = Numerizer()
+        numerizer.set_state(self.numerizer.get_state())
+        numerizer.merge(data_filter.numerizer)
+
+        for index_attribute, values in data_filter.numerizer.attributes.iteritems():
+            for value, number in values.iteritems():
+                if numerizer.attributes[index_attribute][value] != number:
+                    raise NpyValueError, 'The value %r of the attribute %d is numbered differently in the merged Filter.' % (value, index_attribute)
+
+        self.normalizer.merge(data_filter.normalizer)
+        self.numerizer = numerizer
+
+
+    def get_state(self):
+        """
+        Describe the fitted `Filter` as a table, so that it can be saved
+        and loaded without the data it has been built from.
+
+        :Returns:
+            sequence of sequences : the row ['fused', '', '', 0 or 1],
+            followed by the rows of the `Numerizer` and of the `Normalizer`
+            get_state() methods, then by a row ['stage', position, name, '']
+            per `Stage`, followed by its own rows, prefixed with
+            'stage<position>_'.
+        """
+        rows = [['fused', '', '', int(self.fused)]]
+        rows.extend(self.numerizer.get_state())
+        rows.extend(self.normalizer.get_state())
+
+        # The rows of the stages are prefixed with their position
+        for index_stage, stage in enumerate(self.stages):
+            rows.append(['stage', index_stage, stage.get_name(), ''])
+            for row in stage.get_state():
+                rows.append(['stage%d_%s' % (index_stage, row[0])] + list(row[1:]))
+
+        return rows
+
+
+    def set_state(self, rows):
+        """
+        Load the `Filter` from a table built by get_state().
+
+        :Parameters:
+            rows : sequence of sequences
+                Table describing the `Filter`, whose fields can be strings.
+        """
+        stages = {}
+        for row in rows:
+            if row[0] == 'fused':
+                self.fused = bool(int(row[3]))
+            elif row[0] == 'stage':
+                stages[int(row[1])] = (Factory.build_instance_by_name(row[2]), [])
+
+        self.numerizer.set_state(rows)
+        self.normalizer.set_state(rows)
+
+        for row in rows:
+            if row[0].startswith('stage') and row[0] != 'stage':
+                (prefix, field) = row[0].split('_', 1)
+                stages[int(prefix[len('stage'):])][1].append([field] + list(row[1:]))
+
+        self.stages = []
+        for index_stage in sorted(stages):
+            (stage, rows_stage) = stages[index_stage]
+            stage.set_state(rows_stage)
+            self.stages.append(stage)
+
 
     def filter(self, ds_source):
         """
@@ -378,12 +1543,57 @@ class Filter:
                 `DataSet` to filter.
 
         :Returns:
-            `DataSet` : data set filtered
+            `DataSet` : data set filtered. In fused mode, or if the
+            `Filter` has stages, this is a `DataSetColumnar`.
+
+        :Raises NpyDataTypeError:
+            If ds_source has already been numerized.
+        """
+
+        if len(self.stages) == 0:
+            return self.__filter_base(ds_source)
+
+        data_set = self.__filter_columnar(ds_source)
+        for stage in self.stages:
+            data_set = stage.transform(data_set)
+        return data_set
+
+
+    def __filter_base(self, ds_source):
         """
+        Numerize and normalize ds_source.
+        """
+        if not self.fused:
+            ds_numerized = self.numerizer.numerize(ds_source)
+            ds_normalized = self.normalizer.normalize(ds_numerized)
+            return ds_normalized
 
-        ds_numerized = self.numerizer.numerize(ds_source)
-        ds_normalized = self.normalizer.normalize(ds_numerized)
-        return ds_normalized
+        if ds_source.is_numerized == True:
+            raise NpyDataTypeError, 'ds_source has already been numerized.'
+
+        ds_dest = DataSetColumnar(ds_source.get_name_attribute())
+        for data_instance in ds_source.get_data_instances():
+            attributes = self.numerizer.numerize_attributes(data_instance.get_attributes())
+            attributes = self.normalizer.normalize_attributes(attributes)
+            label = self.numerizer.numerize_label(data_instance.get_label_number())
+            ds_dest.add_data_instance(data_instance.get_index_number(), attributes, label)
+
+        return ds_dest
+
+
+    def __filter_columnar(self, ds_source):
+        """
+        Numerize and normalize ds_source into a `DataSetColumnar`, on which
+        the stages can be applied.
+        """
+        data_set = self.__filter_base(ds_source)
+        if isinstance(data_set, DataSetColumnar):
+            return data_set
+
+        ds_dest = DataSetColumnar(data_set.get_name_attribute())
+        for data_instance in data_set.get_data_instances():
+            ds_dest.add_data_instance_object(data_instance)
+        return ds_dest
 
 
     def label_number_to_string(self, number):
@@ -400,3 +1610,11 @@ class Filter:
         """
 
         return self.numerizer.label_number_to_string(number)
+
+
+# Declare the filter stages to the Factory
+Factory.declare_instance(StageStandardize())
+Factory.declare_instance(StageOneHot())
+Factory.declare_instance(StageClip())
+Factory.declare_instance(StageLog())
+Factory.declare_instance(StageImpute())
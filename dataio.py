@@ -22,10 +22,89 @@ __docformat__ = "restructuredtext en"
 
 import csv
 import sys
+import os
+import multiprocessing
+import cStringIO
+import itertools
+import struct
+import array
+import zlib
 from data import DataSet
 from data import DataInstance
+from data import DataClassification
 from exception import *
 
+
+def split_row(row, index_label, index_id, null_values):
+    """
+    Split a row of a CSV file into the fields of a `DataInstance`.
+
+    :Parameters:
+        row : sequence of strings
+            Fields of the row.
+        index_label : integer
+            Index of the label field.
+        index_id : integer
+            Index of the id field, or None if the file has no id field.
+        null_values : sequence of strings
+            Strings to be replaced by None in the attributes.
+
+    :Returns:
+        tuple : the index number (None if the file has no id field),
+        the sequence of attribute values and the label.
+    """
+    value_attribute = []
+    for index_attribute, value in enumerate(row):
+        if index_attribute == index_label or index_attribute == index_id:
+            continue
+        if value in null_values:
+            value = None
+        value_attribute.append(value)
+
+    if index_id == None:
+        index_instance = None
+    else:
+        index_instance = row[index_id]
+
+    return (index_instance, tuple(value_attribute), row[index_label])
+
+
+def read_range(arguments):
+    """
+    Parse the rows contained in a byte range of a CSV file. This function
+    is run by the worker processes of `DataIO_CSV.read_parallel`.
+
+    :Parameters:
+        arguments : tuple
+            The file name, the first and last byte offsets of the range,
+            which must be at line boundaries, the index of the label field,
+            the index of the id field and the null values.
+
+    :Returns:
+        list of tuples : the fields of each row, as returned by split_row().
+
+    :Raises NpyStreamError:
+        If a problem occurs while reading the file.
+    """
+    (filename, offset_begin, offset_end, index_label, index_id, null_values) = arguments
+
+    try:
+        stream = open(filename, "rb")
+        try:
+            stream.seek(offset_begin)
+            content = stream.read(offset_end - offset_begin)
+        finally:
+            stream.close()
+    except IOError:
+        raise NpyStreamError, 'Unable to read the file: ' + filename
+
+    rows = []
+    for row in csv.reader(cStringIO.StringIO(content)):
+        rows.append(split_row(row, index_label, index_id, null_values))
+
+    return rows
+
+
 class DataIO_CSV:
     """
     Data CSV input/output class 
@@ -43,8 +122,14 @@ class DataIO_CSV:
         __null_values : sequence of strings
             Strings that are to be considered as representing invalid
             and/or missing values in the data set.
+
+    :CVariables:
+        buffer_rows : integer
+            Number of rows written at once by write().
     """
 
+    buffer_rows = 10000
+
     def __init__(self, stream=None, attribute_id=None, attribute_label=None, null_values=[]):
         """
         Initializer
@@ -123,10 +208,174 @@ class DataIO_CSV:
         self.attribute_label = name
 
 
-    # TODO there is a read method, but not a write: code the write one!
+    def __open_stream(self):
+        """
+        Open the CSV file for reading.
+
+        :Returns:
+            file : the opened file.
+
+        :Raises NpyStreamError:
+            If the file cannot be opened.
+        """
+        try:
+            return open(self.stream, "rb")
+        except IOError:
+            string_error = 'Unable to read the file: ' + self.stream
+            raise NpyStreamError, string_error
+
+
+    def __read_header(self, reader):
+        """
+        Read the first row of the CSV file, which holds the attribute
+        names, and locate the label and id fields in it.
+
+        :Parameters:
+            reader : csv.reader
+                Reader positioned at the beginning of the file.
+
+        :Returns:
+            tuple : the index of the label field, the index of the id field
+            (None if the file has no id field), and the sequence of the
+            attribute names.
+
+        :Raises NpyStreamError:
+            If the file is empty.
+
+        :Raises NpyIndexError:
+            If the label index is not found, making it impossible to create
+            a valid DataSet.
+        """
+        try:
+            header = reader.next()
+        except StopIteration:
+            raise NpyStreamError, 'The file is empty: ' + self.stream
+
+        # Check that we can find the label index in the attribute list
+        try:
+            index_label = header.index(self.attribute_label)
+        except ValueError:
+            raise NpyIndexError, 'Label attribute not found: ' + str(self.attribute_label)
+
+        # Check that we can find the id index in the attribute list
+        try:
+            index_id = header.index(self.attribute_id)
+        except ValueError:
+            index_id = None
+
+        name_attribute = header[:]
+        name_attribute.remove(self.attribute_label)
+        if index_id != None:
+            name_attribute.remove(self.attribute_id)
+
+        return (index_label, index_id, name_attribute)
+
+
+    def __build_instance(self, row, index_row, index_label, index_id):
+        """
+        Build a `DataInstance` from a row of the CSV file.
+
+        :Parameters:
+            row : sequence of strings
+                Fields of the row.
+            index_row : integer
+                Position of the row in the file, header excluded.
+            index_label : integer
+                Index of the label field.
+            index_id : integer
+                Index of the id field, or None if the file has no id field.
+
+        :Returns:
+            `DataInstance` : the instance described by the row.
+        """
+        (index_instance, value_attribute, label) = split_row(row, index_label, index_id, self.null_values)
+
+        if index_instance == None:
+            # If the file does not have instance indices, we simply
+            # make them based on the instance row index
+            index_instance = index_row
+
+        return DataInstance(index_instance, value_attribute, label)
+
+
+    def read_name_attribute(self):
+        """
+        Read the names of the attributes from the first row of the CSV file.
+
+        :Returns:
+            sequence of strings : the attribute names, without the label
+            and id fields.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the file.
+
+        :Raises NpyIndexError:
+            If the label index is not found.
+        """
+        stream = self.__open_stream()
+        try:
+            (index_label, index_id, name_attribute) = self.__read_header(csv.reader(stream))
+        finally:
+            stream.close()
+
+        return name_attribute
+
+
+    def iter_instances(self, chunk_size=None):
+        """
+        Read the CSV file row by row, and yield the `DataInstance` as soon
+        as they are built, without storing them into a `DataSet`. Only the
+        current row, or the current chunk, is held in memory.
+
+        :Parameters:
+            chunk_size : integer
+                If None, the instances are yielded one by one. Otherwise,
+                they are yielded as lists of chunk_size instances, the last
+                list holding the remaining ones.
+
+        :Returns:
+            generator : the `DataInstance`, or lists of `DataInstance`.
+
+        :Raises NpyValueError:
+            If chunk_size is lower than 1.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the file.
+
+        :Raises NpyIndexError:
+            If the label index is not found.
+        """
+        if chunk_size != None and chunk_size < 1:
+            raise NpyValueError, 'chunk_size has to be greater or equal to 1.'
+
+        stream = self.__open_stream()
+        try:
+            reader = csv.reader(stream)
+            (index_label, index_id, name_attribute) = self.__read_header(reader)
+
+            chunk = []
+            for index_row, row in enumerate(reader):
+                data_instance = self.__build_instance(row, index_row, index_label, index_id)
+                if chunk_size == None:
+                    yield data_instance
+                    continue
+
+                chunk.append(data_instance)
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+
+            if len(chunk) > 0:
+                yield chunk
+        finally:
+            stream.close()
+
+
     def read(self, data_set):
         """
         Read a CSV file and fill the provided DataSet with instances.
+        The file is processed in a single pass, each row being turned
+        into a `DataInstance` as soon as it is read.
 
         :Parameters:
             data_set : DataSet
@@ -146,65 +395,564 @@ class DataIO_CSV:
         if data_set.is_numerized == True:
             raise NpyDataTypeError, 'data_set has already been normalized, cannot add anything to it.'
         
-        # Store the file content into a sequence
+        stream = self.__open_stream()
+        try:
+            reader = csv.reader(stream)
+            (index_label, index_id, name_attribute) = self.__read_header(reader)
+            data_set.set_name_attribute(name_attribute) 
+
+            # Create instances with the remaining lines
+            for index_row, row in enumerate(reader):
+                data_set.add_data_instance_object(self.__build_instance(row, index_row, index_label, index_id))
+        finally:
+            stream.close()
+
+
+    def read_parallel(self, data_set, nb_processes=None, nb_ranges=None):
+        """
+        Read a CSV file with several processes and fill the provided DataSet
+        with instances. The file is split at line boundaries into byte
+        ranges that are parsed in parallel, and the instances are added to
+        data_set in the order of the file, so that the result is the same
+        as the one of read(). The fields of the file must not contain
+        line breaks.
+
+        :Parameters:
+            data_set : DataSet
+                Data Collection to be filled with the file content.
+            nb_processes : integer
+                Number of worker processes. If None, the number of CPUs
+                is used.
+            nb_ranges : integer
+                Number of byte ranges into which the file is split. If None,
+                four ranges per process are used, so that the work stays
+                balanced between processes.
+
+        :Raises NpyDataTypeError:
+            If data_set has already been normalized.
+
+        :Raises NpyValueError:
+            If nb_processes or nb_ranges is lower than 1.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the file.
+
+        :Raises NpyIndexError:
+            If the label index is not found, making it impossible to create
+            a valid DataSet.
+        """
+
+        if data_set.is_numerized == True:
+            raise NpyDataTypeError, 'data_set has already been normalized, cannot add anything to it.'
+
+        if nb_processes == None:
+            nb_processes = multiprocessing.cpu_count()
+        if nb_ranges == None:
+            nb_ranges = nb_processes * 4
+
+        if nb_processes < 1 or nb_ranges < 1:
+            raise NpyValueError, 'nb_processes and nb_ranges have to be greater or equal to 1.'
+
+        # Read the header and compute the range boundaries
+        stream = self.__open_stream()
+        try:
+            (index_label, index_id, name_attribute) = self.__read_header(csv.reader([stream.readline()]))
+            offset_begin = stream.tell()
+            size = os.fstat(stream.fileno()).st_size
+
+            range_size = max(1, (size - offset_begin) // nb_ranges)
+            boundaries = [offset_begin]
+            offset = offset_begin + range_size
+            while offset < size:
+                # Move the boundary to the beginning of the next line
+                stream.seek(offset)
+                stream.readline()
+                offset = stream.tell()
+                if offset >= size:
+                    break
+                boundaries.append(offset)
+                offset += range_size
+            boundaries.append(size)
+        finally:
+            stream.close()
+
+        data_set.set_name_attribute(name_attribute)
+
+        arguments = []
+        for offset_begin, offset_end in zip(boundaries[:-1], boundaries[1:]):
+            arguments.append((self.stream, offset_begin, offset_end, index_label, index_id, self.null_values))
+
+        pool = multiprocessing.Pool(nb_processes)
+        try:
+            index_row = 0
+            for rows in pool.imap(read_range, arguments):
+                for (index_instance, value_attribute, label) in rows:
+                    if index_instance == None:
+                        index_instance = index_row
+                    data_set.add_data_instance_object(DataInstance(index_instance, value_attribute, label))
+                    index_row += 1
+        finally:
+            # All the ranges have been consumed at this point, unless an
+            # error occurred, in which case the workers are not needed anymore
+            pool.terminate()
+            pool.join()
+
+
+    def write(self, data_set):
+        """
+        Write a `DataSet` into a CSV file. The first row holds the names of
+        the id field, if attribute_id is defined, of the attributes and of
+        the label field. The missing values are written as the first null
+        value, or as an empty string if there is no null value. The rows
+        are written by blocks of `buffer_rows` rows.
+
+        :Parameters:
+            data_set : `DataSet`
+                Data set to write.
+
+        :Raises NpyIndexError:
+            If attribute_label is not defined.
+
+        :Raises NpyStreamError:
+            If a problem occurs while writing the file.
+        """
+
+        if self.attribute_label == None:
+            raise NpyIndexError, 'attribute_label has to be defined to write a DataSet.'
+
+        if len(self.null_values) > 0:
+            null_value = self.null_values[0]
+        else:
+            null_value = ''
+
+        string_error = 'Unable to write the file: ' + str(self.stream)
         try:
-            reader = csv.reader(open(self.stream, "rb"))
+            stream = open(self.stream, "wb")
         except IOError:
-            string_error = 'Unable to read the file: ' + self.stream
             raise NpyStreamError, string_error
-            
-        rows = []
-        for row in reader:
-            rows.append(row)
 
-        # Check that we can find the label index in the attribute list
-        index_label = -1
-        index_label_found = True 
         try:
-            index_label = rows[0].index(self.attribute_label)
-        except ValueError:
-            index_label_found = False
+            writer = csv.writer(stream)
+
+            header = []
+            if self.attribute_id != None:
+                header.append(self.attribute_id)
+            header.extend(data_set.get_name_attribute())
+            header.append(self.attribute_label)
+            writer.writerow(header)
+
+            rows = []
+            for data_instance in data_set.get_data_instances():
+                row = []
+                if self.attribute_id != None:
+                    row.append(data_instance.get_index_number())
+                for value in data_instance.get_attributes():
+                    if value == None:
+                        value = null_value
+                    row.append(value)
+                row.append(data_instance.get_label_number())
+                rows.append(row)
+
+                if len(rows) == DataIO_CSV.buffer_rows:
+                    writer.writerows(rows)
+                    rows = []
+
+            writer.writerows(rows)
+        except IOError:
+            raise NpyStreamError, string_error
+        finally:
+            stream.close()
 
-        if not index_label_found:
-            raise NpyIndexError
 
-        # Check that we can find the id index in the attribute list
-        index_id = -1
-        index_id_found = True 
-        try:
-            index_id = rows[0].index(self.attribute_id)
-        except ValueError:
-            index_id_found = False
 
-        # Read the first row to get the attribute names
-        name_attribute = rows[0][:]
-        name_attribute.remove(self.attribute_label)
-        if index_id_found:
-            name_attribute.remove(self.attribute_id)
+class DataIO_Binary:
+    """
+    Data binary input/output class. `DataSet` and `DataClassification` are
+    stored column by column, each column being typed so that numbers are
+    written as raw little-endian arrays and can be read back in bulk.
+
+    The file starts with a header holding the kind of content, the flags,
+    the number of rows and the attribute names. Each column is then made of
+    its type code ('q' for 64-bit integers, 'd' for 64-bit floats, 's' for
+    strings, stored as the array of their lengths followed by their
+    concatenated bytes), the length of its content, and its content,
+    optionally compressed with zlib. In float columns, missing values
+    (None) are stored as NaN. A column holds either numbers or strings:
+    a column mixing both, or holding other values, cannot be written.
 
-        #for name in rows[0]:
-        #    if name != self.attribute_label and name != self.attribute_id:
-        #        name_attribute.append(name)
-        data_set.set_name_attribute(name_attribute) 
-
-        # Create instances with the remaining lines
-        for index_row, row in enumerate(rows[1:]):
-            value_attribute = []
-            for index_attribute, value in enumerate(row):
-                if index_attribute == index_label \
-                  or (index_id_found and index_attribute == index_id):
-                    continue
-                if value in self.null_values:
-                    value = None
-                value_attribute.append(value)
-
-            if not index_id_found:
-                # If the file does not have instance indices, we simply
-                # make them based on the instance row index
-                index_instance = index_row
+    :IVariables:
+        __stream : Stream 
+            Stream instance used for the I/O operations. In the case of this
+            binary module, the stream is the name of the file to be used.
+        __compress : boolean
+            Compress the columns when writing.
+    """
+
+    magic = 'NPYB'
+    version = 1
+    header = struct.Struct('<4sHcBBqq')
+    column = struct.Struct('<cQ')
+
+    def __init__(self, stream=None, compress=False):
+        """
+        Initializer
+        
+        :Parameters:
+            stream : string 
+                Name of the file to be used.
+            compress : boolean
+                Compress the columns when writing. Reading detects
+                compressed files automatically.
+        """
+        self.stream = stream
+        self.compress = compress
+
+
+    def set_stream(self, stream):
+        self.stream = stream
+
+
+    def get_stream(self):
+        return self.stream
+
+
+    def __column_type(self, values):
+        """
+        Find the most compact type able to hold all the given values.
+        Unicode strings are written in UTF-8, and read back as strings.
+
+        :Parameters:
+            values : sequence
+                Values of the column.
+
+        :Returns:
+            string : the type code of the column.
+
+        :Raises NpyDataTypeError:
+            If the column mixes numbers and strings, or holds values that
+            are neither numbers nor strings, or integers that do not fit
+            in 64 bits.
+        """
+        has_numbers = False
+        has_strings = False
+        type_column = 'q'
+        for value in values:
+            if value == None:
+                if type_column == 'q':
+                    type_column = 'd'
+            elif isinstance(value, basestring):
+                has_strings = True
+            elif isinstance(value, bool) or not isinstance(value, (int, long, float)):
+                raise NpyDataTypeError, 'Only numbers and strings can be written, got: %r.' % (value,)
             else:
-                index_instance = row[index_id]
+                has_numbers = True
+                if isinstance(value, float):
+                    type_column = 'd'
+                elif value < -2**63 or value >= 2**63:
+                    raise NpyDataTypeError, 'Integer too large to be written: %r.' % (value,)
+
+            if has_numbers and has_strings:
+                raise NpyDataTypeError, 'A column cannot mix numbers and strings.'
+
+        if has_strings:
+            return 's'
+        return type_column
+
+
+    def __write_column(self, stream, values, type_column):
+        """
+        Write a typed column.
+
+        :Parameters:
+            stream : file
+                File opened for writing.
+            values : sequence
+                Values of the column.
+            type_column : string
+                Type code of the column, given by __column_type().
+        """
+
+        if type_column == 'q':
+            content = struct.pack('<%dq' % len(values), *values)
+        elif type_column == 'd':
+            nan = float('nan')
+            column = array.array('d', [nan if value == None else value for value in values])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            content = column.tostring()
+        else:
+            lengths = []
+            parts = []
+            for value in values:
+                if value == None:
+                    lengths.append(-1)
+                    continue
+                if isinstance(value, unicode):
+                    value = value.encode('utf-8')
+                lengths.append(len(value))
+                parts.append(value)
+            content = struct.pack('<%di' % len(lengths), *lengths) + ''.join(parts)
+
+        if self.compress:
+            content = zlib.compress(content)
+
+        stream.write(DataIO_Binary.column.pack(type_column, len(content)))
+        stream.write(content)
+
+
+    def __read_column(self, stream, nb_rows, compressed):
+        """
+        Read a typed column.
+
+        :Parameters:
+            stream : file
+                File opened for reading, positioned at the column.
+            nb_rows : integer
+                Number of values in the column.
+            compressed : boolean
+                True if the column content is compressed.
 
-            label = row[index_label]
+        :Returns:
+            sequence : the values of the column.
+
+        :Raises NpyStreamError:
+            If the column is truncated or corrupted.
+        """
+        string_error = 'Corrupted column in the file: ' + str(self.stream)
+        (type_column, size) = DataIO_Binary.column.unpack(stream.read(DataIO_Binary.column.size))
+        content = stream.read(size)
+        if len(content) != size:
+            raise NpyStreamError, string_error
+        if compressed:
+            content = zlib.decompress(content)
+
+        # The size of the content has to match the number of rows
+        if type_column in ('q', 'd'):
+            if len(content) != 8 * nb_rows:
+                raise NpyStreamError, string_error
+        elif type_column == 's':
+            if len(content) < 4 * nb_rows:
+                raise NpyStreamError, string_error
+        else:
+            raise NpyStreamError, string_error
+
+        if type_column == 'q':
+            return struct.unpack('<%dq' % nb_rows, content)
+
+        if type_column == 'd':
+            column = array.array('d')
+            column.fromstring(content)
+            if sys.byteorder == 'big':
+                column.byteswap()
+            return [None if value != value else value for value in column]
+
+        # The lengths of the strings come first, then the strings
+        lengths = struct.unpack_from('<%di' % nb_rows, content)
+        offset = 4 * nb_rows
+        values = []
+        for length in lengths:
+            if length < 0:
+                values.append(None)
+                continue
+            values.append(content[offset:offset + length])
+            offset += length
+
+        if offset != len(content):
+            raise NpyStreamError, string_error
+
+        return values
 
-            data_set.add_data_instance(index_instance, value_attribute, label)
+
+    def __write(self, kind, is_numerized, name_attribute, columns):
+        """
+        Write a file with the given header information and columns.
+
+        :Raises NpyStreamError:
+            If a problem occurs while writing the file.
+
+        :Raises NpyDataTypeError:
+            If a column cannot be written, in which case the file is not
+            created.
+        """
+        types_column = [self.__column_type(values) for values in columns]
+
+        string_error = 'Unable to write the file: ' + str(self.stream)
+        try:
+            stream = open(self.stream, "wb")
+        except IOError:
+            raise NpyStreamError, string_error
+
+        try:
+            stream.write(DataIO_Binary.header.pack(DataIO_Binary.magic, DataIO_Binary.version, kind, self.compress, is_numerized, len(columns[0]), len(name_attribute)))
+            for name in name_attribute:
+                name = str(name)
+                stream.write(struct.pack('<I', len(name)))
+                stream.write(name)
+
+            for values, type_column in zip(columns, types_column):
+                self.__write_column(stream, values, type_column)
+        except IOError:
+            raise NpyStreamError, string_error
+        finally:
+            stream.close()
+
+
+    def __read(self, kind):
+        """
+        Read a file written by __write().
+
+        :Returns:
+            tuple : the numerized flag, the attribute names and the columns.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the file, or if the file
+            does not hold the expected kind of content.
+        """
+        string_error = 'Unable to read the file: ' + str(self.stream)
+        try:
+            stream = open(self.stream, "rb")
+        except IOError:
+            raise NpyStreamError, string_error
+
+        try:
+            try:
+                (magic, version, kind_file, compressed, is_numerized, nb_rows, nb_attributes) = DataIO_Binary.header.unpack(stream.read(DataIO_Binary.header.size))
+                if magic != DataIO_Binary.magic or version != DataIO_Binary.version or kind_file != kind:
+                    raise NpyStreamError, string_error
+
+                name_attribute = []
+                for i in range(nb_attributes):
+                    (length,) = struct.unpack('<I', stream.read(4))
+                    name = stream.read(length)
+                    if len(name) != length:
+                        raise NpyStreamError, string_error
+                    name_attribute.append(name)
+
+                columns = []
+                nb_columns = 2
+                if kind == 'S':
+                    nb_columns += nb_attributes
+                for i in range(nb_columns):
+                    columns.append(self.__read_column(stream, nb_rows, compressed))
+            except (IOError, struct.error, zlib.error):
+                raise NpyStreamError, string_error
+        finally:
+            stream.close()
+
+        return (bool(is_numerized), name_attribute, columns)
+
+
+    def write(self, data_set):
+        """
+        Write a `DataSet` into a binary file.
+
+        :Parameters:
+            data_set : `DataSet`
+                Data set to write.
+
+        :Raises NpyStreamError:
+            If a problem occurs while writing the file.
+
+        :Raises NpyDataTypeError:
+            If a column mixes numbers and strings, or holds values that are
+            neither numbers nor strings.
+        """
+        nb_attributes = data_set.get_nb_attributes()
+        index_numbers = []
+        labels = []
+        attributes = [[] for i in range(nb_attributes)]
+
+        for data_instance in data_set.get_data_instances():
+            index_numbers.append(data_instance.get_index_number())
+            labels.append(data_instance.get_label_number())
+            for column, value in zip(attributes, data_instance.get_attributes()):
+                column.append(value)
+
+        columns = [index_numbers, labels]
+        columns.extend(attributes)
+        self.__write('S', data_set.is_numerized, data_set.get_name_attribute(), columns)
+
+
+    def read(self, data_set):
+        """
+        Read a binary file and fill the provided `DataSet` with instances.
+        The numerized state of the written `DataSet` is restored.
+
+        :Parameters:
+            data_set : `DataSet`
+                Data Collection to be filled with the file content.
+
+        :Raises NpyDataTypeError:
+            If data_set has already been numerized.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the file.
+
+        :Raises NpyIndexError:
+            If an index number is already present in data_set.
+        """
+        if data_set.is_numerized == True:
+            raise NpyDataTypeError, 'data_set has already been normalized, cannot add anything to it.'
+
+        (is_numerized, name_attribute, columns) = self.__read('S')
+        data_set.set_name_attribute(name_attribute)
+
+        rows = zip(*columns[2:])
+        if len(rows) == 0:
+            rows = [() for i in range(len(columns[0]))]
+
+        for index_number, label, attributes in itertools.izip(columns[0], columns[1], rows):
+            data_set.add_data_instance_object(DataInstance(index_number, attributes, label))
+
+        data_set.is_numerized = is_numerized
+
+
+    def write_classification(self, data_classification):
+        """
+        Write a `DataClassification` into a binary file. Only the index
+        numbers of the instances and their labels are written.
+
+        :Parameters:
+            data_classification : `DataClassification`
+                Classification to write.
+
+        :Raises NpyStreamError:
+            If a problem occurs while writing the file.
+
+        :Raises NpyDataTypeError:
+            If a column mixes numbers and strings, or holds values that are
+            neither numbers nor strings.
+        """
+        index_numbers = data_classification.get_index_numbers()
+        labels = data_classification.get_label_numbers()
+
+        self.__write('C', True, (), [index_numbers, labels])
+
+
+    def read_classification(self, data_classification, data_set=None):
+        """
+        Read a binary file and fill the provided `DataClassification`.
+
+        :Parameters:
+            data_classification : `DataClassification`
+                Classification to be filled with the file content.
+            data_set : `DataSet`
+                `DataSet` holding the classified instances. If None, or if
+                an instance is not found in it, the labels are attached to
+                new instances holding only the index number.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the file.
+
+        :Raises NpyIndexError:
+            If an index number is already present in data_classification.
+        """
+        (is_numerized, name_attribute, columns) = self.__read('C')
+
+        for index_number, label in itertools.izip(columns[0], columns[1]):
+            data_instance = None
+            if data_set != None:
+                data_instance = data_set.get_data_instance_by_id(index_number)
+            if data_instance == None:
+                data_instance = DataInstance(index_number, (), None)
+            data_classification.add_data_label(data_instance, label)
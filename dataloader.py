@@ -0,0 +1,187 @@
+"""
+Data loader module.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful, 
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import random
+import threading
+import Queue
+
+from exception import *
+
+
+class DataLoader:
+    """
+    Iterates over the `DataInstance` of a `DataSet` by mini-batches, in an
+    order shuffled at every epoch. The batches are assembled ahead of time
+    by a background thread and handed over through a bounded queue, so
+    that reading the data, for instance from a `DataSetMapped`, overlaps
+    with the training. Any `DataSet` is accepted: the plain `DataSet`, the
+    `DataSetColumnar` and the `DataSetMapped`.
+
+    :IVariables:
+        __data_instances : sequence of `DataInstance`
+            Instances of the `DataSet`, accessed by position.
+        __batch_size : integer
+            Number of instances per batch.
+        __shuffle : boolean
+            Shuffle the instances at every epoch.
+        __block_size : integer
+            If not None, the shuffling moves blocks of block_size
+            consecutive instances and shuffles the instances inside each
+            block, which keeps the reads of a `DataSetMapped` local.
+        __nb_prefetch : integer
+            Maximum number of batches prepared in advance.
+        __random : `random.Random`
+            Random generator used for the shuffling.
+    """
+
+    def __init__(self, data_set, batch_size=1, shuffle=True, nb_prefetch=4, block_size=None, seed=None):
+        """
+        Initializer
+
+        :Parameters:
+            data_set : `DataSet`
+                Data to iterate over.
+            batch_size : integer
+                Number of instances per batch.
+            shuffle : boolean
+                Shuffle the instances at every epoch.
+            nb_prefetch : integer
+                Maximum number of batches prepared in advance.
+            block_size : integer
+                Size of the blocks of consecutive instances moved together
+                by the shuffling. If None, the instances are shuffled
+                individually.
+            seed
+                Seed of the random generator.
+
+        :Raises NpyValueError:
+            If batch_size, nb_prefetch or block_size is lower than 1.
+        """
+        if batch_size < 1 or nb_prefetch < 1 or (block_size != None and block_size < 1):
+            raise NpyValueError, 'batch_size, nb_prefetch and block_size have to be greater or equal to 1.'
+
+        self.data_set = data_set
+        self.data_instances = data_set.get_data_instances()
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.block_size = block_size
+        self.nb_prefetch = nb_prefetch
+        self.random = random.Random(seed)
+
+
+    def get_data_set(self):
+        return self.data_set
+
+
+    def get_random(self):
+        return self.random
+
+
+    def get_permutation(self):
+        """
+        Compute the order of the instances for a new epoch.
+
+        :Returns:
+            sequence of integers : the positions of the instances.
+        """
+        nb_data_instances = len(self.data_instances)
+        if not self.shuffle:
+            return range(nb_data_instances)
+
+        if self.block_size == None:
+            positions = range(nb_data_instances)
+            self.random.shuffle(positions)
+            return positions
+
+        blocks = range(0, nb_data_instances, self.block_size)
+        self.random.shuffle(blocks)
+        positions = []
+        for begin in blocks:
+            block = range(begin, min(begin + self.block_size, nb_data_instances))
+            self.random.shuffle(block)
+            positions.extend(block)
+        return positions
+
+
+    def __produce(self, positions, queue, stop):
+        """
+        Assemble the batches of an epoch and put them into the queue,
+        followed by None. An exception is put into the queue instead of
+        being raised, so that it reaches the consumer.
+        """
+        try:
+            for begin in xrange(0, len(positions), self.batch_size):
+                batch = [self.data_instances[position] for position in positions[begin:begin + self.batch_size]]
+                if not self.__put(queue, stop, batch):
+                    return
+            self.__put(queue, stop, None)
+        except Exception, e:
+            self.__put(queue, stop, e)
+
+
+    def __put(self, queue, stop, item):
+        """
+        Put an item into the queue, unless the consumer has stopped.
+
+        :Returns:
+            boolean : True if the item has been put.
+        """
+        while not stop.is_set():
+            try:
+                queue.put(item, True, 0.1)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+
+    def iter_epoch(self):
+        """
+        Iterate over the instances for one epoch.
+
+        :Returns:
+            generator : the batches, as lists of `DataInstance`.
+        """
+        positions = self.get_permutation()
+        queue = Queue.Queue(self.nb_prefetch)
+        stop = threading.Event()
+
+        producer = threading.Thread(target=self.__produce, args=(positions, queue, stop))
+        producer.daemon = True
+        producer.start()
+
+        try:
+            while True:
+                item = queue.get()
+                if item == None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            producer.join()
+
+
+    def __iter__(self):
+        return self.iter_epoch()
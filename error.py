@@ -21,10 +21,12 @@ __docformat__ = "restructuredtext en"
 ## along with npy.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import math
 import itertools
 
 from factory import FactoryMixin
 from factory import Factory
+from exception import *
 
 
 class Error(FactoryMixin):
@@ -69,6 +71,23 @@ class Error(FactoryMixin):
         return None
 
 
+    def compute_loss(self, desired_output, outputs):
+        """
+        Compute the loss of which the errors computed by compute_errors()
+        are the opposite of the gradient, for an output unit.
+
+        :Parameters:
+            desired_output : sequence of floats
+                Output desired for the current instance.
+            outputs : sequence of floats
+                Output computed by the output unit.
+
+        :Returns:
+            float : the value of the loss.
+        """
+        return None
+
+
 
 class ErrorOutputDifference(Error):
     """
@@ -89,6 +108,10 @@ class ErrorOutputDifference(Error):
         return errors
 
 
+    def compute_loss(self, desired_output, outputs):
+        return 0.5 * math.fsum([(desired - computed) ** 2 for desired, computed in itertools.izip(desired_output, outputs)])
+
+
     @staticmethod
     def build_instance():
         return ErrorOutputDifference()
@@ -137,6 +160,54 @@ class ErrorLinear(Error):
         return ErrorLinear()
 
 
+class ErrorCrossEntropy(Error):
+    """
+    Cross-entropy error function class, for an output `Unit` using the
+    softmax activation function, or the sigmoid activation function with
+    a single node. For those units the derivative of the cross-entropy with
+    respect to the weighted sums is the difference between the desired and
+    computed outputs: the derivative of the activation function cancels
+    out, which avoids the slow learning of saturated outputs.
+    """
+
+    # Smallest output value used in the logarithms
+    epsilon = 1e-300
+
+    def __init__(self):
+        Error.__init__(self)
+        self._set_name("er_crossentropy")
+
+
+    def compute_errors(self, next_unit_errors, desired_output, outputs, next_unit_weights, activation_derivative):
+        """
+        :Raises NpyTransferFunctionError:
+            If ErrorCrossEntropy is used in a hidden `Unit`.
+        """
+        if next_unit_weights != None:
+            raise NpyTransferFunctionError, 'ErrorCrossEntropy can only be used in an output unit.'
+
+        return [desired - computed for desired, computed in itertools.izip(desired_output, outputs)]
+
+
+    def compute_loss(self, desired_output, outputs):
+        """
+        The loss is the categorical cross-entropy for several nodes, and
+        the binary cross-entropy for a single node.
+        """
+        epsilon = ErrorCrossEntropy.epsilon
+        if len(outputs) == 1:
+            desired_output = (desired_output[0], 1 - desired_output[0])
+            outputs = (outputs[0], 1 - outputs[0])
+
+        return -math.fsum([desired * math.log(max(computed, epsilon)) for desired, computed in itertools.izip(desired_output, outputs) if desired != 0])
+
+
+    @staticmethod
+    def build_instance():
+        return ErrorCrossEntropy()
+
+
 # Declare the error functions to the Factory
 Factory.declare_instance(ErrorOutputDifference())
 Factory.declare_instance(ErrorLinear())
+Factory.declare_instance(ErrorCrossEntropy())
@@ -124,13 +124,16 @@ if __name__ == '__main__':
     metric = MetricAccuracy()
     print 'Accuracy:', metric.compute_metric(ds_filtered, classification)
 
-    # Save the network topology and its content
+    # Save the network topology and its content, along with the filter
+    # needed to prepare the data the network will classify
     csv_stream = NetworkIO_CSV('csvfile.csv')
     csv_stream.write_topology(network)
     csv_stream.write_weights(network)
+    csv_stream.write_filter(data_filter)
 
     # Create a new network identical to the one that has just been trained
     network_new = Network()
     csv_stream.read_topology(network_new)
     csv_stream.read_weights(network_new)
+    data_filter_new = csv_stream.read_filter()
 
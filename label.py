@@ -21,6 +21,8 @@ __docformat__ = "restructuredtext en"
 ## along with npy.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import array
+
 from factory import FactoryMixin
 from factory import Factory
 
@@ -72,6 +74,55 @@ class Label(FactoryMixin):
         pass
 
 
+    def vector_to_scores(self, vector):
+        """
+        Convert a vector produced as an output by a network into the
+        scores of every label it can be converted to.
+
+        :Parameters:
+            vector : sequence
+                The vector produced as an output by a network.
+
+        :Returns:
+            sequence of tuples : the label and its score, for every label.
+        """
+        pass
+
+
+    def labels_to_matrix(self, labels, nb_node):
+        """
+        Convert several labels into the vectors a network is supposed to
+        produce.
+
+        :Parameters:
+            labels : sequence of numbers
+                The labels to convert.
+            nb_node : integer
+                The number of nodes in the output unit of the network.
+
+        :Returns:
+            sequence of sequences : the vectors associated with the
+            provided labels, in the same order.
+        """
+        return [self.label_to_vector(label, nb_node) for label in labels]
+
+
+    def matrix_to_labels(self, matrix):
+        """
+        Convert several vectors produced as outputs by a network into
+        labels.
+
+        :Parameters:
+            matrix : sequence of sequences
+                The vectors produced as outputs by a network.
+
+        :Returns:
+            sequence of numbers : the labels associated with the vectors,
+            in the same order.
+        """
+        return [self.vector_to_label(vector) for vector in matrix]
+
+
 
 class LabelMax(Label):
     """
@@ -105,21 +156,56 @@ class LabelMax(Label):
 
 
     def vector_to_label(self, vector):
-        index_max = 0
         if len(vector) == 1:
             if(vector[0] >= .5):
                 label = 2
             else:
                 label = 1
         else:
-            for index in range(1, len(vector)):
-                if vector[index] > vector[index_max]:
-                    index_max = index
-            label = index_max + 1
+            # max() keeps the first of the maximum values
+            label = max(xrange(len(vector)), key=vector.__getitem__) + 1
         
         return label
 
 
+    def vector_to_scores(self, vector):
+        if len(vector) == 1:
+            return [(1, 1 - vector[0]), (2, vector[0])]
+
+        return [(index + 1, value) for index, value in enumerate(vector)]
+
+
+    def labels_to_matrix(self, labels, nb_node):
+        """
+        The vectors are built once per distinct label and shared by the
+        rows of the matrix, as tuples so that they cannot be modified.
+        """
+        vectors = {}
+        matrix = []
+        for label in labels:
+            vector = vectors.get(label)
+            if vector == None:
+                vector = tuple(self.label_to_vector(label, nb_node))
+                vectors[label] = vector
+            matrix.append(vector)
+
+        return matrix
+
+
+    def matrix_to_labels(self, matrix):
+        labels = array.array('l')
+        if len(matrix) == 0:
+            return labels
+
+        if len(matrix[0]) == 1:
+            labels.extend([2 if vector[0] >= .5 else 1 for vector in matrix])
+        else:
+            indexes = xrange(len(matrix[0]))
+            labels.extend([max(indexes, key=vector.__getitem__) + 1 for vector in matrix])
+
+        return labels
+
+
     @staticmethod
     def build_instance():
         return LabelMax()
@@ -79,12 +79,11 @@ class MetricAccuracy(Metric):
 
         for data_instance_original in data_instances:
             label_original = data_instance_original.get_label_number()
-            data_instance_classified = data_classification.get_data_label_by_id(data_instance_original.get_index_number())
-            label_classified = data_instance_classified.get_label_number()
+            label_classified = data_classification.get_label_number_by_id(data_instance_original.get_index_number())
             if label_classified == label_original:
                 nb_correctly_classified += 1
 
-        return nb_correctly_classified / len(data_instances)
+        return float(nb_correctly_classified) / len(data_instances)
 
 
     @staticmethod
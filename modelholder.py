@@ -0,0 +1,224 @@
+"""
+Model holder module.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful, 
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import zipfile
+import threading
+
+from network import Network
+from networkio import NetworkIO_Binary
+from networkio import NetworkIO_Bundle
+from exception import *
+
+
+def load_model(path):
+    """
+    Load a model from a file written either by `NetworkIO_Bundle` or by
+    `NetworkIO_Binary`.
+
+    :Parameters:
+        path : string
+            Name of the file.
+
+    :Returns:
+        tuple : the `Network` and its `Filter`, which is None if the file
+        does not hold one.
+
+    :Raises NpyStreamError:
+        If a problem occurs while reading the file.
+    """
+    network = Network()
+    if zipfile.is_zipfile(path):
+        data_filter = NetworkIO_Bundle(path).read(network)
+    else:
+        NetworkIO_Binary(path).read(network)
+        data_filter = None
+
+    return (network, data_filter)
+
+
+
+class ModelHolder:
+    """
+    Holds the current version of a model used for inference, and replaces
+    it when the file it has been loaded from changes. A background thread
+    watches the file and loads the new version completely before swapping
+    it with the current one in a single assignment, so that the readers
+    never take a lock: a request gets the model once with get_model() and
+    finishes with that version even if a swap happens meanwhile.
+
+    The file should be replaced atomically, for instance by writing a
+    temporary file and renaming it, as `NetworkIO_Bundle` does. If a new
+    version cannot be loaded, whatever the exception raised by the loader,
+    the current one is kept and the error is recorded, and the file is
+    tried again when it changes.
+
+    :IVariables:
+        __path : string
+            Name of the watched file.
+        __loader : function
+            Function taking the name of the file and returning the `Network`
+            and the `Filter` of the model.
+        __interval : float
+            Number of seconds between two checks of the file.
+        __model : tuple
+            Current `Network`, `Filter` and version number.
+        __signature : tuple
+            Modification time, size and inode of the file for the last
+            loading attempt.
+        __error : Exception
+            Error of the last loading attempt, or None if it succeeded.
+        __thread : `threading.Thread`
+            Watching thread, or None if it is not running.
+        __stop : `threading.Event`
+            Event used to stop the watching thread.
+    """
+
+    def __init__(self, path, loader=load_model, interval=1.0):
+        """
+        Initializer. The model is loaded before returning.
+
+        :Parameters:
+            path : string
+                Name of the watched file.
+            loader : function
+                Function taking the name of the file and returning the
+                `Network` and the `Filter` of the model.
+            interval : float
+                Number of seconds between two checks of the file.
+
+        :Raises NpyStreamError:
+            If the model cannot be loaded.
+        """
+        self.path = path
+        self.loader = loader
+        self.interval = interval
+        self.model = None
+        self.signature = None
+        self.error = None
+        self.thread = None
+        self.stop = threading.Event()
+
+        self.reload()
+        if self.error != None:
+            raise NpyStreamError, 'Unable to load the model ' + str(self.path) + ': ' + str(self.error)
+
+
+    def __get_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+
+        return (stat.st_mtime, stat.st_size, stat.st_ino)
+
+
+    def reload(self):
+        """
+        Load the file and swap the current model with it. If the file
+        cannot be loaded, the current model is kept and the exception
+        raised by the loader is recorded instead of being propagated, so
+        that a bad file never stops the watching thread.
+
+        :Returns:
+            boolean : True if the model has been swapped.
+        """
+        self.signature = self.__get_signature()
+        try:
+            (network, data_filter) = self.loader(self.path)
+        except Exception, e:
+            self.error = e
+            return False
+
+        version = 1
+        if self.model != None:
+            version = self.model[2] + 1
+
+        self.error = None
+        self.model = (network, data_filter, version)
+        return True
+
+
+    def check(self):
+        """
+        Reload the model if the file has changed since the last loading
+        attempt.
+
+        :Returns:
+            boolean : True if the model has been swapped.
+        """
+        signature = self.__get_signature()
+        if signature == None or signature == self.signature:
+            return False
+
+        return self.reload()
+
+
+    def __watch(self):
+        while not self.stop.wait(self.interval):
+            self.check()
+
+
+    def start(self):
+        """
+        Start watching the file in a background thread.
+        """
+        if self.thread != None:
+            return
+
+        self.stop.clear()
+        self.thread = threading.Thread(target=self.__watch)
+        self.thread.daemon = True
+        self.thread.start()
+
+
+    def close(self):
+        """
+        Stop watching the file.
+        """
+        if self.thread == None:
+            return
+
+        self.stop.set()
+        self.thread.join()
+        self.thread = None
+
+
+    def get_model(self):
+        """
+        Get the current version of the model. The returned tuple stays
+        consistent even if the model is swapped afterwards.
+
+        :Returns:
+            tuple : the `Network`, the `Filter` (or None) and the version
+            number, starting from 1.
+        """
+        return self.model
+
+
+    def get_network(self):
+        return self.model[0]
+
+
+    def get_error(self):
+        return self.error
@@ -22,13 +22,20 @@ __docformat__ = "restructuredtext en"
 
 
 import math
+import array
+import timeit
+import contextlib
+import heapq
+import operator
 import itertools
 import random
+import threading
 
 from data import *
 from factory import Factory
 from activation import Activation
 from update import Update
+from error import Error
 from error import ErrorLinear
 from error import ErrorOutputDifference
 from exception import *
@@ -207,11 +214,7 @@ class Unit:
         :Returns:
             sequence of floats : the output data for the current unit.
         """
-        values = []
-        for node in self.nodes: 
-            values.append(node.compute_output(input, self.activation_function))
-        
-        return values 
+        return self.activation_function.compute_activations(input, self.get_weights())
 
     
     def compute_activation(self, inputs, weights):
@@ -230,6 +233,30 @@ class Unit:
         return self.activation_function.compute_activation(inputs, weights)
 
     
+    def check_error_function(self, is_output):
+        """
+        Check that the activation function of the unit can be used with its
+        error function, at its position in the network.
+
+        :Parameters:
+            is_output : boolean
+                True if the unit is the output unit of the network.
+
+        :Raises NpyTransferFunctionError:
+            If the activation function requires another error function, or
+            can only be used in the output unit.
+        """
+        name_error_function = self.activation_function.output_error_function
+        if name_error_function == None:
+            return
+
+        if not is_output:
+            raise NpyTransferFunctionError, self.activation_function.get_name() + ' can only be used in the output unit.'
+
+        if self.error_function == None or self.error_function.get_name() != name_error_function:
+            raise NpyTransferFunctionError, self.activation_function.get_name() + ' can only be used with ' + name_error_function + '.'
+
+
     def compute_errors(self, next_unit_errors, desired_output, outputs, next_unit_weights, index_unit, nb_unit):
         """
         Compute the error
@@ -257,7 +284,12 @@ class Unit:
 
         :Returns:
             The error for the unit.
+
+        :Raises NpyTransferFunctionError:
+            If the activation function cannot be used with the error
+            function at this position.
         """
+        self.check_error_function(index_unit == nb_unit - 1)
 
         if self.error_function == None:
             if index_unit == nb_unit - 1:
@@ -272,6 +304,28 @@ class Unit:
         #return self.activation_function.compute_errors(next_unit_errors, desired_output, outputs, next_unit_weights, index_unit, nb_unit)
 
 
+    def compute_loss(self, desired_output, outputs):
+        """
+        Compute the loss of the unit, which has to be the output unit.
+
+        :Parameters:
+            desired_output : sequence of floats
+                Output desired for the current data_instance.
+            outputs : sequence of floats
+                Output of the unit.
+
+        :Returns:
+            float : the value of the loss given by the error function of
+            the unit.
+        """
+        if self.error_function == None:
+            error_function = ErrorOutputDifference()
+        else:
+            error_function = self.error_function
+
+        return error_function.compute_loss(desired_output, outputs)
+
+
     def compute_update(self, index, unit, outputs, error_network, update_network, user_data_in, user_data_out): 
         """
         Compute the update to be applied, given the provided parameters. 
@@ -296,6 +350,26 @@ class Unit:
             The new values for the weights, after having applied the updates. 
         """
         return self.update_function.compute_update(index, unit, outputs, error_network, update_network, user_data_in, user_data_out)
+
+
+    def compute_batch_update(self, gradient, loss, learning_rate):
+        """
+        Compute the update to be applied at the end of a learning cycle,
+        with an update function of which is_batch is True.
+
+        :Parameters:
+            gradient : array of floats
+                Gradient of the loss with respect to the weights of the
+                unit, flattened node by node.
+            loss : float
+                Loss of the network over the whole `DataSet`.
+            learning_rate : float
+                Learning rate of the network.
+
+        :Returns:
+            The new values for the weights, after having applied the updates. 
+        """
+        return self.update_function.compute_batch_update(self, gradient, loss, learning_rate)
    
 
 class UnitInput(Unit):
@@ -326,6 +400,122 @@ class UnitInput(Unit):
 
 
 
+class NetworkStats:
+    """
+    Cumulative wall time and number of calls of the sections of the
+    computations of a `Network`, recorded when the network is profiled.
+    The sections are 'forward' (computation of the outputs), 'errors'
+    (backpropagation of the errors), 'deltas' (construction of the weight
+    updates), 'compute_update' (computation of the new weights by the
+    update functions) and 'set_weights'. Every section is recorded for the
+    whole network, with the unit index None, and for every unit, the
+    units being numbered from 2 as in `Network.get_topology`. The records
+    are protected by a lock, so that several threads using networks that
+    share the same statistics can record their calls concurrently.
+
+    :IVariables:
+        __records : dictionary
+            Associates the (section, index_unit) tuples to the lists
+            [number of calls, cumulative time in seconds].
+        __lock : `threading.Lock`
+            Lock protecting the records.
+    """
+
+    def __init__(self):
+        """
+        Initializer
+        """
+        self.records = {}
+        self.lock = threading.Lock()
+
+
+    def add(self, section, index_unit, seconds):
+        """
+        Record a call.
+
+        :Parameters:
+            section : string
+                Name of the section.
+            index_unit : integer
+                Index of the unit, or None for the whole network.
+            seconds : float
+                Duration of the call.
+        """
+        with self.lock:
+            record = self.records.get((section, index_unit))
+            if record == None:
+                self.records[(section, index_unit)] = [1, seconds]
+            else:
+                record[0] += 1
+                record[1] += seconds
+
+
+    def get_count(self, section, index_unit=None):
+        """
+        Get the number of calls of a section.
+
+        :Parameters:
+            section : string
+                Name of the section.
+            index_unit : integer
+                Index of the unit, or None for the whole network.
+
+        :Returns:
+            integer : the number of calls, 0 if none has been recorded.
+        """
+        with self.lock:
+            return self.records.get((section, index_unit), [0, 0.0])[0]
+
+
+    def get_time(self, section, index_unit=None):
+        """
+        Get the cumulative time of the calls of a section.
+
+        :Parameters:
+            section : string
+                Name of the section.
+            index_unit : integer
+                Index of the unit, or None for the whole network.
+
+        :Returns:
+            float : the cumulative time in seconds, 0.0 if no call has been
+            recorded.
+        """
+        with self.lock:
+            return self.records.get((section, index_unit), [0, 0.0])[1]
+
+
+    def get_records(self):
+        """
+        Get all the records.
+
+        :Returns:
+            sequence of tuples : the section, the unit index, the number of
+            calls and the cumulative time of every record, sorted by
+            section and unit.
+        """
+        with self.lock:
+            return [(section, index_unit, count, seconds) for (section, index_unit), (count, seconds) in sorted(self.records.items())]
+
+
+    def reset(self):
+        """
+        Delete all the records.
+        """
+        with self.lock:
+            self.records = {}
+
+
+    def __str__(self):
+        lines = ['%-16s %6s %10s %12s' % ('section', 'unit', 'calls', 'seconds')]
+        for (section, index_unit, count, seconds) in self.get_records():
+            if index_unit == None:
+                index_unit = 'all'
+            lines.append('%-16s %6s %10d %12.6f' % (section, index_unit, count, seconds))
+        return '\n'.join(lines)
+
+
+
 class Network(object):
     """
     Neural network class.
@@ -341,6 +531,16 @@ class Network(object):
             Toggle the use of a bias in the whole `Network`.
         __label_function : `Label`
             Label function used to label output vectors.
+        __target_key : tuple
+            `DataSet`, number of instances, label function and number of
+            output nodes for which __target_matrix has been computed.
+        __target_matrix : sequence of sequences
+            Cached vectors the network is supposed to produce for the
+            instances of a `DataSet`.
+        __target_vectors : dictionary
+            Associates the labels of the same `DataSet` to their vectors.
+        __stats : `NetworkStats`
+            Statistics recorded when the network is profiled, or None.
     """
 
     def __init__(self, learning_rate=None, use_bias=True):
@@ -356,6 +556,10 @@ class Network(object):
         self.learning_rate = learning_rate
         self._label_function = None
         self.use_bias = use_bias
+        self.target_key = None
+        self.target_matrix = None
+        self.target_vectors = None
+        self.stats = None
 
 
     def reset(self):
@@ -400,6 +604,52 @@ class Network(object):
     label_function = property(get_label_function, set_label_function)
 
 
+    def get_stats(self):
+        return self.stats
+
+
+    def set_stats(self, stats):
+        """
+        Enable or disable the profiling of the network.
+
+        :Parameters:
+            stats : `NetworkStats`
+                Statistics where to record the profiling of the network, or
+                None to disable the profiling.
+        """
+        self.stats = stats
+
+
+    @contextlib.contextmanager
+    def profile(self, stats=None):
+        """
+        Context manager that profiles the network within a with block, and
+        restores the previous profiling setting afterwards::
+
+            with network.profile() as stats:
+                network.learn_cycles(data_set, 10)
+            print stats
+
+        :Parameters:
+            stats : `NetworkStats`
+                Statistics where to record the profiling. If None, new
+                statistics are created.
+
+        :Returns:
+            `NetworkStats` : the statistics, as the target of the with
+            statement.
+        """
+        if stats == None:
+            stats = NetworkStats()
+
+        stats_previous = self.stats
+        self.stats = stats
+        try:
+            yield stats
+        finally:
+            self.stats = stats_previous
+
+
     def add_unit(self, nb_nodes, name_activation_function=None, name_update_function=None, name_error_function=None):
         """
         Adds a unit to the network as the new output unit. Takes care of
@@ -450,9 +700,10 @@ class Network(object):
             else:
                 unit_previous = self.units[-1]
 
+            nb_previous_nodes = unit_previous.get_nb_nodes()
             if self.use_bias == True:
                 # Add 1 in order to implement the bias
-                nb_previous_nodes = unit_previous.get_nb_nodes() + 1
+                nb_previous_nodes += 1
 
             # Retreive transfert function instances
             try:
@@ -503,18 +754,29 @@ class Network(object):
         if self.unit_input == None:
             raise NpyIncompleteError, 'The network has no unit, and thus cannot clasify anything.'
 
+        stats = self.stats
+        if stats != None:
+            time_begin = timeit.default_timer()
+
         if len(self.units) > 0:
             vector_output = [list(data_instance.get_attributes())] 
-            for unit in self.units:
+            for index, unit in enumerate(self.units):
                 if self.use_bias == True:
                     # Add the bias value to the input
                     vector_output[-1].append(1)
+                if stats != None:
+                    time_unit = timeit.default_timer()
                 vector_output.append(unit.compute_output(vector_output[-1])) 
+                if stats != None:
+                    stats.add('forward', index + 2, timeit.default_timer() - time_unit)
         else:
             # If the network has only a input unit, then the output vector
             # is simply the input vector!
             vector_output = list(data_instance.get_attributes())
 
+        if stats != None:
+            stats.add('forward', None, timeit.default_timer() - time_begin)
+
         return vector_output
 
     
@@ -547,6 +809,82 @@ class Network(object):
         return self.vector_to_label(values[-1])
 
 
+    def predict_proba(self, batch):
+        """
+        Compute the output vectors of the network for several instances.
+
+        :Parameters:
+            batch : sequence of `DataInstance`
+                Instances to be processed by the network, for instance
+                the result of get_data_instances() or a batch of a
+                `DataLoader`.
+
+        :Returns:
+            sequence of sequences of floats : the output vector of the
+            output unit for every instance of batch, in the same order.
+
+        :Raises NpyValueError:
+            If the number of attributes of one of the `DataInstance` is
+            invalid.
+
+        :Raises NpyIncompleteError:
+            If the `Network` has no unit.
+        """
+        outputs = []
+
+        try:
+            for data_instance in batch:
+                outputs.append(self.__compute_output(data_instance)[-1])
+        except NpyValueError, e:
+            raise NpyValueError, e.msg
+        except NpyIncompleteError, e:
+            raise NpyIncompleteError, e.msg
+
+        return outputs
+
+
+    def predict_topk(self, batch, k):
+        """
+        Compute the k labels with the best scores for several instances.
+        The scores are given by the label function of the network.
+
+        :Parameters:
+            batch : sequence of `DataInstance`
+                Instances to be processed by the network.
+            k : integer
+                Number of labels to return per instance. Less labels are
+                returned if the label function produces less than k labels.
+
+        :Returns:
+            sequence of sequences of tuples : for every instance of batch,
+            the (label, score) tuples of the best k labels, by decreasing
+            score.
+
+        :Raises NpyValueError:
+            If k is lower than 1, or if the number of attributes of one of
+            the `DataInstance` is invalid.
+
+        :Raises NpyIncompleteError:
+            If the `Network` has no unit.
+
+        :Raises NpyTransferFunctionError:
+            If no label function is defined for the network.
+        """
+        if k < 1:
+            raise NpyValueError, 'k has to be greater or equal to 1.'
+
+        if self.label_function == None:
+            raise NpyTransferFunctionError, 'No label function is defined for the network.'
+
+        score = operator.itemgetter(1)
+        topk = []
+        for vector in self.predict_proba(batch):
+            scores = self.label_function.vector_to_scores(vector)
+            topk.append(heapq.nlargest(k, scores, key=score))
+
+        return topk
+
+
     def classify_data_set(self, data_set):
         """
         Classify a `DataSet`.
@@ -573,45 +911,226 @@ class Network(object):
         if data_set.is_numerized == False:
             raise NpyDataTypeError, 'ds_source must be numerized first.'
 
-        data_classification = DataClassification()
+        data_instances = data_set.get_data_instances()
+        index_numbers = []
+        label_numbers = array.array('l')
 
         try:
-            data_instances = data_set.get_data_instances()
             for data_instance in data_instances:
-                label_number = self.classify_data_instance(data_instance)
-                data_classification.add_data_label(data_instance, label_number)
+                index_numbers.append(data_instance.get_index_number())
+                label_numbers.append(self.classify_data_instance(data_instance))
         except NpyValueError, e:
             raise NpyValueError, e.msg
         except NpyIncompleteError, e:
             raise NpyIncompleteError, e.msg
 
-        return data_classification
+        return DataClassification(data_instances, label_numbers, index_numbers)
         
 
-    def learn_cycles(self, data_set, nb_cycles):
+    def learn_cycles(self, data_set, nb_cycles, data_loader=None):
         """
         Makes the network learn the data_instances of the given `DataSet`.
 
+        :Parameters:
+            data_set : `DataSet`
+                `DataSet` to be learned.
+            nb_cycles : integer
+                Number of passes over data_set.
+            data_loader : `DataLoader`
+                If not None, the `DataLoader` built on data_set that gives
+                the order of the instances at every cycle, for instance
+                a shuffled one. Otherwise, the instances are learned in the
+                order of data_set. Not used when the update functions of the
+                network learn once per cycle.
+
         :Raises NpyValueError:
             If the number of attributes of one the `DataInstance` in the
-            `DataSet` is invalid.
+            `DataSet` is invalid, or if data_loader is not built on
+            data_set.
 
         :Raises NpyIncompleteError:
-            If the network does not have a learning rate, or does not
-            have units.
+            If the network does not have units, or does not have a
+            learning rate while its update functions use it.
         """
 
+        if data_loader != None and data_loader.get_data_set() is not data_set:
+            raise NpyValueError, 'The DataLoader must be built on the learned DataSet.'
+
+        if self.is_batch_learning():
+            for i in range(nb_cycles):
+                self.learn_batch(data_set)
+            return
+
+        target_matrix = self.get_target_matrix(data_set)
+
         try:
             for i in range(nb_cycles):
-                for data_instance in data_set.get_data_instances():
-                    self.learn_data_instance(data_instance)
+                if data_loader == None:
+                    for data_instance, desired_output in itertools.izip(data_set.get_data_instances(), target_matrix):
+                        self.learn_data_instance(data_instance, desired_output=desired_output)
+                    continue
+
+                for batch in data_loader.iter_epoch():
+                    for data_instance in batch:
+                        desired_output = self.target_vectors[data_instance.get_label_number()]
+                        self.learn_data_instance(data_instance, desired_output=desired_output)
         except NpyValueError, e:
             raise NpyValueError, e.msg
         except NpyIncompleteError, e:
             raise NpyIncompleteError, e.msg
 
 
-    def learn_data_instance(self, data_instance, user_data_in=None, user_data_out=None):
+    def is_batch_learning(self):
+        """
+        Check whether the update functions of the network are applied once
+        per learning cycle instead of once per instance.
+
+        :Returns:
+            boolean : True if the update functions learn once per cycle.
+
+        :Raises NpyTransferFunctionError:
+            If the network mixes both kinds of update functions.
+        """
+        flags = [unit.get_update_function().is_batch for unit in self.units]
+        if any(flags) and not all(flags):
+            raise NpyTransferFunctionError, 'The update functions of a network cannot mix per-instance and per-cycle learning.'
+
+        return len(flags) > 0 and flags[0]
+
+
+    def learn_batch(self, data_set):
+        """
+        Makes the network learn a whole `DataSet` at once: the gradient
+        of the loss over the `DataSet` is given to the update functions of
+        the units, which have to learn once per cycle.
+
+        :Parameters:
+            data_set : `DataSet`
+                `DataSet` to be learned.
+
+        :Raises NpyValueError:
+            If the number of attributes of one the `DataInstance` in the
+            `DataSet` is invalid, or if the `DataSet` is empty.
+
+        :Raises NpyIncompleteError:
+            If the network does not have units, or does not have a
+            learning rate while one of its update functions uses it.
+        """
+        if self.learning_rate == None \
+          and any([unit.get_update_function().uses_learning_rate for unit in self.units]):
+            raise NpyIncompleteError, 'The network has no learning rate, and thus cannot learn anything.'
+
+        (loss, gradient) = self.compute_loss_gradient(data_set)
+
+        stats = self.stats
+        if stats != None:
+            time_begin = timeit.default_timer()
+
+        weights = []
+        index = 0
+        for index_unit, unit in enumerate(self.units):
+            if stats != None:
+                time_unit = timeit.default_timer()
+            nb_weights = sum([len(weights_node) for weights_node in unit.get_weights()])
+            weights.append(unit.compute_batch_update(gradient[index:index + nb_weights], loss, self.learning_rate))
+            index += nb_weights
+            if stats != None:
+                stats.add('compute_update', index_unit + 2, timeit.default_timer() - time_unit)
+
+        if stats != None:
+            stats.add('compute_update', None, timeit.default_timer() - time_begin)
+
+        self.set_weights(weights)
+
+
+    def get_target_matrix(self, data_set):
+        """
+        Get the vectors the network is supposed to produce for the
+        instances of a `DataSet`. The matrix is kept until it is asked for
+        another `DataSet`, or until the number of instances, the label
+        function or the output unit change. Labels modified in place are
+        not detected.
+
+        :Parameters:
+            data_set : `DataSet`
+                `DataSet` of which the labels are converted.
+
+        :Returns:
+            sequence of sequences : the vectors associated with the labels
+            of the instances of data_set, in the order of
+            get_data_instances().
+
+        :Raises NpyTransferFunctionError:
+            If no label function is defined for the network.
+        """
+        if self.label_function == None:
+            raise NpyTransferFunctionError, 'No label function is defined for the network.'
+
+        nb_nodes_last_unit = self.units[-1].get_nb_nodes()
+        target_key = (data_set, data_set.get_nb_data_instances(), self.label_function, nb_nodes_last_unit)
+        if target_key == self.target_key:
+            return self.target_matrix
+
+        labels = [data_instance.get_label_number() for data_instance in data_set.get_data_instances()]
+        self.target_matrix = self.label_function.labels_to_matrix(labels, nb_nodes_last_unit)
+        self.target_vectors = dict(itertools.izip(labels, self.target_matrix))
+        self.target_key = target_key
+
+        return self.target_matrix
+
+
+    def __compute_errors(self, outputs, desired_output):
+        """
+        Compute the error values of all the units for the network, by
+        backpropagating the error of the output unit.
+
+        :Parameters:
+            outputs : sequence of sequences of floats
+                The output data of all the `Unit` of the network, as
+                computed by __compute_output().
+            desired_output : sequence of floats
+                Vector the network is supposed to produce.
+
+        :Returns:
+            sequence of sequences of floats : the error values of the nodes
+            of every `Unit` except the input unit.
+        """
+        # The 'None'  error_network is just a dummy value
+        error_network = [None]
+        previous_weights = None
+
+        stats = self.stats
+        if stats != None:
+            time_begin = timeit.default_timer()
+
+        # Compute the error values: it has to be done backward 
+        for unit, output, index in reversed(zip(self.units, outputs[1:], range(len(self.units)))):
+            if stats != None:
+                time_unit = timeit.default_timer()
+            error_network.append(unit.compute_errors(error_network[-1], desired_output, output, previous_weights, index, len(self.units)))
+            previous_weights = unit.get_weights()
+            if stats != None:
+                stats.add('errors', index + 2, timeit.default_timer() - time_unit)
+
+        # The dummy 'None' can be deleted
+        del error_network[0]
+
+        # The right order is the converse
+        error_network.reverse()
+
+        if self.use_bias == True:
+            # The use of the bias created useless error values
+            # that have to be deleted 
+            for index_unit in range(len(error_network) - 1):
+                del error_network[index_unit][-1] 
+
+        if stats != None:
+            stats.add('errors', None, timeit.default_timer() - time_begin)
+
+        return error_network
+
+
+    def learn_data_instance(self, data_instance, user_data_in=None, user_data_out=None, desired_output=None):
         """
         Makes the network learn the given `DataInstance`.
 
@@ -622,6 +1141,10 @@ class Network(object):
                 Input data, to be filled by the user if needed.
             user_data_out
                 Output data, to be filled by the user if needed.
+            desired_output : sequence of floats
+                Vector the network is supposed to produce for
+                data_instance. If None, it is computed from the label of
+                data_instance.
 
         :Raises NpyValueError:
             If the size of the sequence given in input is not the one
@@ -642,35 +1165,23 @@ class Network(object):
         if self.unit_input == None:
             raise NpyIncompleteError, 'The network has no unit, and thus cannot clasify anything.'
 
-        desired_output = self.label_to_vector(data_instance.get_label_number())
+        if desired_output == None:
+            desired_output = self.label_to_vector(data_instance.get_label_number())
 
         # Compute the outputs from the whole network
         outputs = self.__compute_output(data_instance) 
 
-        # The 'None'  error_network is just a dummy value
-        error_network = [None]
-        previous_weights = None
-
-        # Compute the error values: it has to be done backward 
-        for unit, output, index in reversed(zip(self.units, outputs[1:], range(len(self.units)))):
-            error_network.append(unit.compute_errors(error_network[-1], desired_output, output, previous_weights, index, len(self.units)))
-            previous_weights = unit.get_weights()
-      
-        # The dummy 'None' can be deleted
-        del error_network[0]
+        error_network = self.__compute_errors(outputs, desired_output)
 
-        # The right order is the converse
-        error_network.reverse()
-
-        if self.use_bias == True:
-            # The use of the bias created useless error values
-            # that have to be deleted 
-            for index_unit in range(len(error_network) - 1):
-                del error_network[index_unit][-1] 
+        stats = self.stats
+        if stats != None:
+            time_begin = timeit.default_timer()
 
         # Compute the weight_update values
         update_network = []
-        for error_unit, input_unit in itertools.izip(error_network, outputs[:-1]):
+        for index, error_unit, input_unit in itertools.izip(itertools.count(2), error_network, outputs[:-1]):
+            if stats != None:
+                time_unit = timeit.default_timer()
             update_unit = []
             for error_node in error_unit:
                 update_node = [] 
@@ -678,15 +1189,84 @@ class Network(object):
                     update_node.append(self.learning_rate * error_node * input_node)
                 update_unit.append(update_node)
             update_network.append(update_unit)
+            if stats != None:
+                stats.add('deltas', index, timeit.default_timer() - time_unit)
+
+        if stats != None:
+            stats.add('deltas', None, timeit.default_timer() - time_begin)
+            time_begin = timeit.default_timer()
 
         # Compute the new weights
         weights = []
         for unit, error_unit, weight_update, index in itertools.izip(self.units, error_network, update_network, range(len(self.units))):
+            if stats != None:
+                time_unit = timeit.default_timer()
             weights.append(unit.compute_update(index, unit, outputs, error_unit, weight_update, user_data_in, user_data_out))
+            if stats != None:
+                stats.add('compute_update', index + 2, timeit.default_timer() - time_unit)
+
+        if stats != None:
+            stats.add('compute_update', None, timeit.default_timer() - time_begin)
        
         self.set_weights(weights)
 
 
+    def compute_loss_gradient(self, data_set):
+        """
+        Compute the loss of the network over a whole `DataSet`, and its
+        gradient with respect to the weights. Both are averaged over the
+        instances. The gradient is flattened in the order of
+        get_parameters().
+
+        :Parameters:
+            data_set : `DataSet`
+                `DataSet` on which the loss is computed.
+
+        :Returns:
+            tuple : the loss as a float, and the gradient as an array of
+            floats.
+
+        :Raises NpyValueError:
+            If the number of attributes of one the `DataInstance` in the
+            `DataSet` is invalid, or if the `DataSet` is empty.
+
+        :Raises NpyIncompleteError:
+            If the `Network` has no unit.
+        """
+        if self.unit_input == None or len(self.units) == 0:
+            raise NpyIncompleteError, 'The network has no unit, and thus cannot clasify anything.'
+
+        nb_data_instances = data_set.get_nb_data_instances()
+        if nb_data_instances == 0:
+            raise NpyValueError, 'The data set is empty.'
+
+        target_matrix = self.get_target_matrix(data_set)
+        losses = []
+        gradient = array.array('d', [0.0]) * self.get_nb_parameters()
+
+        for data_instance, desired_output in itertools.izip(data_set.get_data_instances(), target_matrix):
+            if len(data_instance.get_attributes()) != self.unit_input.get_nb_nodes():
+                raise NpyValueError, 'The number of inputs given to the network is invalid.'
+
+            outputs = self.__compute_output(data_instance)
+            error_network = self.__compute_errors(outputs, desired_output)
+            losses.append(self.units[-1].compute_loss(desired_output, outputs[-1]))
+
+            # The errors are the opposite of the gradient
+            index = 0
+            for error_unit, input_unit in itertools.izip(error_network, outputs[:-1]):
+                nb_inputs = len(input_unit)
+                for error_node in error_unit:
+                    for index_input in xrange(nb_inputs):
+                        gradient[index + index_input] -= error_node * input_unit[index_input]
+                    index += nb_inputs
+
+        for index in xrange(len(gradient)):
+            gradient[index] /= nb_data_instances
+
+        return (math.fsum(losses) / nb_data_instances, gradient)
+
+
     def label_to_vector(self, label):
         """
         Convert a label into a vector a network is supposed to produce.
@@ -792,29 +1372,66 @@ class Network(object):
                     * unit#_activation_function = activation_function name in the #-th unit
                     * unit#_update_function = update_function name in the #-th unit
                     * unit#_error_function = error_function name in the #-th unit
+                The values may be given either with their own type, or as
+                the strings of a file written from `get_topology`, such as
+                'None', 'True' or 'False'. An empty learning rate is None.
+
+        :Raises NpyValueError:
+            If a field is missing, or if its value cannot be parsed.
+
+        :Raises NpyTransferFunctionError:
+            If a function name is invalid, or if an activation function
+            cannot be used with the error function of its unit.
         """
-        # TODO check the exception on the dictionary, and raise an exception
-        # if a field is missing and the network cannot be loaded properly.
+        try:
+            learning_rate = topology["learning_rate"]
+            if learning_rate in (None, 'None', ''):
+                learning_rate = None
+            else:
+                learning_rate = float(learning_rate)
+
+            use_bias = topology["use_bias"]
+            if use_bias in (True, 'True'):
+                use_bias = True
+            elif use_bias in (False, 'False'):
+                use_bias = False
+            else:
+                raise NpyValueError, 'Invalid use_bias value: %r.' % (use_bias,)
+
+            nb_units = int(topology["nb_units"])
+            nb_nodes_input = int(topology["unit1_nbnodes"])
+
+            # Read the fields of each hidden unit and the output unit
+            units = []
+            for index_unit in range(2, nb_units + 1):
+                name_unit = "unit" + str(index_unit)
+                name_error_function = topology[name_unit + "_error_function"]
+                if name_error_function == 'None': name_error_function = None
+                units.append((int(topology[name_unit + "_nbnodes"]),
+                              topology[name_unit + "_activation_function"],
+                              topology[name_unit + "_update_function"],
+                              name_error_function))
+        except KeyError, e:
+            raise NpyValueError, 'Missing topology field: %s.' % e
+        except (TypeError, ValueError), e:
+            raise NpyValueError, 'Invalid topology value: %s.' % e
 
         self.reset()
 
         # General parameters
-        self.learning_rate = float(topology["learning_rate"])
-        self.use_bias = bool(topology["use_bias"])
+        self.learning_rate = learning_rate
+        self.use_bias = use_bias
 
         # Input unit
-        self.add_unit(int(topology["unit1_nbnodes"]))
+        self.add_unit(nb_nodes_input)
 
         # For each hidden unit and the output unit
-        for index_unit in range(2, int(topology["nb_units"]) + 1):
-            name_unit = "unit" + str(index_unit)
-            name_activation_function = topology[name_unit + "_activation_function"]
-            name_update_function = topology[name_unit + "_update_function"]
-            name_error_function = topology[name_unit + "_error_function"]
-            if name_error_function == 'None': name_error_function = None
-            nb_nodes = int(topology[name_unit + "_nbnodes"])
+        for nb_nodes, name_activation_function, name_update_function, name_error_function in units:
             self.add_unit(nb_nodes, name_activation_function, name_update_function, name_error_function) 
 
+        for index_unit, unit in enumerate(self.units):
+            unit.check_error_function(index_unit == len(self.units) - 1)
+
 
     def get_weights(self):
         """
@@ -840,8 +1457,74 @@ class Network(object):
                 Weights of the entire network
         """
 
-        for weights_unit, unit in zip(weights_network, self.units):
+        stats = self.stats
+        if stats == None:
+            for weights_unit, unit in zip(weights_network, self.units):
+                unit.set_weights(weights_unit)
+            return
+
+        time_begin = timeit.default_timer()
+        for index, weights_unit, unit in zip(itertools.count(2), weights_network, self.units):
+            time_unit = timeit.default_timer()
             unit.set_weights(weights_unit)
+            stats.add('set_weights', index, timeit.default_timer() - time_unit)
+        stats.add('set_weights', None, timeit.default_timer() - time_begin)
+
+
+    def get_nb_parameters(self):
+        """
+        Get the total number of weights of the network.
+
+        :Returns:
+            integer : number of weights.
+        """
+        nb_parameters = 0
+        for unit in self.units:
+            for weights_node in unit.get_weights():
+                nb_parameters += len(weights_node)
+        return nb_parameters
+
+
+    def get_parameters(self):
+        """
+        Get the weights of the entire network flattened into one vector,
+        unit by unit and node by node.
+
+        :Returns:
+            array of floats : weights of the entire network.
+        """
+        parameters = array.array('d')
+        for unit in self.units:
+            for weights_node in unit.get_weights():
+                parameters.extend(weights_node)
+        return parameters
+
+
+    def set_parameters(self, parameters):
+        """
+        Set the weights of the entire network from one vector, in the
+        order of get_parameters().
+
+        :Parameters:
+            parameters : sequence of floats
+                Weights of the entire network.
+
+        :Raises NpyDataTypeError:
+            If the number of weights is not the one of the network.
+        """
+        if len(parameters) != self.get_nb_parameters():
+            raise NpyDataTypeError, 'The number of weights must be the same as the number already present in the network.'
+
+        index = 0
+        weights_network = []
+        for unit in self.units:
+            weights_unit = []
+            for weights_node in unit.get_weights():
+                weights_unit.append(list(parameters[index:index + len(weights_node)]))
+                index += len(weights_node)
+            weights_network.append(weights_unit)
+
+        self.set_weights(weights_network)
 
 
 if __name__ == "__main__":
@@ -24,6 +24,17 @@ __docformat__ = "restructuredtext en"
 import csv
 import sys
 import os
+import zlib
+import mmap
+import array
+import struct
+import zipfile
+import cPickle
+import StringIO
+
+from datafilter import Filter
+from factory import Factory
+from exception import *
 
 
 class NetworkIO_CSV:
@@ -142,7 +153,10 @@ class NetworkIO_CSV:
         for field, value in zip(table[0], table[1]):
             topology[field] = value 
 
-        network.set_topology(topology)
+        try:
+            network.set_topology(topology)
+        except (NpyValueError, NpyUnitError, NpyTransferFunctionError), e:
+            raise NpyStreamError, 'Invalid topology in: ' + str(self.stream) + ' (' + str(e) + ')'
 
 
     def write_topology(self, network):
@@ -231,3 +245,663 @@ class NetworkIO_CSV:
                     table.append([index_unit, index_node, index_weight, weight])
 
         self.write_table('_weights', table) 
+
+
+    def read_filter(self):
+        """
+        Read a fitted `Filter` from the stream.
+
+        :Returns:
+            `Filter` : the filter, ready to filter data.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the file.
+        """
+        table = self.read_table('_filter')
+
+        data_filter = Filter(None)
+        data_filter.set_state(table[1:])
+        return data_filter
+
+
+    def write_filter(self, data_filter):
+        """
+        Write a fitted `Filter` to the stream, so that the data of a
+        network can be filtered without the data set used to build the
+        `Filter`.
+
+        :Parameters:
+            data_filter : `Filter`
+                Filter to be written.
+
+        :Raises NpyStreamError:
+            If a problem occurs while writing the file.
+        """
+        table = [["field", "index", "value", "number"]]
+        table.extend(data_filter.get_state())
+
+        self.write_table('_filter', table)
+
+
+
+class MappedWeights:
+    """
+    Read-only sequence of the weights of a `Node`, stored in a memory-mapped
+    file written by `NetworkIO_Binary`. The weights are not copied into
+    Python objects when the network is loaded: they are unpacked from the
+    mapped pages every time they are iterated, so that the processes
+    loading the same file share its pages through the page cache of the
+    operating system.
+
+    :IVariables:
+        __map : mmap
+            Mapped file.
+        __offset : integer
+            Offset of the first weight in the mapped file.
+        __struct : `struct.Struct`
+            Structure of the weights, as little-endian 64-bit floats.
+    """
+
+    weight = struct.Struct('<d')
+
+    def __init__(self, map, offset, nb_weights):
+        """
+        Initializer
+
+        :Parameters:
+            map : mmap
+                Mapped file.
+            offset : integer
+                Offset of the first weight in the mapped file.
+            nb_weights : integer
+                Number of weights.
+        """
+        self.map = map
+        self.offset = offset
+        self.struct = struct.Struct('<%dd' % nb_weights)
+
+
+    def __len__(self):
+        return self.struct.size / 8
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.struct.unpack_from(self.map, self.offset)[index]
+
+        # Only unpack the requested weight
+        nb_weights = len(self)
+        if index < 0:
+            index += nb_weights
+        if index < 0 or index >= nb_weights:
+            raise IndexError, 'weight index out of range'
+        return MappedWeights.weight.unpack_from(self.map, self.offset + 8 * index)[0]
+
+
+    def __iter__(self):
+        return iter(self.struct.unpack_from(self.map, self.offset))
+
+
+
+class NetworkIO_Binary:
+    """
+    Neural network binary input/output class. The topology and the weights
+    of a network are stored in one file, the weights being written as a
+    raw array of little-endian 64-bit floats, so that they are read back
+    in bulk and without any loss of precision.
+
+    The file starts with a header holding the number of topology fields,
+    the number of units, the number of weights and a CRC-32 checksum of the
+    rest of the file. It is followed by the topology fields and values as
+    length-prefixed strings, then by the number of nodes and the number of
+    weights per node of every unit except the input unit, and finally by
+    the weights, unit by unit and node by node, starting at an offset
+    aligned on 8 bytes.
+
+    :IVariables:
+        __stream : Stream 
+            Stream instance used for the I/O operations. In the case of this
+            binary module, the stream is the name of the file to be used.
+    """
+
+    magic = 'NPYN'
+    version = 1
+    header = struct.Struct('<4sHIIqI')
+    length = struct.Struct('<I')
+    unit = struct.Struct('<II')
+
+    def __init__(self, stream=None):
+        """
+        Initializer
+        
+        :Parameters:
+            stream : string 
+                Name of the file to be used.
+        """
+        self.stream = stream
+
+
+    def set_stream(self, stream):
+        self.stream = stream
+
+
+    def get_stream(self):
+        return self.stream
+
+
+    def dumps(self, network):
+        """
+        Build the content of a file holding the topology and the weights of
+        a neural network.
+
+        :Parameters:
+            network : Network
+                Network to be written.
+
+        :Returns:
+            string : the content of the file.
+        """
+        topology = network.get_topology()
+        units = network.get_weights()
+
+        content = []
+        for field in sorted(topology.keys()):
+            for string in (field, str(topology[field])):
+                content.append(NetworkIO_Binary.length.pack(len(string)))
+                content.append(string)
+
+        for weights_unit in units:
+            content.append(NetworkIO_Binary.unit.pack(len(weights_unit), len(weights_unit[0])))
+
+        size = NetworkIO_Binary.header.size + sum([len(part) for part in content])
+        content.append('\0' * (-size % 8))
+
+        weights = network.get_parameters()
+        if sys.byteorder == 'big':
+            weights.byteswap()
+        content.append(weights.tostring())
+
+        content = ''.join(content)
+        header = NetworkIO_Binary.header.pack(NetworkIO_Binary.magic, NetworkIO_Binary.version, len(topology), len(units), len(weights), zlib.crc32(content) & 0xffffffff)
+
+        return header + content
+
+
+    def write(self, network):
+        """
+        Write the topology and the weights of a neural network.
+
+        :Parameters:
+            network : Network
+                Network to be written.
+
+        :Raises NpyStreamError:
+            If a problem occurs while writing the file.
+        """
+        content = self.dumps(network)
+
+        string_error = 'Unable to write the file: ' + str(self.stream)
+        try:
+            stream = open(self.stream, "wb")
+            try:
+                stream.write(content)
+            finally:
+                stream.close()
+        except IOError:
+            raise NpyStreamError, string_error
+
+
+    def parse(self, content, verify_checksum=True):
+        """
+        Parse and check the content of a file written by write().
+
+        :Parameters:
+            content : string or mmap
+                Content of the file.
+            verify_checksum : boolean
+                Verify the checksum, which reads the whole content.
+
+        :Returns:
+            tuple : the topology dictionary, the sequence of the number of
+            nodes and number of weights per node of every unit, and the
+            offset of the weights in content.
+
+        :Raises NpyStreamError:
+            If the content is not a valid network file, or if it is
+            corrupted.
+        """
+        string_error = 'Invalid network file: ' + str(self.stream)
+        try:
+            (magic, version, nb_fields, nb_units, nb_weights, checksum) = NetworkIO_Binary.header.unpack_from(content, 0)
+            if magic != NetworkIO_Binary.magic or version != NetworkIO_Binary.version:
+                raise NpyStreamError, string_error
+
+            offset = NetworkIO_Binary.header.size
+            if verify_checksum and zlib.crc32(buffer(content, offset)) & 0xffffffff != checksum:
+                raise NpyStreamError, 'Corrupted network file: ' + str(self.stream)
+
+            topology = {}
+            for i in range(nb_fields):
+                strings = []
+                for j in range(2):
+                    (length,) = NetworkIO_Binary.length.unpack_from(content, offset)
+                    offset += NetworkIO_Binary.length.size
+                    strings.append(content[offset:offset + length])
+                    offset += length
+                topology[strings[0]] = strings[1]
+
+            units = []
+            for i in range(nb_units):
+                units.append(NetworkIO_Binary.unit.unpack_from(content, offset))
+                offset += NetworkIO_Binary.unit.size
+            offset += -offset % 8
+        except struct.error:
+            raise NpyStreamError, string_error
+
+        if sum([nb_nodes * nb_inputs for nb_nodes, nb_inputs in units]) != nb_weights \
+           or offset + nb_weights * 8 != len(content):
+            raise NpyStreamError, string_error
+
+        return (topology, units, offset)
+
+
+    def read(self, network):
+        """
+        Read a neural network, replacing its topology and its weights.
+        The file is read at once.
+
+        :Parameters:
+            network : Network
+                Network where to put the topology and the weights.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the file, or if the file is
+            not a valid network file.
+        """
+        string_error = 'Unable to read the file: ' + str(self.stream)
+        try:
+            stream = open(self.stream, "rb")
+            try:
+                content = stream.read()
+            finally:
+                stream.close()
+        except IOError:
+            raise NpyStreamError, string_error
+
+        self.loads(network, content)
+
+
+    def loads(self, network, content):
+        """
+        Load a neural network from the content of a file written by
+        write(), replacing its topology and its weights.
+
+        :Parameters:
+            network : Network
+                Network where to put the topology and the weights.
+            content : string
+                Content of the file.
+
+        :Raises NpyStreamError:
+            If the content is not a valid network file, or if its topology
+            cannot be loaded.
+        """
+        (topology, units, offset) = self.parse(content)
+
+        try:
+            network.set_topology(topology)
+        except (NpyValueError, NpyUnitError, NpyTransferFunctionError), e:
+            raise NpyStreamError, 'Invalid topology in: ' + str(self.stream) + ' (' + str(e) + ')'
+        for unit, (nb_nodes, nb_inputs) in zip(network.get_units()[1:], units):
+            if unit.get_nb_nodes() != nb_nodes or len(unit.get_weights()[0]) != nb_inputs:
+                raise NpyStreamError, 'The weights do not match the topology in: ' + str(self.stream)
+
+        weights = array.array('d')
+        weights.fromstring(content[offset:])
+        if sys.byteorder == 'big':
+            weights.byteswap()
+
+        network.set_parameters(weights)
+
+
+    def read_mapped(self, network, verify_checksum=False):
+        """
+        Read a neural network for inference, replacing its topology, and
+        using the memory-mapped weights of the file instead of loading them
+        as `MappedWeights`. The file is mapped read-only and must not be
+        modified while the network uses it. If the network learns, its
+        weights are replaced by regular ones and the file is left intact.
+
+        :Parameters:
+            network : Network
+                Network where to put the topology and the weights.
+            verify_checksum : boolean
+                Verify the checksum of the file, which reads all its pages.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the file, or if the file is
+            not a valid network file.
+        """
+        string_error = 'Unable to read the file: ' + str(self.stream)
+        try:
+            stream = open(self.stream, "rb")
+            try:
+                content = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            finally:
+                stream.close()
+        except (IOError, EnvironmentError, ValueError):
+            raise NpyStreamError, string_error
+
+        (topology, units, offset) = self.parse(content, verify_checksum)
+
+        try:
+            network.set_topology(topology)
+        except (NpyValueError, NpyUnitError, NpyTransferFunctionError), e:
+            raise NpyStreamError, 'Invalid topology in: ' + str(self.stream) + ' (' + str(e) + ')'
+        weights_network = []
+        for unit, (nb_nodes, nb_inputs) in zip(network.get_units()[1:], units):
+            if unit.get_nb_nodes() != nb_nodes or len(unit.get_weights()[0]) != nb_inputs:
+                raise NpyStreamError, 'The weights do not match the topology in: ' + str(self.stream)
+
+            weights_unit = []
+            for index_node in range(nb_nodes):
+                weights_unit.append(MappedWeights(content, offset, nb_inputs))
+                offset += nb_inputs * 8
+            weights_network.append(weights_unit)
+
+        network.set_weights(weights_network)
+
+
+
+class NetworkIO_Bundle:
+    """
+    Neural network bundle input/output class. A bundle is a single zip
+    archive holding everything needed to use or to keep training a network:
+
+        * manifest.csv: the format and version of the bundle, the name of
+          the label function and the list of the members
+        * network.npyn: the topology and the weights, in the format of
+          `NetworkIO_Binary`
+        * filter.csv: the fitted `Filter`, with the vocabularies of the
+          `Numerizer`, including the label map, and the bounds of the
+          `Normalizer`, if a `Filter` was given
+        * optimizer/unit<k>/<field>: the arrays of the state of the update
+          function of the k-th unit, as little-endian 64-bit floats, for
+          the update functions that keep a state
+        * training.pickle: the state of the training process, for instance
+          the number of cycles and the state of the random generators, if
+          one was given
+
+    The whole bundle is validated before anything is loaded, so that an
+    incompatible or corrupted bundle never leaves a partially loaded
+    network.
+
+    :IVariables:
+        __stream : Stream 
+            Stream instance used for the I/O operations. In the case of this
+            bundle module, the stream is the name of the archive.
+    """
+
+    format = 'npy-bundle'
+    version = 1
+
+    def __init__(self, stream=None):
+        """
+        Initializer
+        
+        :Parameters:
+            stream : string 
+                Name of the archive to be used.
+        """
+        self.stream = stream
+
+
+    def set_stream(self, stream):
+        self.stream = stream
+
+
+    def get_stream(self):
+        return self.stream
+
+
+    def __dump_table(self, table):
+        """
+        Write a table as CSV text.
+        """
+        content = StringIO.StringIO()
+        writer = csv.writer(content)
+        for row in table:
+            writer.writerow(row)
+        return content.getvalue()
+
+
+    def __load_table(self, content):
+        """
+        Read a table from CSV text.
+        """
+        return [row for row in csv.reader(StringIO.StringIO(content))]
+
+
+    def write(self, network, data_filter=None, training_state=None):
+        """
+        Write a neural network, along with the state of its update
+        functions and optionally its `Filter`. The archive is written under
+        a temporary name, synced to the disk and then renamed, so that it
+        is never read while partially written, even after a crash.
+
+        :Parameters:
+            network : Network
+                Network to be written.
+            data_filter : `Filter`
+                Fitted filter of the data of the network.
+            training_state : dictionary
+                State of the training process, which has to be picklable.
+
+        :Raises NpyStreamError:
+            If a problem occurs while writing the archive.
+        """
+        members = [('network.npyn', NetworkIO_Binary(self.stream).dumps(network))]
+
+        if data_filter != None:
+            table = [["field", "index", "value", "number"]]
+            table.extend(data_filter.get_state())
+            members.append(('filter.csv', self.__dump_table(table)))
+
+        for index_unit, unit in enumerate(network.get_units()[1:]):
+            state = unit.get_update_function().get_state()
+            for field in sorted(state.keys()):
+                values = array.array('d', state[field])
+                if sys.byteorder == 'big':
+                    values.byteswap()
+                members.append(('optimizer/unit%d/%s' % (index_unit + 2, field), values.tostring()))
+
+        if training_state != None:
+            members.append(('training.pickle', cPickle.dumps(training_state, cPickle.HIGHEST_PROTOCOL)))
+
+        label_function = network.label_function
+        if label_function == None:
+            name_label_function = 'None'
+        else:
+            name_label_function = label_function.get_name()
+
+        manifest = [['format', NetworkIO_Bundle.format],
+                    ['version', NetworkIO_Bundle.version],
+                    ['label_function', name_label_function],
+                    ['members', ';'.join([name for name, content in members])]]
+        members.insert(0, ('manifest.csv', self.__dump_table(manifest)))
+
+        name_temporary = '%s.%d.tmp' % (self.stream, os.getpid())
+        try:
+            stream = open(name_temporary, 'wb')
+            try:
+                archive = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED)
+                for name, content in members:
+                    archive.writestr(name, content)
+                archive.close()
+                stream.flush()
+                os.fsync(stream.fileno())
+            finally:
+                stream.close()
+            os.rename(name_temporary, self.stream)
+        except (IOError, OSError):
+            raise NpyStreamError, 'Unable to write the file: ' + str(self.stream)
+
+
+    def read(self, network):
+        """
+        Read a neural network, replacing its topology, its weights, its
+        label function and the state of its update functions.
+
+        :Parameters:
+            network : Network
+                Network where to load the bundle.
+
+        :Returns:
+            `Filter` : the filter stored in the bundle, or None.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the archive, if its version
+            is not supported, if it is incomplete or corrupted, or if it
+            refers to functions that are not defined.
+        """
+        string_error = 'Unable to read the file: ' + str(self.stream)
+        try:
+            archive = zipfile.ZipFile(self.stream, 'r')
+        except (IOError, zipfile.BadZipfile):
+            raise NpyStreamError, string_error
+
+        try:
+            try:
+                contents = {}
+                for name in archive.namelist():
+                    contents[name] = archive.read(name)
+            except (IOError, zipfile.BadZipfile, zlib.error):
+                raise NpyStreamError, 'Corrupted bundle: ' + str(self.stream)
+        finally:
+            archive.close()
+
+        # Validate the whole bundle before loading anything
+        if not 'manifest.csv' in contents:
+            raise NpyStreamError, 'Missing manifest in the bundle: ' + str(self.stream)
+
+        manifest = {}
+        for row in self.__load_table(contents['manifest.csv']):
+            if len(row) == 2:
+                manifest[row[0]] = row[1]
+
+        if manifest.get('format') != NetworkIO_Bundle.format or not manifest.get('version', '').isdigit():
+            raise NpyStreamError, 'Not a network bundle: ' + str(self.stream)
+
+        if int(manifest['version']) > NetworkIO_Bundle.version:
+            raise NpyStreamError, 'Unsupported bundle version ' + manifest['version'] + ': ' + str(self.stream)
+
+        for name in manifest.get('members', '').split(';'):
+            if not name in contents:
+                raise NpyStreamError, 'Missing member ' + name + ' in the bundle: ' + str(self.stream)
+
+        network_io = NetworkIO_Binary(self.stream)
+        (topology, units, offset) = network_io.parse(contents['network.npyn'])
+
+        names = [manifest.get('label_function', 'None')]
+        for index_unit in range(2, len(units) + 2):
+            name_unit = "unit" + str(index_unit)
+            for suffix in ('_activation_function', '_update_function', '_error_function'):
+                names.append(topology.get(name_unit + suffix))
+        for name in names:
+            if name == 'None':
+                continue
+            try:
+                Factory.build_instance_by_name(str(name))
+            except NpyTransferFunctionError:
+                raise NpyStreamError, 'Undefined function ' + str(name) + ' in the bundle: ' + str(self.stream)
+
+        # Load the network in a scratch network, which validates the
+        # topology and the weights
+        network_io.loads(network.__class__(), contents['network.npyn'])
+
+        string_error = 'The optimizer state does not match the weights in: ' + str(self.stream)
+        states = {}
+        for name, content in contents.items():
+            if not name.startswith('optimizer/'):
+                continue
+            path = name.split('/')
+            if len(path) != 3 or not path[1].startswith('unit') or not path[1][len('unit'):].isdigit():
+                raise NpyStreamError, string_error
+            index_unit = int(path[1][len('unit'):])
+            if index_unit < 2 or index_unit > len(units) + 1:
+                raise NpyStreamError, string_error
+
+            field = path[2]
+            state_fields = Factory.build_instance_by_name(topology["unit%d_update_function" % index_unit]).state_fields
+            if not field in state_fields or len(content) % 8 != 0:
+                raise NpyStreamError, string_error
+
+            (nb_nodes, nb_inputs) = units[index_unit - 2]
+            values = array.array('d')
+            values.fromstring(content)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            if state_fields[field]:
+                if len(values) != nb_nodes * nb_inputs:
+                    raise NpyStreamError, string_error
+            elif len(values) > 1:
+                raise NpyStreamError, string_error
+            states.setdefault(index_unit, {})[field] = values
+
+        # A state is either empty or complete
+        for index_unit, state in states.items():
+            state_fields = Factory.build_instance_by_name(topology["unit%d_update_function" % index_unit]).state_fields
+            if sorted(state.keys()) != sorted(state_fields.keys()):
+                raise NpyStreamError, string_error
+
+        data_filter = None
+        if 'filter.csv' in contents:
+            data_filter = Filter(None)
+            try:
+                data_filter.set_state(self.__load_table(contents['filter.csv'])[1:])
+            except (ValueError, KeyError, IndexError, NpyValueError, NpyTransferFunctionError):
+                raise NpyStreamError, 'Invalid filter in the bundle: ' + str(self.stream)
+
+        # Load the network
+        network_io.loads(network, contents['network.npyn'])
+        if manifest.get('label_function', 'None') != 'None':
+            network.label_function = manifest['label_function']
+        for index_unit, unit in enumerate(network.get_units()[1:]):
+            unit.get_update_function().set_state(states.get(index_unit + 2, {}))
+
+        return data_filter
+
+
+    def read_training_state(self):
+        """
+        Read the state of the training process stored in the bundle.
+
+        :Returns:
+            dictionary : the state of the training process, or None if the
+            bundle does not hold one.
+
+        :Raises NpyStreamError:
+            If a problem occurs while reading the archive, or if the state
+            cannot be unpickled.
+        """
+        string_error = 'Unable to read the file: ' + str(self.stream)
+        try:
+            archive = zipfile.ZipFile(self.stream, 'r')
+        except (IOError, zipfile.BadZipfile):
+            raise NpyStreamError, string_error
+
+        try:
+            if not 'training.pickle' in archive.namelist():
+                return None
+            try:
+                content = archive.read('training.pickle')
+            except (IOError, zipfile.BadZipfile, zlib.error):
+                raise NpyStreamError, 'Corrupted bundle: ' + str(self.stream)
+        finally:
+            archive.close()
+
+        # Unpickling invalid content may raise almost any exception
+        try:
+            return cPickle.loads(content)
+        except Exception:
+            raise NpyStreamError, 'Invalid training state in the bundle: ' + str(self.stream)
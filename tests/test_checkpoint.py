@@ -0,0 +1,142 @@
+"""
+Tests of the training checkpoints.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+
+import os
+import sys
+import shutil
+import random
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from network import Network
+from data import *
+from factory import Factory
+from dataloader import DataLoader
+from checkpoint import Checkpointer
+import train
+import metric
+
+
+
+def build_data_set():
+    random.seed(3)
+    data_set = DataSet()
+    data_set.set_name_attribute(('a', 'b'))
+    data_set.is_numerized = True
+    for index in range(100):
+        (a, b) = (random.uniform(-1, 1), random.uniform(-1, 1))
+        data_set.add_data_instance(index, (a, b), 1 + int((a + 1) * 1.5))
+    return data_set
+
+
+def build_network(name_update_function, learning_rate):
+    random.seed(7)
+    network = Network(learning_rate)
+    network.add_unit(2)
+    network.add_unit(4, 'ac_sigmoid', name_update_function)
+    network.add_unit(3, 'ac_sigmoid', name_update_function)
+    network.label_function = 'la_max'
+    return network
+
+
+
+class TestCheckpointer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data_set = build_data_set()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def check_resume(self, name_train, name_update_function, learning_rate, use_loader):
+        """
+        Check that training 20 cycles, then resuming up to 40 cycles from
+        the checkpoints, gives the same weights as training 40 cycles at
+        once.
+        """
+        def train_network(nb_iterations_max, checkpointer, seed_loader):
+            data_loader = None
+            if use_loader:
+                data_loader = DataLoader(self.data_set, 10, seed=seed_loader)
+            trainer = Factory.build_instance_by_name(name_train)
+            return trainer.train_network(network, self.data_set, 'me_accuracy', 2, nb_iterations_max, 5, data_loader, checkpointer)
+
+        network = build_network(name_update_function, learning_rate)
+        nb_iterations = train_network(40, None, 1)
+        weights = network.get_weights()
+
+        network = build_network(name_update_function, learning_rate)
+        train_network(20, Checkpointer(self.directory, interval_cycles=10, nb_kept=2), 1)
+        self.assertEqual(len(Checkpointer(self.directory).get_filenames()), 2)
+
+        # The generators are restored from the checkpoint
+        random.seed(99)
+        network = build_network(name_update_function, learning_rate)
+        nb_iterations_resumed = train_network(40, Checkpointer(self.directory, interval_cycles=10), 123)
+
+        self.assertEqual(nb_iterations_resumed, nb_iterations)
+        self.assertEqual(network.get_weights(), weights)
+        self.assertEqual(network.learning_rate, learning_rate)
+
+
+    def test_resume_backpropagation(self):
+        self.check_resume('tr_metric', 'up_backpropagation', 0.1, True)
+
+
+    def test_resume_rprop(self):
+        self.check_resume('tr_metric', 'up_rprop', 0.1, False)
+
+
+    def test_resume_lbfgs(self):
+        self.check_resume('tr_lbfgs', 'up_backpropagation', None, False)
+
+
+    def test_resume_scg(self):
+        self.check_resume('tr_scg', 'up_backpropagation', None, False)
+
+
+    def test_skip_unreadable(self):
+        network = build_network('up_backpropagation', 0.1)
+        trainer = Factory.build_instance_by_name('tr_metric')
+        trainer.train_network(network, self.data_set, 'me_accuracy', 2, 20, 5, None, Checkpointer(self.directory))
+        filenames = Checkpointer(self.directory).get_filenames()
+        self.assertEqual([nb_iterations for nb_iterations, filename in filenames], [5, 10, 15, 20])
+
+        stream = open(filenames[-1][1], 'wb')
+        stream.write('junk')
+        stream.close()
+
+        network = build_network('up_backpropagation', 0.1)
+        (nb_iterations, metric_value, optimizer_state) = Checkpointer(self.directory).restore(network)
+        self.assertEqual(nb_iterations, 15)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Tests of the data classes.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from data import *
+from exception import *
+
+
+
+class TestDataClassification(unittest.TestCase):
+
+    def setUp(self):
+        self.data_instances = [DataInstance(index, (0.5, 0.5), 1) for index in range(3)]
+
+
+    def test_label_numbers(self):
+        classification = DataClassification(self.data_instances, [1, 2.0, 3L])
+        self.assertEqual(list(classification.get_label_numbers()), [1, 2, 3])
+        self.assertTrue(isinstance(classification.get_label_number_by_id(1), int))
+
+        classification = DataClassification()
+        classification.add_data_label(self.data_instances[0], 0.0)
+        self.assertEqual(classification.get_label_number_by_id(0), 0)
+
+
+    def test_invalid_label_numbers(self):
+        for label_number in (2.5, 'cat', None, float('nan'), 10 ** 30):
+            self.assertRaises(NpyValueError, DataClassification, self.data_instances, [1, 1, label_number])
+
+            classification = DataClassification()
+            self.assertRaises(NpyValueError, classification.add_data_label, self.data_instances[0], label_number)
+            self.assertEqual(classification.get_nb_data_labels(), 0)
+            self.assertEqual(classification.get_data_label_by_id(0), None)
+
+
+    def test_duplicate_index(self):
+        classification = DataClassification()
+        classification.add_data_label(self.data_instances[0], 1)
+        self.assertRaises(NpyIndexError, classification.add_data_label, self.data_instances[0], 2)
+        self.assertEqual(list(classification.get_label_numbers()), [1])
+
+
+
+class TestDataSetMapped(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'data.npyd')
+        self.data_set = DataSet()
+        self.data_set.set_name_attribute(('a', 'b'))
+        self.data_set.is_numerized = True
+        for index in range(5):
+            self.data_set.add_data_instance(index, (index * 0.5, None), 1 + index % 2)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def write_content(self, content):
+        stream = open(self.filename, 'wb')
+        stream.write(content)
+        stream.close()
+
+
+    def test_round_trip(self):
+        DataSetMapped.write(self.filename, self.data_set)
+        data_set = DataSetMapped(self.filename)
+        self.assertEqual(data_set.get_name_attribute(), ('a', 'b'))
+        self.assertEqual([(data_instance.get_index_number(), list(data_instance.get_attributes()), data_instance.get_label_number())
+                          for data_instance in data_set.get_data_instances()],
+                         [(index, [index * 0.5, None], 1 + index % 2) for index in range(5)])
+        data_set.close()
+
+
+    def test_truncated(self):
+        DataSetMapped.write(self.filename, self.data_set)
+        stream = open(self.filename, 'rb')
+        content = stream.read()
+        stream.close()
+
+        # Inside the names of the attributes, inside the records, and with
+        # extra bytes after the records
+        for content_bad in (content[:DataSetMapped.header.size + 2], content[:-3], content + 'x'):
+            self.write_content(content_bad)
+            self.assertRaises(NpyStreamError, DataSetMapped, self.filename)
+
+
+    def test_non_integer_index_numbers(self):
+        data_set = DataSet()
+        data_set.set_name_attribute(('a',))
+        data_set.is_numerized = True
+        data_set.add_data_instance(1, (0.5,), 1)
+        data_set.add_data_instance('2', (0.5,), 1)
+        self.assertRaises(NpyDataTypeError, DataSetMapped.write, self.filename, data_set)
+        self.assertFalse(os.path.exists(self.filename))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
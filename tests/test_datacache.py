@@ -0,0 +1,146 @@
+"""
+Tests of the data cache.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from data import DataSetColumnar
+from dataio import DataIO_CSV
+from datacache import DataCache
+from datafilter import *
+from exception import *
+
+
+
+class TestDataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'data.csv')
+        stream = open(self.filename, 'w')
+        stream.write('index,size,color,label\n')
+        for index in range(20):
+            stream.write('%d,%d,%s,%s\n' % (index, index % 7, ('red', 'green', 'blue')[index % 3], ('yes', 'no')[index % 2]))
+        stream.close()
+        self.cache = DataCache(os.path.join(self.directory, 'cache'))
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def read(self):
+        data_io = DataIO_CSV(self.filename, 'index', 'label', 'None')
+        (data_set, data_filter) = self.cache.read_filtered(data_io, normalizer_lower_bound=-1, normalizer_upper_bound=1)
+        instances = sorted([(data_instance.get_index_number(), list(data_instance.get_attributes()), data_instance.get_label_number())
+                            for data_instance in data_set.get_data_instances()])
+        state = [[str(field) for field in row] for row in data_filter.get_state()]
+        return (instances, state)
+
+
+    def get_entries(self, extension):
+        directory = os.path.join(self.directory, 'cache')
+        return [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(extension)]
+
+
+    def test_hit(self):
+        (instances, state) = self.read()
+        self.assertEqual(len(self.get_entries('.filter')), 1)
+
+        self.assertEqual(self.read(), (instances, state))
+
+
+    def test_invalid_entries(self):
+        (instances, state) = self.read()
+        (name_filter,) = self.get_entries('.filter')
+        (name_data_set,) = self.get_entries('.npyb')
+
+        # Unreadable filters, such as a pickled entry of an older version,
+        # and an unreadable data set are treated as misses
+        contents = [(name_filter, 'junk'),
+                    (name_filter, 'field,index,value,number\nstage,0,st_unknown,\n'),
+                    (name_filter, 'field,index,value,number\nattribute,x,red,1\n'),
+                    (name_filter, 'ccopy_reg\n_reconstructor\np0\n(cunknown\nFilter\n'),
+                    (name_data_set, 'junk')]
+        for name, content in contents:
+            stream = open(name, 'wb')
+            stream.write(content)
+            stream.close()
+            self.assertEqual(self.read(), (instances, state))
+
+
+
+class TestDataCacheStages(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'data.csv')
+        stream = open(self.filename, 'w')
+        stream.write('index,size,color,label\n')
+        for index in range(20):
+            stream.write('%d,%d,%s,%s\n' % (index, index % 7, ('red', 'green', 'blue')[index % 3], ('yes', 'no')[index % 2]))
+        stream.close()
+        self.cache = DataCache(os.path.join(self.directory, 'cache'))
+        self.data_io = DataIO_CSV(self.filename, 'index', 'label', 'None')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def test_stable_key(self):
+        key = self.cache.get_key(self.data_io, {'stages': [StageStandardize(), StageClip(-1, 1)]})
+        self.assertEqual(self.cache.get_key(self.data_io, {'stages': [StageStandardize(), StageClip(-1, 1)]}), key)
+        self.assertNotEqual(self.cache.get_key(self.data_io, {'stages': [StageStandardize(), StageClip(-2, 1)]}), key)
+        self.assertRaises(NpyValueError, self.cache.get_key, self.data_io, {'stages': [object()]})
+        self.assertRaises(NpyValueError, self.cache.get_key, self.data_io, {'normalizer_lower_bound': object()})
+
+
+    def test_hit_same_kind(self):
+        for filter_parameters in ({}, {'fused': True}, {'stages': [StageOneHot(), StageStandardize()]}):
+            results = []
+            for i in range(2):
+                parameters = dict(filter_parameters)
+                if 'stages' in parameters:
+                    parameters['stages'] = [StageOneHot(), StageStandardize()]
+                (data_set, data_filter) = self.cache.read_filtered(self.data_io, **parameters)
+                rows = sorted([(data_instance.get_index_number(), list(data_instance.get_attributes()), data_instance.get_label_number())
+                               for data_instance in data_set.get_data_instances()])
+                results.append((data_set.__class__, tuple(data_set.get_name_attribute()), rows))
+
+            # The second call is a hit, and returns the same kind of DataSet
+            self.assertEqual(results[1], results[0])
+            self.assertEqual(results[0][0] is DataSetColumnar, len(filter_parameters) > 0)
+
+        self.assertEqual(len([name for name in os.listdir(os.path.join(self.directory, 'cache')) if name.endswith('.filter')]), 3)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+Tests of the data filters.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from data import *
+from datafilter import *
+from exception import *
+
+
+
+def build_data_set(nb_data_instances, seed, colors=('red', 'green', 'blue')):
+    random.seed(seed)
+    data_set = DataSet()
+    data_set.set_name_attribute(('size', 'color'))
+    for index in range(nb_data_instances):
+        size = str(random.uniform(0, 10))
+        color = colors[index % len(colors)]
+        data_set.add_data_instance(index, (size, color), random.choice(('yes', 'no')))
+    return data_set
+
+
+def concatenate(data_sets):
+    data_set = DataSet()
+    data_set.set_name_attribute(data_sets[0].get_name_attribute())
+    index = 0
+    for data_set_shard in data_sets:
+        for data_instance in data_set_shard.get_data_instances():
+            data_set.add_data_instance(index, data_instance.get_attributes(), data_instance.get_label_number())
+            index += 1
+    return data_set
+
+
+
+class CountingDataSet(DataSet):
+
+    def __init__(self):
+        DataSet.__init__(self)
+        self.nb_passes = 0
+
+
+    def get_data_instances(self):
+        self.nb_passes += 1
+        return DataSet.get_data_instances(self)
+
+
+
+
+class TestFilterMerge(unittest.TestCase):
+
+    def check_equal(self, data_filter, data_filter_expected):
+        self.assertEqual(data_filter.numerizer.attributes, data_filter_expected.numerizer.attributes)
+        normalizer = data_filter.normalizer
+        normalizer_expected = data_filter_expected.normalizer
+        self.assertEqual(normalizer.min, normalizer_expected.min)
+        self.assertEqual(normalizer.max, normalizer_expected.max)
+        self.assertEqual(normalizer.count, normalizer_expected.count)
+        for values, values_expected in ((normalizer.get_mean(), normalizer_expected.get_mean()),
+                                        (normalizer.get_variance(), normalizer_expected.get_variance())):
+            for value, value_expected in zip(values, values_expected):
+                self.assertAlmostEqual(value, value_expected, 9)
+
+
+    def test_merge(self):
+        shards = [build_data_set(50, 1), build_data_set(30, 2, ('red', 'green', 'blue', 'black'))]
+        data_filter = Filter(shards[0], -1, 1, fused=True)
+        data_filter.merge(Filter(shards[1], -1, 1, fused=True))
+        self.check_equal(data_filter, Filter(concatenate(shards), -1, 1, fused=True))
+        self.assertEqual(data_filter.numerizer.attribute_string_to_number('black', 1), 4)
+
+
+    def test_merge_empty(self):
+        shard = build_data_set(50, 1)
+        data_filter = Filter(None, -1, 1, fused=True)
+        data_filter.merge(Filter(shard, -1, 1, fused=True))
+        self.check_equal(data_filter, Filter(shard, -1, 1, fused=True))
+
+
+    def test_merge_inconsistent_numbers(self):
+        data_filter = Filter(build_data_set(50, 1), -1, 1, fused=True)
+        state = data_filter.get_state()
+        self.assertRaises(NpyValueError, data_filter.merge, Filter(build_data_set(30, 2, ('blue', 'red', 'green')), -1, 1, fused=True))
+        self.assertEqual(data_filter.get_state(), state)
+
+
+
+class TestStage(unittest.TestCase):
+
+    def setUp(self):
+        self.data_set = build_data_set(40, 1)
+
+
+    def check_filter(self, data_filter, data_filter_expected):
+        data_set = data_filter.filter(self.data_set)
+        data_set_expected = data_filter_expected.filter(self.data_set)
+        self.assertEqual(data_set.get_name_attribute(), data_set_expected.get_name_attribute())
+        for index_attribute in range(data_set.get_nb_attributes()):
+            self.assertEqual(list(data_set.get_column(index_attribute)), list(data_set_expected.get_column(index_attribute)))
+
+
+    def test_state(self):
+        stages = [StageOneHot(), StageClip(0.0, 0.5, columns=[3, 0]), StageStandardize(columns=[0, 2])]
+        data_filter = Filter(self.data_set, stages=stages)
+        rows = data_filter.get_state()
+        self.assertTrue(['stage1_columns', '', '', 2] in rows)
+        self.assertFalse([row for row in rows if row[0].endswith('all_columns')])
+
+        # The order of the rows does not matter
+        data_filter_loaded = Filter(None)
+        data_filter_loaded.set_state([[str(field) for field in row] for row in reversed(rows)])
+        self.assertEqual(data_filter_loaded.stages[1].columns, [3, 0])
+        self.assertEqual(data_filter_loaded.stages[1].nb_attributes, 4)
+        self.check_filter(data_filter_loaded, data_filter)
+
+
+    def test_state_incomplete_columns(self):
+        stage = StageClip(0.0, 0.5, columns=[1, 2])
+        rows = stage.get_state()
+        self.assertRaises(NpyValueError, StageClip().set_state, [row for row in rows if row[0] != 'columns'])
+        self.assertRaises(NpyValueError, StageClip().set_state, [row for row in rows if row[:2] != ['column', 1]])
+
+
+    def test_columns_after_widening(self):
+        # The one-hot encoding turns the 2 attributes into 4 columns
+        data_filter = Filter(self.data_set, stages=[StageOneHot(), StageStandardize(columns=[3])])
+        self.assertEqual(data_filter.filter(self.data_set).get_nb_attributes(), 4)
+        self.assertRaises(NpyValueError, Filter, self.data_set, stages=[StageOneHot(), StageStandardize(columns=[4])])
+
+
+    def test_width_mismatch(self):
+        data_filter = Filter(self.data_set, stages=[StageOneHot(), StageLog()])
+        stage = data_filter.stages[1]
+        data_set = Filter(self.data_set, stages=[StageClip(0.0, 1.0)]).filter(self.data_set)
+        self.assertEqual(data_set.get_nb_attributes(), 2)
+        self.assertRaises(NpyValueError, stage.transform, data_set)
+
+
+    def test_fit_without_extra_pass(self):
+        data_set = CountingDataSet()
+        data_set.set_name_attribute(self.data_set.get_name_attribute())
+        for data_instance in self.data_set.get_data_instances():
+            data_set.add_data_instance_object(data_instance)
+        data_set.add_data_instance(40, (None, 'red'), 'yes')
+
+        for fused in (False, True):
+            data_set.nb_passes = 0
+            Filter(data_set, -1, 1, fused=fused)
+            nb_passes = data_set.nb_passes
+
+            data_set.nb_passes = 0
+            data_filter = Filter(data_set, -1, 1, fused=fused, stages=[StageImpute(), StageStandardize()])
+            self.assertEqual(data_set.nb_passes, nb_passes)
+
+            # The stages are fitted as fit_stages() does from the filtered data
+            data_filter_expected = Filter(data_set, -1, 1, fused=fused)
+            data_filter_expected.stages = [StageImpute(), StageStandardize()]
+            data_filter_expected.fit_stages(data_set)
+            self.assertEqual(data_filter.get_state(), data_filter_expected.get_state())
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Tests of the data input/output classes.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+
+import os
+import sys
+import struct
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from data import *
+from dataio import DataIO_Binary
+from exception import *
+
+
+
+def get_rows(data_set):
+    return [(data_instance.get_index_number(), tuple(data_instance.get_attributes()), data_instance.get_label_number())
+            for data_instance in data_set.get_data_instances()]
+
+
+
+class TestDataIO_Binary(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'data.npyb')
+
+        # One integer, one float and one string column
+        self.data_set = DataSet()
+        self.data_set.set_name_attribute(('count', 'size', 'color'))
+        for index in range(6):
+            size = index * 0.25
+            if index == 2:
+                size = None
+            self.data_set.add_data_instance(index, (index, size, ('red', 'blue')[index % 2]), ('yes', 'no')[index % 2])
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def read_content(self):
+        stream = open(self.filename, 'rb')
+        content = stream.read()
+        stream.close()
+        return content
+
+
+    def write_content(self, content):
+        stream = open(self.filename, 'wb')
+        stream.write(content)
+        stream.close()
+
+
+    def test_round_trip(self):
+        for compress in (False, True):
+            DataIO_Binary(self.filename, compress).write(self.data_set)
+            data_set = DataSet()
+            DataIO_Binary(self.filename).read(data_set)
+            self.assertEqual(tuple(data_set.get_name_attribute()), ('count', 'size', 'color'))
+            self.assertEqual(get_rows(data_set), get_rows(self.data_set))
+
+
+    def test_truncated(self):
+        DataIO_Binary(self.filename).write(self.data_set)
+        content = self.read_content()
+        for length in (20, len(content) - 1, len(content) - 30):
+            self.write_content(content[:length])
+            self.assertRaises(NpyStreamError, DataIO_Binary(self.filename).read, DataSet())
+
+
+    def test_number_of_rows(self):
+        # The columns of every type have to hold exactly the number of rows
+        # given by the header
+        for compress in (False, True):
+            DataIO_Binary(self.filename, compress).write(self.data_set)
+            content = self.read_content()
+            for nb_rows in (5, 7):
+                self.write_content(content[:9] + struct.pack('<q', nb_rows) + content[17:])
+                self.assertRaises(NpyStreamError, DataIO_Binary(self.filename).read, DataSet())
+
+
+    def test_mixed_column(self):
+        data_set = DataSet()
+        data_set.set_name_attribute(('value',))
+        data_set.add_data_instance(1, (1,), 'yes')
+        data_set.add_data_instance(2, ('two',), 'no')
+        self.assertRaises(NpyDataTypeError, DataIO_Binary(self.filename).write, data_set)
+        self.assertFalse(os.path.exists(self.filename))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
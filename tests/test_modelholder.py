@@ -0,0 +1,121 @@
+"""
+Tests of the model holder.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from network import Network
+from networkio import NetworkIO_Bundle
+from modelholder import ModelHolder, load_model
+from exception import *
+
+
+
+def build_network(nb_hidden_nodes):
+    network = Network(0.1)
+    network.add_unit(2)
+    network.add_unit(nb_hidden_nodes, 'ac_sigmoid', 'up_backpropagation')
+    network.add_unit(2, 'ac_sigmoid', 'up_backpropagation')
+    return network
+
+
+
+class TestModelHolder(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'model.npyz')
+        NetworkIO_Bundle(self.filename).write(build_network(3))
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def write_bad(self):
+        stream = open(self.filename, 'wb')
+        stream.write('not a model')
+        stream.close()
+
+
+    def wait(self, condition):
+        for i in range(500):
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+
+    def test_bad_then_good(self):
+        holder = ModelHolder(self.filename)
+        self.assertEqual(holder.get_model()[2], 1)
+
+        self.write_bad()
+        self.assertFalse(holder.reload())
+        self.assertTrue(isinstance(holder.get_error(), NpyStreamError))
+        self.assertEqual(holder.get_model()[2], 1)
+        self.assertEqual(holder.get_network().get_units()[1].get_nb_nodes(), 3)
+
+        NetworkIO_Bundle(self.filename).write(build_network(4))
+        self.assertTrue(holder.reload())
+        self.assertTrue(holder.get_error() is None)
+        self.assertEqual(holder.get_model()[2], 2)
+        self.assertEqual(holder.get_network().get_units()[1].get_nb_nodes(), 4)
+
+
+    def test_loader_error(self):
+        def loader(path):
+            if os.path.getsize(path) < 100:
+                raise ValueError('unexpected content')
+            return load_model(path)
+
+        holder = ModelHolder(self.filename, loader, 0.01)
+        holder.start()
+        try:
+            self.write_bad()
+            self.assertTrue(self.wait(lambda: isinstance(holder.get_error(), ValueError)))
+            self.assertTrue(holder.thread.isAlive())
+            self.assertEqual(holder.get_model()[2], 1)
+
+            NetworkIO_Bundle(self.filename).write(build_network(4))
+            self.assertTrue(self.wait(lambda: holder.get_model()[2] == 2))
+            self.assertTrue(holder.get_error() is None)
+        finally:
+            holder.close()
+
+
+    def test_initial_error(self):
+        self.write_bad()
+        self.assertRaises(NpyStreamError, ModelHolder, self.filename)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
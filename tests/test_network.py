@@ -0,0 +1,219 @@
+"""
+Tests of the neural network.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+
+import os
+import sys
+import array
+import random
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from network import Network, NetworkStats
+from data import *
+from dataloader import DataLoader
+from exception import *
+
+
+
+def build_data_set(nb_data_instances=40, seed=3):
+    random.seed(seed)
+    data_set = DataSet()
+    data_set.set_name_attribute(('a', 'b'))
+    data_set.is_numerized = True
+    for index in range(nb_data_instances):
+        (a, b) = (random.uniform(-1, 1), random.uniform(-1, 1))
+        data_set.add_data_instance(index, (a, b), 1 + int((a + 1) * 1.5))
+    return data_set
+
+
+def build_network(name_update_function='up_backpropagation', learning_rate=0.1):
+    random.seed(7)
+    network = Network(learning_rate)
+    network.add_unit(2)
+    network.add_unit(4, 'ac_sigmoid', name_update_function)
+    network.add_unit(3, 'ac_sigmoid', name_update_function)
+    network.label_function = 'la_max'
+    return network
+
+
+
+class TestNetworkLearning(unittest.TestCase):
+
+    def test_learn_cycles_data_loader(self):
+        data_set = build_data_set()
+        network = build_network()
+        network.learn_cycles(data_set, 2, DataLoader(data_set, 10, seed=1))
+
+        weights = network.get_weights()
+        data_loader = DataLoader(build_data_set(seed=4), 10, seed=1)
+        self.assertRaises(NpyValueError, network.learn_cycles, data_set, 1, data_loader)
+        self.assertEqual(network.get_weights(), weights)
+
+
+    def test_learning_rate_none(self):
+        # Rprop does not use the learning rate, unlike Quickprop
+        data_set = build_data_set()
+        network = build_network('up_rprop', None)
+        weights = network.get_weights()
+        network.learn_cycles(data_set, 2)
+        self.assertNotEqual(network.get_weights(), weights)
+
+        network = build_network('up_quickprop', None)
+        self.assertRaises(NpyIncompleteError, network.learn_cycles, data_set, 1)
+        network = build_network('up_backpropagation', None)
+        self.assertRaises(NpyIncompleteError, network.learn_cycles, data_set, 1)
+
+
+
+class TestLossGradient(unittest.TestCase):
+
+    def check_gradient(self, name_activation_function, name_error_function, nb_nodes_output):
+        """
+        Compare the gradient of compute_loss_gradient with central finite
+        differences of the loss.
+        """
+        data_set = build_data_set(20)
+        random.seed(11)
+        network = Network(0.1)
+        network.add_unit(2)
+        network.add_unit(4, 'ac_sigmoid', 'up_backpropagation')
+        network.add_unit(nb_nodes_output, name_activation_function, 'up_backpropagation', name_error_function)
+        network.label_function = 'la_max'
+
+        parameters = network.get_parameters()
+        (loss, gradient) = network.compute_loss_gradient(data_set)
+        self.assertEqual(len(gradient), network.get_nb_parameters())
+
+        epsilon = 1e-5
+        for index in range(len(parameters)):
+            losses = []
+            for delta in (epsilon, -epsilon):
+                parameters_moved = array.array('d', parameters)
+                parameters_moved[index] += delta
+                network.set_parameters(parameters_moved)
+                losses.append(network.compute_loss_gradient(data_set)[0])
+            self.assertAlmostEqual((losses[0] - losses[1]) / (2 * epsilon), gradient[index], 6)
+
+        network.set_parameters(parameters)
+        self.assertEqual(network.compute_loss_gradient(data_set)[0], loss)
+
+
+    def test_sigmoid_output_difference(self):
+        self.check_gradient('ac_sigmoid', None, 3)
+
+
+    def test_softmax_cross_entropy(self):
+        self.check_gradient('ac_softmax', 'er_crossentropy', 3)
+
+
+    def test_sigmoid_binary_cross_entropy(self):
+        self.check_gradient('ac_sigmoid', 'er_crossentropy', 1)
+
+
+    def test_softmax_learn_data_instance(self):
+        # The update made for a single instance by the backpropagation is
+        # the gradient of the loss of this instance, times the learning rate
+        data_set = build_data_set(1)
+        random.seed(11)
+        network = Network(0.1)
+        network.add_unit(2)
+        network.add_unit(4, 'ac_sigmoid', 'up_backpropagation')
+        network.add_unit(3, 'ac_softmax', 'up_backpropagation', 'er_crossentropy')
+        network.label_function = 'la_max'
+
+        parameters = network.get_parameters()
+        epsilon = 1e-5
+        gradient = []
+        for index in range(len(parameters)):
+            losses = []
+            for delta in (epsilon, -epsilon):
+                parameters_moved = array.array('d', parameters)
+                parameters_moved[index] += delta
+                network.set_parameters(parameters_moved)
+                losses.append(network.compute_loss_gradient(data_set)[0])
+            gradient.append((losses[0] - losses[1]) / (2 * epsilon))
+
+        network.set_parameters(parameters)
+        network.learn_data_instance(data_set.get_data_instances()[0])
+        for value, value_previous, derivative in zip(network.get_parameters(), parameters, gradient):
+            self.assertAlmostEqual(value - value_previous, -0.1 * derivative, 7)
+
+
+    def test_softmax_invalid_position(self):
+        data_set = build_data_set()
+        network = Network(0.1)
+        network.add_unit(2)
+        network.add_unit(4, 'ac_softmax', 'up_backpropagation', 'er_crossentropy')
+        network.add_unit(3, 'ac_sigmoid', 'up_backpropagation')
+        network.label_function = 'la_max'
+        self.assertRaises(NpyTransferFunctionError, network.learn_data_instance, data_set.get_data_instances()[0])
+        self.assertRaises(NpyTransferFunctionError, Network().set_topology, network.get_topology())
+
+        # Without er_crossentropy, the derivative of the softmax is wrong
+        network = Network(0.1)
+        network.add_unit(2)
+        network.add_unit(3, 'ac_softmax', 'up_backpropagation')
+        network.label_function = 'la_max'
+        self.assertRaises(NpyTransferFunctionError, network.compute_loss_gradient, data_set)
+        self.assertRaises(NpyTransferFunctionError, Network().set_topology, network.get_topology())
+
+
+
+class TestNetworkStats(unittest.TestCase):
+
+    def test_concurrent_add(self):
+        stats = NetworkStats()
+        def add():
+            for i in range(10000):
+                stats.add('forward', None, 0.5)
+                stats.add('forward', 2, 0.25)
+        threads = [threading.Thread(target=add) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(stats.get_count('forward'), 40000)
+        self.assertEqual(stats.get_time('forward'), 20000.0)
+        self.assertEqual(stats.get_count('forward', 2), 40000)
+        self.assertEqual(stats.get_count('errors'), 0)
+        self.assertEqual(stats.get_time('errors'), 0.0)
+
+        stats.reset()
+        self.assertEqual(stats.get_records(), [])
+
+
+    def test_profile(self):
+        data_set = build_data_set()
+        network = build_network()
+        with network.profile() as stats:
+            network.learn_cycles(data_set, 1)
+        self.assertEqual(stats.get_count('forward'), data_set.get_nb_data_instances())
+
+
+
+if __name__ == '__main__':
+    unittest.main()
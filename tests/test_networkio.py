@@ -0,0 +1,223 @@
+"""
+Tests of the network input/output classes.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import array
+import shutil
+import zipfile
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from network import Network
+from networkio import NetworkIO_CSV, NetworkIO_Binary, NetworkIO_Bundle
+from exception import *
+
+
+
+def build_network(learning_rate=None, use_bias=True):
+    network = Network(learning_rate, use_bias)
+    network.add_unit(2)
+    network.add_unit(3, 'ac_sigmoid', 'up_backpropagation')
+    network.add_unit(2, 'ac_softmax', 'up_rprop', 'er_crossentropy')
+    return network
+
+
+
+class TestNetworkIO_Binary(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'network.npyn')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def check_round_trip(self, network):
+        NetworkIO_Binary(self.filename).write(network)
+        network_read = Network()
+        NetworkIO_Binary(self.filename).read(network_read)
+        self.assertEqual(network_read.get_topology(), network.get_topology())
+        self.assertEqual(network_read.get_weights(), network.get_weights())
+        return network_read
+
+
+    def test_round_trip(self):
+        network_read = self.check_round_trip(build_network(0.25))
+        self.assertEqual(network_read.learning_rate, 0.25)
+        self.assertTrue(network_read.use_bias is True)
+
+
+    def test_round_trip_learning_rate_none(self):
+        network_read = self.check_round_trip(build_network(None))
+        self.assertTrue(network_read.learning_rate is None)
+
+
+    def test_round_trip_without_bias(self):
+        network_read = self.check_round_trip(build_network(0.1, False))
+        self.assertTrue(network_read.use_bias is False)
+
+
+    def test_read_mapped(self):
+        network = build_network(None)
+        NetworkIO_Binary(self.filename).write(network)
+        network_read = Network()
+        NetworkIO_Binary(self.filename).read_mapped(network_read)
+        self.assertTrue(network_read.learning_rate is None)
+        self.assertEqual([[list(weights) for weights in weights_unit] for weights_unit in network_read.get_weights()],
+                         network.get_weights())
+
+        weights_mapped = network_read.get_weights()[0][1]
+        weights = network.get_weights()[0][1]
+        self.assertEqual([weights_mapped[index] for index in range(len(weights_mapped))], weights)
+        self.assertEqual(weights_mapped[-1], weights[-1])
+        self.assertEqual(list(weights_mapped[1:]), weights[1:])
+        self.assertRaises(IndexError, weights_mapped.__getitem__, len(weights))
+        self.assertRaises(IndexError, weights_mapped.__getitem__, -len(weights) - 1)
+
+
+    def test_invalid_topology(self):
+        network = build_network(0.1)
+        io = NetworkIO_Binary(self.filename)
+        content = io.dumps(network).replace('ac_softmax', 'ac_unknown')
+        self.assertRaises(NpyStreamError, io.loads, Network(), content)
+
+        topology = network.get_topology()
+        topology['use_bias'] = 'maybe'
+        self.assertRaises(NpyValueError, Network().set_topology, topology)
+        del topology['nb_units']
+        self.assertRaises(NpyValueError, Network().set_topology, topology)
+
+
+
+class TestNetworkIO_CSV(unittest.TestCase):
+
+    def test_round_trip_learning_rate_none(self):
+        directory = tempfile.mkdtemp()
+        try:
+            network = build_network(None)
+            io = NetworkIO_CSV(os.path.join(directory, 'network.csv'))
+            io.write_topology(network)
+            io.write_weights(network)
+            network_read = Network()
+            io.read_topology(network_read)
+            io.read_weights(network_read)
+            self.assertTrue(network_read.learning_rate is None)
+            self.assertEqual(network_read.get_topology(), network.get_topology())
+        finally:
+            shutil.rmtree(directory)
+
+
+
+class TestNetworkIO_Bundle(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'network.npyz')
+        self.network = build_network(None)
+        nb_weights = 2 * 4
+        self.network.get_units()[-1].get_update_function().set_state(
+            {'steps': array.array('d', [0.5] * nb_weights),
+             'gradients': array.array('d', [0.25] * nb_weights),
+             'changes': array.array('d', [0.125] * nb_weights),
+             'loss': array.array('d', [2.0])})
+        NetworkIO_Bundle(self.filename).write(self.network)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+    def rewrite(self, change):
+        """
+        Rewrite the bundle, calling change() on the dictionary of its
+        members.
+        """
+        archive = zipfile.ZipFile(self.filename, 'r')
+        contents = dict([(name, archive.read(name)) for name in archive.namelist()])
+        archive.close()
+        change(contents)
+        archive = zipfile.ZipFile(self.filename, 'w')
+        for name, content in contents.items():
+            archive.writestr(name, content)
+        archive.close()
+
+
+    def check_rejected(self, change):
+        self.rewrite(change)
+        network = build_network(0.5)
+        weights = network.get_weights()
+        self.assertRaises(NpyStreamError, NetworkIO_Bundle(self.filename).read, network)
+        self.assertEqual(network.get_weights(), weights)
+        self.assertEqual(network.learning_rate, 0.5)
+        self.assertEqual(network.get_units()[-1].get_update_function().get_state(), {})
+
+
+    def test_round_trip(self):
+        network = Network()
+        NetworkIO_Bundle(self.filename).read(network)
+        self.assertTrue(network.learning_rate is None)
+        self.assertEqual(network.get_weights(), self.network.get_weights())
+        self.assertEqual(network.get_units()[-1].get_update_function().get_state(),
+                         self.network.get_units()[-1].get_update_function().get_state())
+
+
+    def test_unknown_field(self):
+        def change(contents):
+            contents['optimizer/unit3/momentum'] = contents.pop('optimizer/unit3/steps')
+        self.check_rejected(change)
+
+
+    def test_missing_field(self):
+        def change(contents):
+            del contents['optimizer/unit3/changes']
+        self.check_rejected(change)
+
+
+    def test_invalid_unit(self):
+        def change(contents):
+            contents['optimizer/unit1/steps'] = contents['optimizer/unit3/steps']
+        self.check_rejected(change)
+        def change(contents):
+            contents['optimizer/unit9/steps'] = contents['optimizer/unit3/steps']
+        self.check_rejected(change)
+        def change(contents):
+            contents['optimizer/unitx/steps'] = contents['optimizer/unit3/steps']
+        self.check_rejected(change)
+
+
+    def test_field_length(self):
+        def change(contents):
+            contents['optimizer/unit3/steps'] = contents['optimizer/unit3/steps'][:-8]
+        self.check_rejected(change)
+        def change(contents):
+            contents['optimizer/unit3/loss'] = contents['optimizer/unit3/steps']
+        self.check_rejected(change)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Tests of the training processes and of the update functions.
+"""
+__docformat__ = "restructuredtext en"
+
+## Copyright (c) 2009 Emmanuel Goossaert 
+##
+## This file is part of npy.
+##
+## npy is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 3 of the License, or
+## (at your option) any later version.
+##
+## npy is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with npy.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from network import Network
+from data import *
+from factory import Factory
+import train
+import metric
+
+
+
+def build_data_set():
+    random.seed(3)
+    data_set = DataSet()
+    data_set.set_name_attribute(('a', 'b'))
+    data_set.is_numerized = True
+    for index in range(60):
+        (a, b) = (random.uniform(-1, 1), random.uniform(-1, 1))
+        data_set.add_data_instance(index, (a, b), 1 + int((a + 1) * 1.5))
+    return data_set
+
+
+
+class TestConvergence(unittest.TestCase):
+
+    def check_convergence(self, name_train, name_update_function, learning_rate):
+        """
+        Check that a small network learns a simple separable problem.
+        """
+        data_set = build_data_set()
+        random.seed(7)
+        network = Network(learning_rate)
+        network.add_unit(2)
+        network.add_unit(4, 'ac_sigmoid', name_update_function)
+        network.add_unit(3, 'ac_softmax', name_update_function, 'er_crossentropy')
+        network.label_function = 'la_max'
+        loss_initial = network.compute_loss_gradient(data_set)[0]
+
+        trainer = Factory.build_instance_by_name(name_train)
+        nb_iterations = trainer.train_network(network, data_set, 'me_accuracy', 0.95, 200, 5)
+
+        accuracy = Factory.build_instance_by_name('me_accuracy').compute_metric(data_set, network.classify_data_set(data_set))
+        self.assertTrue(nb_iterations < 200)
+        self.assertTrue(accuracy >= 0.95)
+        self.assertTrue(network.compute_loss_gradient(data_set)[0] < loss_initial / 4)
+
+
+    def test_lbfgs(self):
+        self.check_convergence('tr_lbfgs', 'up_backpropagation', None)
+
+
+    def test_scg(self):
+        self.check_convergence('tr_scg', 'up_backpropagation', None)
+
+
+    def test_rprop(self):
+        self.check_convergence('tr_metric', 'up_rprop', 0.1)
+
+
+    def test_quickprop(self):
+        self.check_convergence('tr_metric', 'up_quickprop', 0.5)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
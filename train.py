@@ -21,11 +21,34 @@ __docformat__ = "restructuredtext en"
 ## along with npy.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import math
+import array
+import operator
+import itertools
+
 from factory import FactoryMixin
 from factory import Factory
 from metric import Metric
 from exception import *
 
+
+def dot(vector_a, vector_b):
+    """
+    Compute the dot product of two vectors.
+    """
+    return math.fsum(itertools.imap(operator.mul, vector_a, vector_b))
+
+
+def combine(vector_a, vector_b, factor):
+    """
+    Compute vector_a + factor * vector_b.
+
+    :Returns:
+        array of floats : the resulting vector.
+    """
+    return array.array('d', [a + factor * b for a, b in itertools.izip(vector_a, vector_b)])
+
+
 class Train(FactoryMixin):
     """
     Training class.
@@ -40,7 +63,7 @@ class Train(FactoryMixin):
         FactoryMixin.__init__(self)
 
 
-    def train_network(self, network, data_set, name_metric_function, metric_value_min, nb_iterations_max=10000, interval_check=100):
+    def train_network(self, network, data_set, name_metric_function, metric_value_min, nb_iterations_max=10000, interval_check=100, data_loader=None, checkpointer=None):
         """
         Apply a training process upon a `DataSet`.
 
@@ -61,6 +84,12 @@ class Train(FactoryMixin):
             interval_check : integer
                 Interval of learning cycles at which the `Network` has to be
                 tested with the `Metric` function. Set to 100 by default.
+            data_loader : `DataLoader`
+                If not None, the `DataLoader` built on data_set that gives
+                the order of the instances at every learning cycle.
+            checkpointer : `Checkpointer`
+                If not None, the `Checkpointer` used to save the training
+                regularly and to resume it.
 
         :Return:
             integer : number of iterations that has been necessary for the
@@ -96,7 +125,7 @@ class TrainSimple(Train):
         self._set_name("tr_metric")
 
 
-    def train_network(self, network, data_set, name_metric_function, metric_value_min, nb_iterations_max, interval_check):
+    def train_network(self, network, data_set, name_metric_function, metric_value_min, nb_iterations_max, interval_check, data_loader=None, checkpointer=None):
         """
         Apply the training process on a `DataSet`, until the `Metric`
         value computed using metric_function *equals or is greater than*
@@ -104,6 +133,11 @@ class TrainSimple(Train):
         functions gives higher values for higher network performances.
         The training is stopped after nb_iterations_max to avoid infinite
         loops due to unreachable `Metric` values.
+
+        If a `Checkpointer` is given, the training resumes from its latest
+        checkpoint if there is one, and checkpoints are saved after the
+        tests of the network when they are due. The number of iterations
+        returned includes the iterations made before resuming.
         """
         
         if interval_check < 1:
@@ -120,15 +154,23 @@ class TrainSimple(Train):
 
         nb_iterations_current = 0
         metric_value_computed = metric_value_min - 1
+        if checkpointer != None:
+            checkpoint = checkpointer.restore(network, data_loader)
+            if checkpoint != None:
+                (nb_iterations_current, metric_value_computed, optimizer_state) = checkpoint
+
         while (nb_iterations_max == None or nb_iterations_current < nb_iterations_max) \
            and metric_value_computed < metric_value_min:
             try:
-                network.learn_cycles(data_set, interval_check)
+                network.learn_cycles(data_set, interval_check, data_loader)
                 data_classification = network.classify_data_set(data_set)
             except NpyDataTypeError, e:
                 raise NpyDataTypeError, e.msg
             metric_value_computed = metric_function.compute_metric(data_set, data_classification)
             nb_iterations_current += interval_check
+
+            if checkpointer != None and checkpointer.is_due(nb_iterations_current):
+                checkpointer.save(network, nb_iterations_current, metric_value_computed, data_loader)
             
         return nb_iterations_current
 
@@ -139,5 +181,371 @@ class TrainSimple(Train):
 
 
 
+class TrainFullBatch(Train):
+    """
+    Abstract class for the training processes that optimize the weights
+    of the network as one vector, using the loss and the gradient computed
+    over the whole `DataSet` by `Network.compute_loss_gradient`. The
+    learning rate and the update functions of the network are not used.
+    As in `TrainSimple`, the training stops when the `Metric` value
+    reaches metric_value_min, and the metric is computed every
+    interval_check iterations, an iteration being one step of the
+    optimizer. The training also stops when the optimizer cannot decrease
+    the loss anymore.
+
+    :IVariables:
+        __tolerance : float
+            The optimization has converged when the norm of the gradient
+            is lower than tolerance.
+    """
+
+    def __init__(self, tolerance=1e-8):
+        """
+        Initializer.
+
+        :Parameters:
+            tolerance : float
+                The optimization has converged when the norm of the
+                gradient is lower than tolerance.
+        """
+        Train.__init__(self)
+        self.tolerance = tolerance
+
+
+    def train_network(self, network, data_set, name_metric_function, metric_value_min, nb_iterations_max, interval_check, data_loader=None, checkpointer=None):
+        """
+        Apply the training process on a `DataSet`. data_loader is ignored,
+        since the gradient is computed over the whole `DataSet`. As in
+        `TrainSimple`, the training resumes from the latest checkpoint of
+        checkpointer, whose checkpoints also hold the state of the
+        optimizer.
+        """
+        if interval_check < 1:
+            raise NpyValueError, 'interval_check has to be greater or equal to 1.'
+
+        if nb_iterations_max != None and nb_iterations_max < 1:
+            raise NpyValueError, 'nb_iterations_max has to be greater or equal to 1, or equal to None.'
+
+        if data_set.is_numerized == False:
+            raise NpyDataTypeError, 'data_set must be numerized first.'
+
+        try:
+            Factory.check_prefix(name_metric_function, Metric.prefix)
+            metric_function = Factory.build_instance_by_name(name_metric_function)
+        except NpyTransferFunctionError, e:
+            raise NpyTransferFunctionError, e.msg
+
+        nb_iterations_current = 0
+        converged = False
+        metric_value_computed = metric_value_min - 1
+        state = None
+        if checkpointer != None:
+            checkpoint = checkpointer.restore(network)
+            if checkpoint != None:
+                (nb_iterations_current, metric_value_computed, state) = checkpoint
+
+        if state == None:
+            state = self.initialize_state(network, data_set)
+
+        while (nb_iterations_max == None or nb_iterations_current < nb_iterations_max) \
+           and metric_value_computed < metric_value_min and not converged:
+            for i in range(interval_check):
+                converged = self.step(network, data_set, state)
+                nb_iterations_current += 1
+                if converged or nb_iterations_current == nb_iterations_max:
+                    break
+
+            data_classification = network.classify_data_set(data_set)
+            metric_value_computed = metric_function.compute_metric(data_set, data_classification)
+
+            if checkpointer != None and checkpointer.is_due(nb_iterations_current):
+                checkpointer.save(network, nb_iterations_current, metric_value_computed, optimizer_state=state)
+
+        return nb_iterations_current
+
+
+    def evaluate(self, network, data_set, parameters):
+        """
+        Set the weights of the network and compute the loss and the
+        gradient.
+
+        :Parameters:
+            network : `Network`
+                Network being trained.
+            data_set : `DataSet`
+                Data set on which to train the network.
+            parameters : array of floats
+                Weights of the network, as given by get_parameters().
+
+        :Returns:
+            tuple : the loss and the gradient.
+        """
+        network.set_parameters(parameters)
+        return network.compute_loss_gradient(data_set)
+
+
+    def initialize_state(self, network, data_set):
+        """
+        Build the state of the optimizer.
+
+        :Parameters:
+            network : `Network`
+                Network to train.
+            data_set : `DataSet`
+                Data set on which to train the network.
+
+        :Returns:
+            dictionary : the state of the optimizer.
+        """
+        pass
+
+
+    def step(self, network, data_set, state):
+        """
+        Make one step of the optimizer, and leave the network with the
+        new weights.
+
+        :Parameters:
+            network : `Network`
+                Network to train.
+            data_set : `DataSet`
+                Data set on which to train the network.
+            state : dictionary
+                State of the optimizer, updated in place.
+
+        :Returns:
+            boolean : True if the optimization has converged or cannot
+            progress anymore.
+        """
+        pass
+
+
+
+class TrainLBFGS(TrainFullBatch):
+    """
+    Limited-memory BFGS training. The search direction is given by the
+    last nb_corrections changes of the weights and of the gradient, and
+    the step is found by a backtracking line search that satisfies the
+    Armijo condition.
+
+    :IVariables:
+        __nb_corrections : integer
+            Number of changes kept to approximate the inverse Hessian.
+    """
+
+    # Sufficient decrease constant of the Armijo condition
+    armijo = 1e-4
+
+    # Maximum number of halvings of the step in the line search
+    nb_backtracks_max = 30
+
+    def __init__(self, nb_corrections=10, tolerance=1e-8):
+        """
+        Initializer.
+
+        :Parameters:
+            nb_corrections : integer
+                Number of changes kept to approximate the inverse Hessian.
+            tolerance : float
+                The optimization has converged when the norm of the
+                gradient is lower than tolerance.
+        """
+        TrainFullBatch.__init__(self, tolerance)
+        self._set_name("tr_lbfgs")
+        self.nb_corrections = nb_corrections
+
+
+    def initialize_state(self, network, data_set):
+        parameters = network.get_parameters()
+        (loss, gradient) = self.evaluate(network, data_set, parameters)
+        return {'parameters': parameters, 'loss': loss, 'gradient': gradient, 'changes': []}
+
+
+    def compute_direction(self, gradient, changes):
+        """
+        Compute the opposite of the product of the approximated inverse
+        Hessian and the gradient, with the two-loop recursion.
+
+        :Parameters:
+            gradient : array of floats
+                Current gradient.
+            changes : sequence of tuples
+                The changes of the weights and of the gradient, along with
+                the inverse of their dot product, oldest first.
+
+        :Returns:
+            array of floats : the search direction.
+        """
+        direction = array.array('d', gradient)
+        alphas = []
+        for (change_parameters, change_gradient, rho) in reversed(changes):
+            alpha = rho * dot(change_parameters, direction)
+            direction = combine(direction, change_gradient, -alpha)
+            alphas.append(alpha)
+
+        if len(changes) > 0:
+            (change_parameters, change_gradient, rho) = changes[-1]
+            direction = combine([0.0] * len(direction), direction, 1 / (rho * dot(change_gradient, change_gradient)))
+
+        for (change_parameters, change_gradient, rho), alpha in itertools.izip(changes, reversed(alphas)):
+            beta = rho * dot(change_gradient, direction)
+            direction = combine(direction, change_parameters, alpha - beta)
+
+        return combine([0.0] * len(direction), direction, -1.0)
+
+
+    def step(self, network, data_set, state):
+        parameters = state['parameters']
+        loss = state['loss']
+        gradient = state['gradient']
+        changes = state['changes']
+
+        direction = self.compute_direction(gradient, changes)
+        slope = dot(gradient, direction)
+        if slope >= 0:
+            # Not a descent direction: restart from the steepest descent
+            del changes[:]
+            direction = combine([0.0] * len(gradient), gradient, -1.0)
+            slope = dot(gradient, direction)
+
+        if len(changes) > 0:
+            step = 1.0
+        else:
+            step = min(1.0, 1 / math.sqrt(-slope))
+
+        for i in range(self.nb_backtracks_max):
+            parameters_new = combine(parameters, direction, step)
+            (loss_new, gradient_new) = self.evaluate(network, data_set, parameters_new)
+            if loss_new <= loss + self.armijo * step * slope:
+                break
+            step /= 2
+        else:
+            network.set_parameters(parameters)
+            return True
+
+        change_parameters = combine(parameters_new, parameters, -1.0)
+        change_gradient = combine(gradient_new, gradient, -1.0)
+        curvature = dot(change_parameters, change_gradient)
+        if curvature > 1e-10:
+            changes.append((change_parameters, change_gradient, 1 / curvature))
+            if len(changes) > self.nb_corrections:
+                del changes[0]
+
+        state['parameters'] = parameters_new
+        state['loss'] = loss_new
+        state['gradient'] = gradient_new
+
+        return math.sqrt(dot(gradient_new, gradient_new)) < self.tolerance
+
+
+    @staticmethod
+    def build_instance():
+        return TrainLBFGS()
+
+
+
+class TrainSCG(TrainFullBatch):
+    """
+    Scaled conjugate gradient training (Moller, 1993). The step along the
+    conjugate directions is computed from a finite-difference estimate of
+    the curvature, regularized by a scale parameter adapted at every
+    iteration, so that no line search is needed.
+    """
+
+    # Initial step of the finite difference, divided by the norm of the
+    # direction
+    sigma = 1e-4
+
+    # Initial value of the scale parameter
+    scale_initial = 1e-6
+
+    def __init__(self, tolerance=1e-8):
+        TrainFullBatch.__init__(self, tolerance)
+        self._set_name("tr_scg")
+
+
+    def initialize_state(self, network, data_set):
+        parameters = network.get_parameters()
+        (loss, gradient) = self.evaluate(network, data_set, parameters)
+        residual = combine([0.0] * len(gradient), gradient, -1.0)
+        return {'parameters': parameters, 'loss': loss, 'residual': residual,
+                'direction': residual, 'scale': self.scale_initial,
+                'scale_bar': 0.0, 'success': True, 'curvature': 0.0,
+                'nb_steps': 0}
+
+
+    def step(self, network, data_set, state):
+        parameters = state['parameters']
+        loss = state['loss']
+        residual = state['residual']
+        direction = state['direction']
+        norm2_direction = dot(direction, direction)
+        nb_parameters = len(parameters)
+
+        if norm2_direction == 0:
+            return True
+
+        if state['success']:
+            sigma = self.sigma / math.sqrt(norm2_direction)
+            (loss_sigma, gradient_sigma) = self.evaluate(network, data_set, combine(parameters, direction, sigma))
+            # The residual is the opposite of the gradient
+            state['curvature'] = (dot(direction, gradient_sigma) + dot(direction, residual)) / sigma
+
+        scale = state['scale']
+        scale_bar = state['scale_bar']
+        curvature = state['curvature'] + (scale - scale_bar) * norm2_direction
+        if curvature <= 0:
+            scale_bar = 2 * (scale - curvature / norm2_direction)
+            curvature = -curvature + scale * norm2_direction
+            scale = scale_bar
+
+        mu = dot(direction, residual)
+        alpha = mu / curvature
+        parameters_new = combine(parameters, direction, alpha)
+        (loss_new, gradient_new) = self.evaluate(network, data_set, parameters_new)
+        comparison = 2 * curvature * (loss - loss_new) / (mu * mu)
+
+        if comparison >= 0:
+            residual_new = combine([0.0] * nb_parameters, gradient_new, -1.0)
+            state['nb_steps'] += 1
+            if state['nb_steps'] % nb_parameters == 0:
+                direction_new = residual_new
+            else:
+                beta = (dot(residual_new, residual_new) - dot(residual_new, residual)) / mu
+                direction_new = combine(residual_new, direction, beta)
+
+            state['parameters'] = parameters_new
+            state['loss'] = loss_new
+            state['residual'] = residual_new
+            state['direction'] = direction_new
+            state['success'] = True
+            scale_bar = 0.0
+            if comparison >= 0.75:
+                scale /= 4
+        else:
+            network.set_parameters(parameters)
+            state['success'] = False
+            scale_bar = scale
+
+        if comparison < 0.25:
+            scale += curvature * (1 - comparison) / norm2_direction
+
+        state['scale'] = scale
+        state['scale_bar'] = scale_bar
+
+        if not state['success'] and scale > 1e100:
+            return True
+
+        return math.sqrt(dot(state['residual'], state['residual'])) < self.tolerance
+
+
+    @staticmethod
+    def build_instance():
+        return TrainSCG()
+
+
+
 # Declare the learning functions to the Factory
 Factory.declare_instance(TrainSimple())
+Factory.declare_instance(TrainLBFGS())
+Factory.declare_instance(TrainSCG())
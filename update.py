@@ -21,11 +21,33 @@ __docformat__ = "restructuredtext en"
 ## along with npy.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import array
 import itertools
 from factory import FactoryMixin
 from factory import Factory
 
 
+def split_weights(unit, weights):
+    """
+    Split the flattened weights of a unit node by node.
+
+    :Parameters:
+        unit : Unit
+            Network unit the weights belong to.
+        weights : sequence of floats
+            Weights of the unit, flattened node by node.
+
+    :Returns:
+        sequence of sequences of floats : the weights of every node.
+    """
+    weights_unit = []
+    index = 0
+    for weights_node in unit.get_weights():
+        weights_unit.append(list(weights[index:index + len(weights_node)]))
+        index += len(weights_node)
+    return weights_unit
+
+
 class Update(FactoryMixin):
     """
     Abstract class for the gradient descent updating process
@@ -33,6 +55,19 @@ class Update(FactoryMixin):
 
     prefix = 'up_'
 
+    # True for the update functions applied once per learning cycle, from
+    # the gradient over the whole `DataSet`, with compute_batch_update()
+    is_batch = False
+
+    # False for the update functions that do not use the learning rate of
+    # the network, which may then be None
+    uses_learning_rate = True
+
+    # Fields of the dictionary returned by get_state(), associated to True
+    # for the arrays holding one value per weight, and to False for the
+    # arrays holding at most one value
+    state_fields = {}
+
     def __init__(self):
         """
         Initializer
@@ -64,6 +99,54 @@ class Update(FactoryMixin):
         pass
 
 
+    def compute_batch_update(self, unit, gradient, loss, learning_rate):
+        """
+        Compute the update to be applied at the end of a learning cycle,
+        for the update functions of which is_batch is True.
+
+        :Parameters:
+            unit : Unit
+                Network unit to which the update has to be applied.
+            gradient : array of floats
+                Gradient of the loss over the whole `DataSet` with respect
+                to the weights of the unit, flattened node by node.
+            loss : float
+                Loss of the network over the whole `DataSet`.
+            learning_rate : float
+                Learning rate of the network, which may be None if
+                uses_learning_rate is False.
+
+        :Returns:
+            The new values for the weights, after having applied the updates. 
+        """
+        pass
+
+
+    def get_state(self):
+        """
+        Describe the state kept by the update function between two
+        updates, so that a training can be saved and resumed.
+
+        :Returns:
+            dictionary : associates the names of the state fields to arrays
+            of floats.
+        """
+        return {}
+
+
+    def set_state(self, state):
+        """
+        Load the state kept by the update function from a dictionary built
+        by get_state().
+
+        :Parameters:
+            state : dictionary
+                Associates the names of the state fields to sequences of
+                floats.
+        """
+        pass
+
+
 
 class UpdateBackpropagation(Update):
     """
@@ -142,6 +225,213 @@ class UpdateTD(Update):
         return UpdateTD()
 
 
+class UpdateRprop(Update):
+    """
+    Resilient backpropagation update class, in its iRprop+ variant (Igel
+    and Husken, 2000). Every weight has its own step, which grows while
+    the sign of its gradient stays the same and shrinks when it changes;
+    the magnitude of the gradient and the learning rate are not used. When
+    the sign changes and the loss has increased, the previous change of
+    the weight is reverted.
+
+    :IVariables:
+        __steps : array of floats
+            Current step of every weight.
+        __gradients : array of floats
+            Gradient of the previous cycle, set to zero after a sign change.
+        __changes : array of floats
+            Change applied to every weight at the previous cycle.
+        __loss : float
+            Loss of the previous cycle.
+    """
+
+    is_batch = True
+
+    uses_learning_rate = False
+
+    state_fields = {'steps': True, 'gradients': True, 'changes': True, 'loss': False}
+
+    increase = 1.2
+    decrease = 0.5
+    step_initial = 0.1
+    step_min = 1e-6
+    step_max = 50.0
+
+    def __init__(self):
+        Update.__init__(self)
+        self._set_name("up_rprop")
+        self.steps = None
+        self.gradients = None
+        self.changes = None
+        self.loss = None
+
+
+    def compute_batch_update(self, unit, gradient, loss, learning_rate):
+        nb_weights = len(gradient)
+        if self.steps == None or len(self.steps) != nb_weights:
+            self.steps = array.array('d', [UpdateRprop.step_initial]) * nb_weights
+            self.gradients = array.array('d', [0.0]) * nb_weights
+            self.changes = array.array('d', [0.0]) * nb_weights
+
+        weights = [weight for weights_node in unit.get_weights() for weight in weights_node]
+        steps = self.steps
+        gradients = self.gradients
+        changes = self.changes
+        loss_increased = self.loss != None and loss > self.loss
+
+        for index in xrange(nb_weights):
+            product = gradient[index] * gradients[index]
+            if product < 0:
+                steps[index] = max(steps[index] * UpdateRprop.decrease, UpdateRprop.step_min)
+                if loss_increased:
+                    weights[index] -= changes[index]
+                changes[index] = 0.0
+                gradients[index] = 0.0
+                continue
+
+            if product > 0:
+                steps[index] = min(steps[index] * UpdateRprop.increase, UpdateRprop.step_max)
+
+            if gradient[index] > 0:
+                changes[index] = -steps[index]
+            elif gradient[index] < 0:
+                changes[index] = steps[index]
+            else:
+                changes[index] = 0.0
+            weights[index] += changes[index]
+            gradients[index] = gradient[index]
+
+        self.loss = loss
+
+        return split_weights(unit, weights)
+
+
+    def get_state(self):
+        if self.steps == None:
+            return {}
+
+        loss = array.array('d')
+        if self.loss != None:
+            loss.append(self.loss)
+
+        return {'steps': self.steps, 'gradients': self.gradients, 'changes': self.changes, 'loss': loss}
+
+
+    def set_state(self, state):
+        if len(state) == 0:
+            self.steps = self.gradients = self.changes = self.loss = None
+            return
+
+        self.steps = array.array('d', state['steps'])
+        self.gradients = array.array('d', state['gradients'])
+        self.changes = array.array('d', state['changes'])
+        self.loss = None
+        if len(state['loss']) > 0:
+            self.loss = state['loss'][0]
+
+
+    @staticmethod
+    def build_instance():
+        return UpdateRprop()
+
+
+
+class UpdateQuickprop(Update):
+    """
+    Quickprop update class (Fahlman, 1988). Every weight is moved to the
+    minimum of the parabola given by its current and previous gradients
+    and its previous change, within max_growth times the previous change.
+    When the previous change is null, or when it did not overshoot the
+    minimum, a gradient descent step using the learning rate of the
+    network is added.
+
+    :IVariables:
+        __gradients : array of floats
+            Gradient of the previous cycle.
+        __changes : array of floats
+            Change applied to every weight at the previous cycle.
+    """
+
+    is_batch = True
+
+    state_fields = {'gradients': True, 'changes': True}
+
+    max_growth = 1.75
+
+    def __init__(self):
+        Update.__init__(self)
+        self._set_name("up_quickprop")
+        self.gradients = None
+        self.changes = None
+
+
+    def compute_batch_update(self, unit, gradient, loss, learning_rate):
+        nb_weights = len(gradient)
+        if self.gradients == None or len(self.gradients) != nb_weights:
+            self.gradients = array.array('d', [0.0]) * nb_weights
+            self.changes = array.array('d', [0.0]) * nb_weights
+
+        weights = [weight for weights_node in unit.get_weights() for weight in weights_node]
+        gradients = self.gradients
+        changes = self.changes
+        max_growth = UpdateQuickprop.max_growth
+        # Above this ratio of the previous gradient, the step is limited
+        shrink = max_growth / (1 + max_growth)
+
+        for index in xrange(nb_weights):
+            current = gradient[index]
+            previous = gradients[index]
+            change_previous = changes[index]
+
+            if change_previous > 0:
+                change = 0.0
+                if current < 0:
+                    change -= learning_rate * current
+                if current < shrink * previous:
+                    change += max_growth * change_previous
+                else:
+                    change += change_previous * current / (previous - current)
+            elif change_previous < 0:
+                change = 0.0
+                if current > 0:
+                    change -= learning_rate * current
+                if current > shrink * previous:
+                    change += max_growth * change_previous
+                else:
+                    change += change_previous * current / (previous - current)
+            else:
+                change = -learning_rate * current
+
+            weights[index] += change
+            changes[index] = change
+            gradients[index] = current
+
+        return split_weights(unit, weights)
+
+
+    def get_state(self):
+        if self.gradients == None:
+            return {}
+
+        return {'gradients': self.gradients, 'changes': self.changes}
+
+
+    def set_state(self, state):
+        if len(state) == 0:
+            self.gradients = self.changes = None
+            return
+
+        self.gradients = array.array('d', state['gradients'])
+        self.changes = array.array('d', state['changes'])
+
+
+    @staticmethod
+    def build_instance():
+        return UpdateQuickprop()
+
+
 # Declare the activation functions to the Update class
 Factory.declare_instance(UpdateBackpropagation())
 Factory.declare_instance(UpdateTD())
+Factory.declare_instance(UpdateRprop())
+Factory.declare_instance(UpdateQuickprop())